@@ -1,10 +1,10 @@
 from usuarios.user_factory import UserFactory
 from desafios.challenge import QuizChallenge
-from desafios.scoring_strategy import TimeBasedScoring, DifficultyBasedScoring
-from gamificacao.achievements import Achievement, Medal, AchievementObserver, UserAchievementManager
+from gamificacao.achievements import AchievementCenter, Medal, MedalCollection, AchievementObserver
+from gamificacao.rules import ActivityTracker, RuleAchievement
 from relatorios.facade import ReportFacade
 from historico.command import ActionHistory, LogAction
-from utils.singleton import SessionManager
+from session import SessionManager
 
 
 def main():
@@ -23,30 +23,38 @@ def main():
 
     # Gerenciar conquistas com Observer
     observer = AchievementObserver()
-    achievement_manager = UserAchievementManager()
-    achievement_manager.attach(observer)
+    achievement_center = AchievementCenter()
+    achievement_center.subscribe(observer)
 
-    # Criar conquistas
-    medal_math = Medal("Medalha Matemática")
-    medal_logic = Medal("Medalha Lógica")
-    big_achievement = Achievement("Campeão dos Desafios")
+    # Criar conquistas (Composite)
+    medal_math = Medal("Medalha Matemática", points_required=50)
+    medal_logic = Medal("Medalha Lógica", points_required=100)
+    big_achievement = MedalCollection("Campeão dos Desafios")
     big_achievement.add(medal_math)
     big_achievement.add(medal_logic)
+    achievement_center.register_medal(medal_math)
+    achievement_center.register_medal(medal_logic)
+    achievement_center.register_collection(big_achievement)
 
-    # Adicionar conquistas para aluno
-    achievement_manager.add_achievement(aluno, medal_math)
-    achievement_manager.add_achievement(aluno, big_achievement)
+    # Conquista por regra (gamificacao.rules), com desafios concluídos do ActivityTracker
+    activity = ActivityTracker()
+    dedicated = RuleAchievement("Dedicação", rule="challenges >= 2 and points >= 50", activity=activity)
+    achievement_center.register_medal(dedicated)
 
-    # Criar desafios com Strategy
-    quiz = QuizChallenge("Quiz de Matemática", "Matemática básica", strategy=TimeBasedScoring())
+    # Criar desafios com Strategy (estratégias resolvidas pelo nome em utils.registry)
+    quiz = QuizChallenge("Quiz de Matemática", "Matemática básica", strategy="time")
     score = quiz.evaluate({"answer": "42"}, {"time": 10, "correct": True})
     aluno.add_points(score)
+    activity.record(aluno)
     print(f"{aluno.name} fez {quiz.title} e ganhou {score} pontos! Total: {aluno.points}")
+    achievement_center.check_achievements(aluno)
 
-    quiz2 = QuizChallenge("Quiz de Lógica", "Questões de lógica", strategy=DifficultyBasedScoring())
+    quiz2 = QuizChallenge("Quiz de Lógica", "Questões de lógica", strategy="difficulty")
     score2 = quiz2.evaluate({"answer": "Sim"}, {"difficulty": 3, "correct": True})
     aluno.add_points(score2)
+    activity.record(aluno)
     print(f"{aluno.name} fez {quiz2.title} e ganhou {score2} pontos! Total: {aluno.points}")
+    achievement_center.check_achievements(aluno)
 
     # Histórico de ações com Command
     history = ActionHistory()
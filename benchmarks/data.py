@@ -0,0 +1,63 @@
+"""
+Geradores de dados sintéticos para os benchmarks.
+Todos recebem uma semente para que as execuções sejam reprodutíveis.
+"""
+
+import random
+from typing import Dict, List, Tuple
+
+from gamificacao.achievements import AchievementCenter, Medal, MedalCollection
+from usuarios.user_factory import UserFactory
+
+USER_TYPES = ("aluno", "professor", "visitante")
+
+
+def make_users(count: int, seed: int = 0) -> list:
+    """N usuários de tipos variados, criados pela UserFactory."""
+    rng = random.Random(seed)
+    entries = [(rng.choice(USER_TYPES), f"usuario{i}") for i in range(count)]
+    return UserFactory().create_many(entries)
+
+
+def make_center(medals: int, collections: int, max_points: int = 10_000,
+                children: int = 5, seed: int = 0) -> AchievementCenter:
+    """AchievementCenter com M medalhas por pontos e coleções de medalhas (algumas aninhadas)."""
+    rng = random.Random(seed)
+    center = AchievementCenter()
+    registered = []
+    for i in range(medals):
+        medal = Medal(f"medalha{i}", rng.randint(0, max_points))
+        center.register_medal(medal)
+        registered.append(medal)
+    made: List[MedalCollection] = []
+    for i in range(collections):
+        collection = MedalCollection(f"colecao{i}")
+        pool = registered if not made or rng.random() < 0.8 else made
+        for child in rng.sample(pool, min(children, len(pool))):
+            collection.add(child)
+        center.register_collection(collection)
+        made.append(collection)
+    return center
+
+
+def make_submissions(count: int, seed: int = 0) -> Tuple[list, Dict[str, list]]:
+    """K submissões em formato colunar (time, difficulty, correct, accuracy)."""
+    rng = random.Random(seed)
+    columns = {
+        "time": [rng.randint(1, 150) for _ in range(count)],
+        "difficulty": [rng.randint(1, 5) for _ in range(count)],
+        "correct": [rng.random() < 0.7 for _ in range(count)],
+        "accuracy": [rng.random() for _ in range(count)],
+    }
+    submissions = [{"answer": str(rng.randint(0, 100))} for _ in range(count)]
+    return submissions, columns
+
+
+def make_report_rows(count: int, seed: int = 0) -> List[dict]:
+    """Linhas de relatório com o formato usado pela ReportFacade."""
+    rng = random.Random(seed)
+    return [
+        {"user": f"usuario{i}", "role": rng.choice(USER_TYPES), "points": rng.randint(0, 10_000),
+         "achievements": rng.randint(0, 40)}
+        for i in range(count)
+    ]
@@ -0,0 +1,140 @@
+"""
+Infraestrutura dos benchmarks: medição, baseline em JSON e detecção de regressões.
+
+Cada caso informa um setup (monta o estado), uma operação (executada `ops`
+vezes, opcionalmente por várias threads) e, se quiser, um teardown. A
+medição de tempo e a de memória são feitas em passadas separadas, porque o
+tracemalloc distorce a latência.
+"""
+
+import contextlib
+import io
+import json
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[], Any]
+    op: Callable[[Any, int], None]
+    ops: int
+    threads: int = 1
+    teardown: Optional[Callable[[Any], None]] = None
+
+
+def _percentile(sorted_values: List[int], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return float(sorted_values[index])
+
+
+def _run_ops(case: Case, state, record: bool) -> List[int]:
+    """Executa as operações do caso (dividindo entre threads) e retorna as latências em ns."""
+    per_thread = max(1, case.ops // case.threads)
+    latencies: List[List[int]] = [[] for _ in range(case.threads)]
+    barrier = threading.Barrier(case.threads)
+
+    def worker(slot: int):
+        clock = time.perf_counter_ns
+        out = latencies[slot]
+        offset = slot * per_thread
+        barrier.wait()
+        for i in range(offset, offset + per_thread):
+            start = clock()
+            case.op(state, i)
+            if record:
+                out.append(clock() - start)
+
+    if case.threads == 1:
+        worker(0)
+    else:
+        threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(case.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return [value for chunk in latencies for value in chunk]
+
+
+def measure(case: Case, with_memory: bool = True) -> Dict[str, float]:
+    """Mede throughput (ops/s), latências p50/p99 (µs) e pico de memória (KiB) de um caso."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = case.setup()
+        try:
+            started = time.perf_counter()
+            latencies = _run_ops(case, state, record=True)
+            elapsed = time.perf_counter() - started
+        finally:
+            if case.teardown:
+                case.teardown(state)
+
+        peak = 0
+        if with_memory:
+            tracemalloc.start()
+            try:
+                state = case.setup()
+                try:
+                    _run_ops(case, state, record=False)
+                finally:
+                    if case.teardown:
+                        case.teardown(state)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_us": _percentile(latencies, 0.50) / 1000,
+        "p99_us": _percentile(latencies, 0.99) / 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def environment() -> Dict[str, str]:
+    return {"python": sys.version.split()[0], "platform": platform.platform(), "machine": platform.machine()}
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=4)
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float = 0.2, latency_tolerance: float = 0.5,
+            min_latency_delta_us: float = 10.0) -> List[str]:
+    """
+    Compara com a baseline e retorna as regressões encontradas.
+    :param tolerance: Variação relativa aceita (0.2 = 20%) de throughput e memória
+    :param latency_tolerance: Variação relativa aceita do p99 (mais ruidoso que a média)
+    :param min_latency_delta_us: Aumento absoluto mínimo do p99 para contar como regressão
+        (operações de poucos µs oscilam bastante entre execuções)
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if previous["throughput"] and current["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput']:.0f} -> {current['throughput']:.0f} ops/s")
+        if (previous["p99_us"] and current["p99_us"] > previous["p99_us"] * (1 + latency_tolerance)
+                and current["p99_us"] - previous["p99_us"] >= min_latency_delta_us):
+            regressions.append(f"{name}: p99 {previous['p99_us']:.1f} -> {current['p99_us']:.1f} µs")
+        # peak_kib == 0 significa que a memória não foi medida nesta execução
+        if previous["peak_kib"] and current["peak_kib"] > previous["peak_kib"] * (1 + tolerance):
+            regressions.append(f"{name}: memória {previous['peak_kib']:.0f} -> {current['peak_kib']:.0f} KiB")
+    return regressions
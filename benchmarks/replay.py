@@ -0,0 +1,343 @@
+"""
+Replay de carga a partir de um fluxo JSONL de eventos.
+
+Cada linha é um evento:
+    {"type": "create_user", "user": "ana", "role": "aluno"}
+    {"type": "submit", "user": "ana", "challenge": "Quiz 1", "strategy": "time",
+     "context": {"time": 12, "correct": true}}
+    {"type": "check", "user": "ana"}
+    {"type": "export", "user": "ana"}
+
+Os usuários são distribuídos entre os processos por crc32 do nome, então
+todos os eventos de um usuário caem sempre no mesmo shard e em ordem. O
+processo principal só extrai o nome do usuário de cada linha (sem decodificar
+o JSON inteiro) e repassa lotes de linhas cruas; cada shard roda os eventos
+em UserFactory, Challenge.evaluate e AchievementCenter próprios. No fim, os
+resultados parciais (contagens, desbloqueios, top do leaderboard e linhas
+exportadas) são unidos em uma visão global.
+
+Uso:
+    python -m benchmarks.replay generate eventos.jsonl --users 50000 --events 1000000
+    python -m benchmarks.replay run eventos.jsonl --workers 4
+    python -m benchmarks.replay run eventos.jsonl --scaling 1,2,4,8
+    python -m benchmarks.replay run eventos.jsonl --report replay   # exporta as linhas dos eventos "export"
+"""
+
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import queue
+import random
+import re
+import sys
+import time
+import traceback
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from benchmarks import data
+from desafios.challenge import QuizChallenge
+from gamificacao.leaderboard import Leaderboard
+from usuarios.user_factory import UserFactory
+
+EVENT_TYPES = ("create_user", "submit", "check", "export")
+
+# "user": "..." em bytes; nomes com escapes (\", é) caem no json.loads
+_USER_FIELD = re.compile(rb'"user"\s*:\s*"([^"\\]*)"')
+# Intervalo (s) entre as verificações de que os shards continuam vivos
+_POLL_INTERVAL = 0.5
+
+
+def shard_of(line: bytes, shards: int) -> int:
+    """Shard de uma linha do fluxo: crc32 do nome do usuário (estável entre processos)"""
+    match = _USER_FIELD.search(line)
+    # Só é a chave do nível superior se vier antes de qualquer objeto aninhado
+    # (context, submission, ...); senão a linha é decodificada por inteiro
+    if match is not None and line.find(b"{", line.find(b"{") + 1, match.start()) == -1:
+        user = match.group(1)
+    else:
+        user = str(json.loads(line).get("user", "")).encode("utf-8")
+    return zlib.crc32(user) % shards
+
+
+class _ShardReplayer:
+    """Estado de um shard: seus usuários, desafios, centro de conquistas e leaderboard parcial."""
+
+    def __init__(self, options: dict):
+        self.options = options
+        self.factory = UserFactory()
+        self.center = data.make_center(options["medals"], options["collections"],
+                                       max_points=options["max_points"], seed=options["seed"])
+        self.leaderboard = Leaderboard(seed=options["seed"])
+        self.users: Dict[str, object] = {}
+        self.challenges: Dict[tuple, QuizChallenge] = {}
+        self.events: Counter = Counter()
+        self.unlocks: Counter = Counter()
+        self.rows: List[dict] = []
+        self.errors = 0
+
+    def _challenge(self, title: str, strategy: str) -> QuizChallenge:
+        challenge = self.challenges.get((title, strategy))
+        if challenge is None:
+            challenge = self.challenges[(title, strategy)] = QuizChallenge(title, "", strategy=strategy)
+        return challenge
+
+    def apply(self, event: dict) -> None:
+        kind = event.get("type")
+        name = event.get("user")
+        user = self.users.get(name)
+        self.events[kind] += 1
+        if kind == "create_user":
+            if user is None:
+                user = self.users[name] = self.factory.create_user(event.get("role", "aluno"), name)
+                self.leaderboard.track(user)
+        elif user is None or kind not in EVENT_TYPES:
+            self.errors += 1
+        elif kind == "submit":
+            challenge = self._challenge(event.get("challenge", "Desafio"), event.get("strategy", "time"))
+            user.add_points(challenge.evaluate(event.get("submission"), event.get("context", {})))
+        elif kind == "check":
+            self.unlocks.update(a.name for a in self.center.check_achievements(user))
+        elif self.options["keep_rows"]:
+            self.rows.append({"user": name, "role": user.role, "points": user.points,
+                              "achievements": len(user.achievements)})
+
+    def result(self) -> dict:
+        self.leaderboard.close()
+        return {
+            "events": dict(self.events),
+            "unlocks": dict(self.unlocks),
+            "users": len(self.users),
+            "points": sum(u.points for u in self.users.values()),
+            # O ranking desempata pela ordem de inserção; aqui o corte usa o nome, como no merge,
+            # para que um empate na fronteira não dependa da distribuição entre os shards
+            "top": heapq.nsmallest(self.options["top"], ((u.name, u.points) for u in self.users.values()),
+                                   key=lambda e: (-e[1], e[0])),
+            "rows": self.rows,
+            "errors": self.errors,
+        }
+
+
+def _run_shard(inbox, outbox, options: dict) -> None:
+    """Executado em cada processo: aplica os lotes recebidos até o marcador de fim (None)."""
+    try:
+        replayer = _ShardReplayer(options)
+        loads, apply = json.loads, replayer.apply
+        while True:
+            batch = inbox.get()
+            if batch is None:
+                break
+            for line in batch:
+                apply(loads(line))
+        outbox.put(replayer.result())
+    except Exception:
+        outbox.put({"failure": traceback.format_exc()})
+        # Continua consumindo para o processo principal não travar em uma fila cheia
+        while inbox.get() is not None:
+            pass
+
+
+def _put(inbox, item, process) -> None:
+    """Enfileira sem travar para sempre se o shard morrer com a fila cheia"""
+    while True:
+        try:
+            inbox.put(item, timeout=_POLL_INTERVAL)
+            return
+        except queue.Full:
+            if not process.is_alive():
+                raise RuntimeError(f"{process.name} encerrou inesperadamente (exitcode {process.exitcode})")
+
+
+def _collect(outbox, processes) -> List[dict]:
+    """
+    Recolhe um resultado por shard. Um processo morto sem ter respondido (ex.: OOM-kill)
+    interrompe a espera com RuntimeError em vez de travar o processo principal.
+    """
+    partials = []
+    while len(partials) < len(processes):
+        try:
+            partials.append(outbox.get(timeout=_POLL_INTERVAL))
+            continue
+        except queue.Empty:
+            pass
+        crashed = [p for p in processes if p.exitcode not in (None, 0)]
+        if crashed or not any(p.is_alive() for p in processes):
+            # Um último get: o resultado pode ter chegado entre o timeout e a verificação
+            try:
+                partials.append(outbox.get(timeout=_POLL_INTERVAL))
+                continue
+            except queue.Empty:
+                pass
+            details = ", ".join(f"{p.name} (exitcode {p.exitcode})" for p in crashed) or "todos os shards"
+            raise RuntimeError(f"Shard encerrou sem enviar resultado: {details}")
+    return partials
+
+
+def merge(partials: Iterable[dict], top: int = 10) -> dict:
+    """Une os resultados dos shards (os usuários de cada shard são disjuntos)"""
+    merged = {"events": Counter(), "unlocks": Counter(), "users": 0, "points": 0, "top": [], "rows": [],
+              "errors": 0}
+    tops = []
+    for partial in partials:
+        merged["events"].update(partial["events"])
+        merged["unlocks"].update(partial["unlocks"])
+        merged["users"] += partial["users"]
+        merged["points"] += partial["points"]
+        merged["rows"].extend(partial["rows"])
+        merged["errors"] += partial["errors"]
+        tops.append(partial["top"])
+    # Empates desempatados pelo nome: o resultado não depende da quantidade de shards
+    merged["top"] = heapq.nsmallest(top, (entry for entries in tops for entry in entries),
+                                    key=lambda e: (-e[1], e[0]))
+    return merged
+
+
+def replay(filename: str, workers: int = None, batch_size: int = 2_000, top: int = 10,
+           medals: int = 200, collections: int = 40, max_points: int = 10_000, seed: int = 0,
+           keep_rows: bool = False) -> dict:
+    """
+    Reproduz o fluxo com um processo por shard.
+    :param workers: Quantidade de shards/processos (padrão: número de CPUs)
+    :param batch_size: Linhas por lote enviado a um shard
+    :param medals: Medalhas do catálogo sintético (igual em todos os shards)
+    :param collections: Coleções do catálogo sintético
+    :param keep_rows: Guarda as linhas dos eventos "export" para gerar o relatório
+    :return: Visão global, com "elapsed" (s) e "rate" (eventos/s)
+    """
+    workers = workers or os.cpu_count() or 1
+    options = {"medals": medals, "collections": collections, "max_points": max_points, "seed": seed,
+               "top": top, "keep_rows": keep_rows}
+    context = multiprocessing.get_context()
+    inboxes = [context.Queue(maxsize=8) for _ in range(workers)]
+    outbox = context.Queue()
+    processes = [context.Process(target=_run_shard, args=(inbox, outbox, options), name=f"replay-shard-{i}",
+                                 daemon=True) for i, inbox in enumerate(inboxes)]
+    for process in processes:
+        process.start()
+
+    started = time.perf_counter()
+    partials = None
+    try:
+        batches: List[List[bytes]] = [[] for _ in range(workers)]
+        with open(filename, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                shard = shard_of(line, workers)
+                batch = batches[shard]
+                batch.append(line)
+                if len(batch) >= batch_size:
+                    _put(inboxes[shard], batch, processes[shard])
+                    batches[shard] = []
+        for inbox, batch, process in zip(inboxes, batches, processes):
+            if batch:
+                _put(inbox, batch, process)
+        for inbox, process in zip(inboxes, processes):
+            _put(inbox, None, process)
+        partials = _collect(outbox, processes)
+    finally:
+        if partials is None:
+            for process in processes:
+                process.terminate()
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+
+    failures = [p["failure"] for p in partials if "failure" in p]
+    if failures:
+        raise RuntimeError(f"Falha em {len(failures)} shard(s):\n{failures[0]}")
+    result = merge(partials, top)
+    total = sum(result["events"].values())
+    result.update(workers=workers, elapsed=elapsed, rate=total / elapsed if elapsed else 0.0)
+    return result
+
+
+def generate(filename: str, users: int, events: int, seed: int = 0) -> None:
+    """Gera um fluxo sintético: cria todos os usuários e depois mistura envios, verificações e exportações"""
+    rng = random.Random(seed)
+    names = [f"usuario{i}" for i in range(users)]
+    strategies = {
+        "time": lambda: {"time": rng.randint(1, 150), "correct": rng.random() < 0.7},
+        "difficulty": lambda: {"difficulty": rng.randint(1, 5), "correct": rng.random() < 0.7},
+        "accuracy": lambda: {"accuracy": round(rng.random(), 2)},
+    }
+    with open(filename, "w", encoding="utf-8") as f:
+        for name in names:
+            f.write(json.dumps({"type": "create_user", "user": name, "role": rng.choice(data.USER_TYPES)}) + "\n")
+        for _ in range(max(0, events - users)):
+            name = rng.choice(names)
+            roll = rng.random()
+            if roll < 0.70:
+                strategy = rng.choice(tuple(strategies))
+                event = {"type": "submit", "user": name, "challenge": f"Quiz {rng.randint(1, 20)}",
+                         "strategy": strategy, "context": strategies[strategy]()}
+            elif roll < 0.95:
+                event = {"type": "check", "user": name}
+            else:
+                event = {"type": "export", "user": name}
+            f.write(json.dumps(event) + "\n")
+    print(f"[Replay] {max(events, users)} eventos gravados em {os.path.abspath(filename)}")
+
+
+def _print_result(result: dict, top: int) -> None:
+    total = sum(result["events"].values())
+    print(f"[Replay] {total} eventos em {result['elapsed']:.2f} s com {result['workers']} processo(s): "
+          f"{result['rate']:,.0f} eventos/s")
+    print(f"  usuários: {result['users']}  pontos: {result['points']}  desbloqueios: "
+          f"{sum(result['unlocks'].values())}  eventos inválidos: {result['errors']}")
+    print("  por tipo: " + ", ".join(f"{k}={v}" for k, v in sorted(result["events"].items(), key=str)))
+    print(f"  top {top}: " + ", ".join(f"{name} ({points})" for name, points in result["top"]))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay de carga da Plataforma Gamificada")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Gera um fluxo JSONL sintético")
+    gen.add_argument("filename")
+    gen.add_argument("--users", type=int, default=10_000)
+    gen.add_argument("--events", type=int, default=200_000)
+    gen.add_argument("--seed", type=int, default=0)
+
+    run = commands.add_parser("run", help="Reproduz um fluxo JSONL")
+    run.add_argument("filename")
+    run.add_argument("--workers", type=int, help="Processos (padrão: número de CPUs)")
+    run.add_argument("--scaling", help="Lista de quantidades de processos (ex.: 1,2,4,8) para medir a eficiência")
+    run.add_argument("--batch-size", type=int, default=2_000)
+    run.add_argument("--top", type=int, default=10)
+    run.add_argument("--medals", type=int, default=200)
+    run.add_argument("--collections", type=int, default=40)
+    run.add_argument("--report", help="Prefixo dos relatórios com as linhas dos eventos export")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        generate(args.filename, args.users, args.events, args.seed)
+        return 0
+
+    options = {"batch_size": args.batch_size, "top": args.top, "medals": args.medals,
+               "collections": args.collections}
+    if not args.scaling:
+        result = replay(args.filename, args.workers, keep_rows=bool(args.report), **options)
+        _print_result(result, args.top)
+        if args.report:
+            from relatorios.facade import ReportFacade
+
+            ReportFacade().export_all(iter(result["rows"]), prefix=args.report)
+        return 0
+
+    baseline: Optional[float] = None
+    print(f"{'processos':>9} {'eventos/s':>12} {'speedup':>8} {'eficiência':>11}")
+    for workers in (int(n) for n in args.scaling.split(",")):
+        result = replay(args.filename, workers, **options)
+        if baseline is None:
+            baseline = result["rate"] / workers
+        speedup = result["rate"] / baseline
+        print(f"{workers:>9} {result['rate']:>12,.0f} {speedup:>7.2f}x {speedup / workers:>10.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
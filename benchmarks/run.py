@@ -0,0 +1,313 @@
+"""
+Suíte de benchmarks dos caminhos críticos da plataforma.
+
+Uso:
+    python -m benchmarks.run                      # executa e mostra a tabela
+    python -m benchmarks.run --save base.json     # salva uma baseline
+    python -m benchmarks.run --baseline base.json # compara e falha (código 1) se houver regressão
+    python -m benchmarks.run --profile full --only achievements
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks import data
+from benchmarks.harness import Case, compare, load_baseline, measure, save_baseline
+from desafios.challenge import QuizChallenge
+from desafios.scoring_strategy import AccuracyBasedScoring, DifficultyBasedScoring, TimeBasedScoring
+from gamificacao.rules import ActivityTracker, RuleAchievement, store_columns, sweep
+from historico.command import ActionHistory, LogAction
+from historico.command_log import CommandLog
+from persistencia.sqlite_repository import SQLiteRepository
+from relatorios.facade import ReportFacade
+from session import Session
+from usuarios.locks import USER_LOCKS, StripedLocks
+from usuarios.transactions import AwardBatch
+from usuarios.user import User
+from usuarios.user_store import UserStore
+
+PROFILES = {
+    # usuários, medalhas, coleções, submissões, linhas de relatório, escala de operações
+    "quick": {"users": 2_000, "medals": 500, "collections": 100, "submissions": 20_000, "rows": 2_000, "scale": 1},
+    "full": {"users": 50_000, "medals": 5_000, "collections": 1_000, "submissions": 200_000, "rows": 20_000, "scale": 10},
+}
+
+
+def achievement_cases(p) -> List[Case]:
+    def setup():
+        rng = random.Random(1)
+        users = data.make_users(p["users"], seed=1)
+        center = data.make_center(p["medals"], p["collections"], seed=1)
+        deltas = [rng.randint(0, 200) for _ in range(4096)]
+        return users, center, deltas
+
+    def op(state, i):
+        users, center, deltas = state
+        user = users[i % len(users)]
+        user.add_points(deltas[i % len(deltas)])
+        center.check_achievements(user)
+
+    return [Case("achievements.check_achievements", setup, op, ops=20_000 * p["scale"])]
+
+
+def challenge_cases(p) -> List[Case]:
+    cases = []
+    for strategy in (TimeBasedScoring, DifficultyBasedScoring, AccuracyBasedScoring):
+        def setup(strategy=strategy):
+            submissions, columns = data.make_submissions(p["submissions"], seed=2)
+            rows = [{name: column[i] for name, column in columns.items()} for i in range(len(submissions))]
+            return QuizChallenge("Benchmark", "", strategy()), submissions, rows
+
+        def op(state, i):
+            quiz, submissions, rows = state
+            k = i % len(rows)
+            quiz.evaluate(submissions[k], rows[k])
+
+        def batch_setup(strategy=strategy):
+            submissions, columns = data.make_submissions(p["submissions"], seed=2)
+            return QuizChallenge("Benchmark", "", strategy()), submissions, columns
+
+        def batch_op(state, i):
+            quiz, submissions, columns = state
+            quiz.evaluate_batch(submissions, columns)
+
+        cases.append(Case(f"challenge.evaluate.{strategy.__name__}", setup, op, ops=p["submissions"]))
+        cases.append(Case(f"challenge.evaluate_batch.{strategy.__name__}", batch_setup, batch_op, ops=5))
+    return cases
+
+
+def report_cases(p) -> List[Case]:
+    cases = []
+    for fmt, ops in (("csv", 10), ("json", 10), ("pdf", 2)):
+        def setup(fmt=fmt):
+            return ReportFacade(), data.make_report_rows(p["rows"] if fmt != "pdf" else p["rows"] // 10, seed=3), tempfile.mkdtemp()
+
+        def op(state, i, fmt=fmt):
+            facade, rows, directory = state
+            getattr(facade, f"export_{fmt}")(rows, os.path.join(directory, f"bench_{i}.{fmt}"))
+
+        def teardown(state):
+            shutil.rmtree(state[2], ignore_errors=True)
+
+        cases.append(Case(f"report.export_{fmt}", setup, op, ops=ops, teardown=teardown))
+    return cases
+
+
+def session_cases(p) -> List[Case]:
+    cases = []
+    for threads in (1, 8):
+        def setup():
+            return Session(), [f"usuario{i}" for i in range(p["users"])]
+
+        def op(state, i):
+            session, names = state
+            name = names[i % len(names)]
+            session.add_user(name)
+            session.log_action((name, i))
+            if i % 4 == 0:
+                session.remove_user(name)
+
+        cases.append(Case(f"session.add_user_log_action.{threads}t", setup, op,
+                          ops=40_000 * p["scale"], threads=threads))
+    return cases
+
+
+def history_cases(p) -> List[Case]:
+    def setup():
+        return ActionHistory(verbose=False)
+
+    def op(history, i):
+        history.execute(LogAction(f"ação {i}"))
+        if i % 2:
+            history.undo_last()
+
+    def log_setup():
+        directory = tempfile.mkdtemp()
+        log = CommandLog(directory, segment_bytes=1024 * 1024)
+        return ActionHistory(log=log, user="usuario0", verbose=False), log, directory
+
+    def log_op(state, i):
+        op(state[0], i)
+
+    def log_teardown(state):
+        state[1].close()
+        shutil.rmtree(state[2], ignore_errors=True)
+
+    return [
+        Case("history.execute_undo", setup, op, ops=50_000 * p["scale"]),
+        Case("history.execute_undo.command_log", log_setup, log_op, ops=20_000 * p["scale"], teardown=log_teardown),
+    ]
+
+
+def persistence_cases(p) -> List[Case]:
+    def setup():
+        directory = tempfile.mkdtemp()
+        repository = SQLiteRepository(os.path.join(directory, "bench.db"), batch_size=1_000, flush_interval=0)
+        users = data.make_users(p["users"], seed=4)
+        repository.save_users(users)
+        User.subscribe_points(repository)
+        return repository, users, directory
+
+    def op(state, i):
+        users = state[1]
+        users[i % len(users)].add_points(1)
+
+    def teardown(state):
+        User.unsubscribe_points(state[0])
+        state[0].close()
+        shutil.rmtree(state[2], ignore_errors=True)
+
+    return [Case("persistence.award_points", setup, op, ops=100_000 * p["scale"], teardown=teardown)]
+
+
+class _WriteThrough:
+    """Observer de pontos que simula uma gravação síncrona (libera o GIL, como E/S real)."""
+
+    def points_changed(self, user, old_points, new_points):
+        time.sleep(0.0001)
+
+
+def transaction_cases(p) -> List[Case]:
+    """
+    Lotes de dois usuários: locks particionados (padrão) contra um único lock global.
+    Nos casos .io a seção crítica inclui uma gravação síncrona; com o lock global
+    ela serializa todas as threads, com os locks particionados elas se sobrepõem.
+    """
+    cases = []
+    for io in (False, True):
+        for label, locks in (("striped", USER_LOCKS), ("global", StripedLocks(1))):
+            for threads in (1, 8):
+                def setup(locks=locks, io=io):
+                    rng = random.Random(5)
+                    users = data.make_users(p["users"], seed=5)
+                    pairs = [tuple(rng.sample(users, 2)) for _ in range(4096)]
+                    center = data.make_center(p["medals"] // 10, p["collections"] // 10, seed=5)
+                    observer = _WriteThrough() if io else None
+                    if observer is not None:
+                        User.subscribe_points(observer)
+                    return pairs, center, locks, observer
+
+                def op(state, i):
+                    pairs, center, locks, _ = state
+                    giver, receiver = pairs[i % len(pairs)]
+                    batch = AwardBatch(center, locks=locks)
+                    batch.add(giver, -1)
+                    batch.add(receiver, 5)
+                    batch.commit()
+
+                def teardown(state):
+                    if state[3] is not None:
+                        User.unsubscribe_points(state[3])
+
+                suffix = ".io" if io else ""
+                cases.append(Case(f"transactions.award_batch{suffix}.{label}.{threads}t", setup, op,
+                                  ops=(2_000 if io else 20_000) * p["scale"], threads=threads, teardown=teardown))
+    return cases
+
+
+_RULES = (
+    'points >= 500 and challenges >= 10 and (streak >= 7 or role == "Professor")',
+    'role in ("Aluno", "Visitante") and points >= 900',
+    'not achievements > 0 and points < 50',
+)
+
+
+def rule_cases(p) -> List[Case]:
+    """Regras de conquista: avaliação por usuário (closures) contra a varredura vetorizada."""
+    size = p["users"] * 50
+
+    def setup():
+        rng = random.Random(6)
+        store = UserStore()
+        for i in range(size):
+            store.append(f"usuario{i}", rng.choice(("Aluno", "Professor", "Visitante")), rng.randint(0, 1000))
+        activity = ActivityTracker()
+        for view in list(store)[:size // 10]:
+            for day in range(rng.randint(1, 12)):
+                activity.record(view, 738_000 + day)
+        achievements = [RuleAchievement(f"Regra {i}", rule=text, activity=activity) for i, text in enumerate(_RULES)]
+        return store, activity, achievements, list(store)
+
+    def op(state, i):
+        _, _, achievements, views = state
+        user = views[i % len(views)]
+        for achievement in achievements:
+            achievement.is_unlocked(user)
+
+    def sweep_op(state, i):
+        store, activity, achievements, _ = state
+        fields = set().union(*(a.compiled.fields for a in achievements))
+        sweep(achievements, store_columns(store, fields, activity))
+
+    return [
+        Case("rules.is_unlocked", setup, op, ops=50_000 * p["scale"]),
+        Case(f"rules.sweep.{size}_users", setup, sweep_op, ops=20),
+    ]
+
+
+SUITES = {
+    "achievements": achievement_cases,
+    "challenge": challenge_cases,
+    "report": report_cases,
+    "session": session_cases,
+    "history": history_cases,
+    "persistence": persistence_cases,
+    "transactions": transaction_cases,
+    "rules": rule_cases,
+}
+
+
+def run(profile: str = "quick", only: List[str] = None, with_memory: bool = True) -> Dict[str, Dict[str, float]]:
+    params = PROFILES[profile]
+    results = {}
+    for suite, build in SUITES.items():
+        if only and suite not in only:
+            continue
+        for case in build(params):
+            results[case.name] = measure(case, with_memory=with_memory)
+            print(_format_row(case.name, results[case.name]), flush=True)
+    return results
+
+
+def _format_row(name: str, result: Dict[str, float]) -> str:
+    return (f"{name:<48} {result['throughput']:>12.0f} ops/s  p50 {result['p50_us']:>9.1f} µs  "
+            f"p99 {result['p99_us']:>9.1f} µs  pico {result['peak_kib']:>9.0f} KiB")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks da Plataforma Gamificada")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", nargs="*", choices=sorted(SUITES), help="Executa apenas as suítes indicadas")
+    parser.add_argument("--save", help="Salva os resultados como baseline (JSON)")
+    parser.add_argument("--baseline", help="Compara com uma baseline salva e sinaliza regressões")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Variação aceita de throughput e memória antes de sinalizar (0.2 = 20%%)")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5, help="Variação aceita do p99")
+    parser.add_argument("--no-memory", action="store_true", help="Pula a passada de medição de memória")
+    args = parser.parse_args(argv)
+
+    print(f"=== Benchmarks ({args.profile}) ===")
+    results = run(args.profile, args.only, with_memory=not args.no_memory)
+
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"Baseline salva em {os.path.abspath(args.save)}")
+    if args.baseline:
+        regressions = compare(results, load_baseline(args.baseline), args.tolerance, args.latency_tolerance)
+        if regressions:
+            print("Regressões encontradas:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("Nenhuma regressão em relação à baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Orçamento de inicialização por ponto de entrada.
+
+Cada ponto de entrada roda em um interpretador novo, que mede o tempo de
+importação (e do trabalho mínimo do ponto de entrada), o crescimento do RSS
+e quantos módulos foram carregados. Com --check, falha (código 1) quando
+algum ponto de entrada estoura o orçamento.
+
+Uso:
+    python -m benchmarks.startup                 # tabela com a mediana de 5 execuções
+    python -m benchmarks.startup --check         # compara com BUDGETS
+    python -m benchmarks.startup --detail scoring_worker   # módulos mais lentos (-X importtime)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# nome -> código executado no interpretador novo
+ENTRY_POINTS = {
+    "scoring_worker": (
+        "from desafios.challenge import QuizChallenge\n"
+        "QuizChallenge('q', '', strategy='time').evaluate(None, {'time': 10, 'correct': True})"
+    ),
+    "achievements": "from gamificacao.achievements import AchievementCenter",
+    "user_factory": "from usuarios.user_factory import UserFactory\nUserFactory().create_user('aluno', 'x')",
+    "session": "from session import Session",
+    "report_facade": "from relatorios.facade import ReportFacade",
+    "report_pdf": "from relatorios.facade import ReportFacade\nimport fpdf",
+    "persistence": "from persistencia.sqlite_repository import SQLiteRepository",
+    "points_ledger": "from historico.points_ledger import PointsLedger",
+    "app": "import app",
+}
+
+# Orçamento por ponto de entrada: (milissegundos, KiB de RSS)
+BUDGETS = {
+    "scoring_worker": (80, 8_192),
+    "achievements": (80, 8_192),
+    "user_factory": (60, 6_144),
+    "session": (50, 6_144),
+    "report_facade": (80, 8_192),
+    "report_pdf": (200, 24_576),
+    "persistence": (120, 12_288),
+    "points_ledger": (60, 6_144),
+    "app": (150, 12_288),
+}
+
+_PROBE = """
+import os, sys, time
+
+
+def rss_kib():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:  # fora do Linux: pico de RSS
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+modules, rss = len(sys.modules), rss_kib()
+started = time.perf_counter()
+exec(compile(sys.argv[1], "<entry>", "exec"))
+elapsed = time.perf_counter() - started
+result = {"ms": elapsed * 1000, "rss_kib": rss_kib() - rss, "modules": len(sys.modules) - modules}
+import json
+print(json.dumps(result))
+"""
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    env.pop("PLATAFORMA_METRICS", None)
+    return subprocess.run([sys.executable, *flags, "-c", _PROBE, code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def measure(name: str, repeat: int = 5) -> Dict[str, float]:
+    """Mediana de `repeat` execuções do ponto de entrada, cada uma em um processo novo"""
+    runs = [json.loads(_run(ENTRY_POINTS[name]).stdout.splitlines()[-1]) for _ in range(repeat)]
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def slowest_imports(name: str, top: int = 15) -> List[tuple]:
+    """Módulos com maior tempo acumulado de importação (µs), via -X importtime"""
+    stderr = _run(ENTRY_POINTS[name], "-X", "importtime").stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        entries.append((int(cumulative), module.rstrip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tempo de importação e memória por ponto de entrada")
+    parser.add_argument("--only", nargs="*", choices=sorted(ENTRY_POINTS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="Falha se algum ponto de entrada estourar BUDGETS")
+    parser.add_argument("--detail", choices=sorted(ENTRY_POINTS), help="Lista as importações mais lentas")
+    args = parser.parse_args(argv)
+
+    if args.detail:
+        for cumulative, module in slowest_imports(args.detail):
+            print(f"{cumulative / 1000:9.1f} ms  {module}")
+        return 0
+
+    over = []
+    print(f"{'ponto de entrada':<18} {'tempo':>10} {'RSS':>11} {'módulos':>8}   orçamento")
+    for name in args.only or ENTRY_POINTS:
+        result = measure(name, args.repeat)
+        budget_ms, budget_kib = BUDGETS[name]
+        status = "ok" if result["ms"] <= budget_ms and result["rss_kib"] <= budget_kib else "ESTOUROU"
+        if status != "ok":
+            over.append(name)
+        print(f"{name:<18} {result['ms']:7.1f} ms {result['rss_kib']:7.0f} KiB {result['modules']:8.0f}   "
+              f"{budget_ms} ms / {budget_kib} KiB {status}")
+
+    if args.check and over:
+        print(f"Orçamento de inicialização estourado: {', '.join(over)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Benchmark de memória por usuário.
+
+Compara o custo (em bytes por usuário, medido com tracemalloc) de:
+- objetos no formato antigo (com __dict__ e role por instância);
+- objetos User com __slots__;
+- linhas de um UserStore colunar.
+
+Uso: python -m benchmarks.user_memory [quantidade]
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from usuarios.user_factory import UserFactory
+from usuarios.user_store import UserStore
+
+
+class _DictUser:
+    """Reprodução do formato anterior de User, para comparação."""
+
+    def __init__(self, name: str, role: str):
+        self.name = name
+        self.points = 0
+        self.achievements = []
+        self.role = role
+
+
+def _entries(count: int):
+    types = ("aluno", "professor", "visitante")
+    return [(types[i % 3], f"usuario{i}") for i in range(count)]
+
+
+def _measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def run(count: int = 100_000) -> dict:
+    """Retorna os bytes por usuário de cada representação (nomes já alocados ficam de fora)."""
+    entries = _entries(count)
+    factory = UserFactory()
+    results = {
+        "dict_user": _measure(lambda: [_DictUser(name, t.capitalize()) for t, name in entries]),
+        "slots_user": _measure(lambda: factory.create_many(entries)),
+        "user_store": _measure(lambda: (lambda s: (s, factory.create_many(entries, store=s)))(UserStore())),
+    }
+    return {key: value / count for key, value in results.items()}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    results = run(count)
+    print(f"Memória por usuário ({count} usuários):")
+    for key, value in results.items():
+        print(f"  {key:<12} {value:8.1f} bytes")
+
+
+if __name__ == "__main__":
+    main()
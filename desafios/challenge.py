@@ -2,15 +2,30 @@
 Módulo de definição de desafios (ex.: quizzes, exercícios de código).
 Usa Strategy para calcular pontuação de acordo com regras diferentes.
 """
+from collections.abc import MutableSequence
+from typing import Dict, List, NamedTuple, Set, Tuple, Union
+
+from desafios.question_bank import QuestionBank
 from desafios.scoring_strategy import ScoringStrategy
+from utils.metrics import metrics
+from utils.registry import scoring_strategies
+
+_EVALUATE = metrics.histogram("challenge_evaluate_seconds", "Duração de Challenge.evaluate")
+_EVALUATE_BATCH = metrics.histogram("challenge_evaluate_batch_seconds", "Duração de Challenge.evaluate_batch")
+_BATCH_SUBMISSIONS = metrics.counter("challenge_batch_submissions_total", "Submissões avaliadas em lote")
 
 
 class Challenge:
-    def __init__(self, title: str, description: str, strategy: ScoringStrategy):
+    def __init__(self, title: str, description: str, strategy: Union[ScoringStrategy, str]):
+        """
+        :param strategy: Instância de ScoringStrategy ou nome registrado em
+            utils.registry.scoring_strategies (ex.: "time", "difficulty")
+        """
         self.title = title
         self.description = description
-        self.strategy = strategy
+        self.strategy = scoring_strategies.create(strategy) if isinstance(strategy, str) else strategy
 
+    @_EVALUATE.timed
     def evaluate(self, submission, context) -> int:
         """
         Avalia a submissão usando a estratégia de pontuação configurada.
@@ -20,16 +35,168 @@ class Challenge:
         """
         return self.strategy.calculate_score(submission, context)
 
+    @_EVALUATE_BATCH.timed
+    def evaluate_batch(self, submissions, columns) -> list:
+        """
+        Avalia um lote de submissões de uma só vez (ex.: turma inteira ao fim de uma prova).
+        :param submissions: Sequência de respostas (ou None quando a estratégia não as usa)
+        :param columns: Dicionário coluna -> sequência (ex.: time, difficulty, correct, accuracy)
+        :return: Lista de pontos, na mesma ordem das submissões
+        """
+        scores = self.strategy.calculate_scores(submissions, columns)
+        _BATCH_SUBMISSIONS.inc(len(scores))
+        return scores
+
+
+class GradeResult(NamedTuple):
+    correct: int
+    total: int
+    accuracy: float
+    answers: Tuple[bool, ...]  # acerto por questão, na ordem do quiz
+
+    def context(self) -> dict:
+        """Contexto pronto para as estratégias de pontuação (accuracy e correct)"""
+        return {"accuracy": self.accuracy, "correct": self.total > 0 and self.correct == self.total}
+
+
+class _QuizQuestions(MutableSequence):
+    """
+    Lista das questões do quiz no formato {"question", "answer"}; alterações
+    (append, insert, remoção, atribuição) passam para o quiz e o banco. Questões
+    cadastradas por esta lista saem do banco quando deixam o quiz.
+    """
+
+    __slots__ = ("_quiz",)
+
+    def __init__(self, quiz: "QuizChallenge"):
+        self._quiz = quiz
+
+    def _as_dict(self, question_id: str) -> dict:
+        question = self._quiz.bank.get(question_id)
+        return {"question": question.text, "answer": question.answer}
+
+    def _register(self, item) -> str:
+        try:
+            question_id = self._quiz.bank.add(item["question"], item["answer"])
+        except (TypeError, KeyError):
+            raise TypeError('Questões devem ser dicionários com "question" e "answer".') from None
+        self._quiz._listed_ids.add(question_id)
+        return question_id
+
+    def _release(self, question_ids) -> None:
+        """Tira do banco as questões desta lista que não estão mais no quiz"""
+        quiz = self._quiz
+        for question_id in question_ids:
+            if question_id in quiz._listed_ids and question_id not in quiz.question_ids:
+                quiz._listed_ids.discard(question_id)
+                quiz.bank.remove(question_id)
+
+    def __len__(self) -> int:
+        return len(self._quiz.question_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._as_dict(q) for q in self._quiz.question_ids[index]]
+        return self._as_dict(self._quiz.question_ids[index])
+
+    def __setitem__(self, index, item):
+        ids = self._quiz.question_ids
+        if isinstance(index, slice):
+            replaced = ids[index]
+            ids[index] = [self._register(i) for i in item]
+        else:
+            replaced = [ids[index]]
+            ids[index] = self._register(item)
+        self._release(replaced)
+
+    def __delitem__(self, index):
+        ids = self._quiz.question_ids
+        removed = ids[index] if isinstance(index, slice) else [ids[index]]
+        del ids[index]
+        self._release(removed)
+
+    def insert(self, index: int, item) -> None:
+        self._quiz.question_ids.insert(index, self._register(item))
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other) if isinstance(other, (list, _QuizQuestions)) else NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
 
 class QuizChallenge(Challenge):
-    def __init__(self, title: str, description: str, strategy: ScoringStrategy):
+    def __init__(self, title: str, description: str, strategy: Union[ScoringStrategy, str], bank: QuestionBank = None):
+        """
+        :param bank: Banco de questões (ex.: QuestionBank.shared("algoritmos")); por padrão, um banco próprio
+        """
         super().__init__(title, description, strategy)
-        self.questions = []
+        self.bank = bank if bank is not None else QuestionBank(title)
+        self.question_ids: List[str] = []
+        # Questões cadastradas via `questions` (removidas do banco quando saem do quiz)
+        self._listed_ids: Set[str] = set()
+
+    @property
+    def questions(self) -> _QuizQuestions:
+        """Questões do quiz no formato {"question", "answer"} (mutável, como uma lista)"""
+        return _QuizQuestions(self)
 
-    def add_question(self, question, answer):
-        """Adiciona uma questão ao quiz"""
-        self.questions.append({"question": question, "answer": answer})
+    @questions.setter
+    def questions(self, items) -> None:
+        """Substitui todas as questões (quiz.questions = [{"question": ..., "answer": ...}, ...])"""
+        _QuizQuestions(self)[:] = list(items)
+
+    def add_question(self, question, answer, question_id: str = None, alternatives=()) -> str:
+        """Adiciona uma questão ao quiz (e ao banco) e retorna seu ID"""
+        question_id = self.bank.add(question, answer, question_id, alternatives)
+        self.question_ids.append(question_id)
+        return question_id
+
+    def use_question(self, question_id: str):
+        """Inclui no quiz uma questão que já existe no banco"""
+        if question_id not in self.bank:
+            raise KeyError(f"Questão {question_id} não existe no banco {self.bank.name}.")
+        self.question_ids.append(question_id)
 
     def check_answer(self, submission, correct_answer) -> bool:
         """Verifica se a resposta está correta"""
         return submission == correct_answer
+
+    def grade(self, submissions) -> GradeResult:
+        """
+        Corrige uma folha de respostas inteira em uma passada.
+        :param submissions: Dicionário ID da questão -> resposta, ou sequência na ordem do quiz
+            (questões sem resposta contam como erro)
+        """
+        get = self.bank.get
+        if isinstance(submissions, dict):
+            answers = tuple(get(qid).check(submissions.get(qid)) for qid in self.question_ids)
+        else:
+            answers = tuple(get(qid).check(sub) for qid, sub in zip(self.question_ids, submissions))
+            answers += (False,) * (len(self.question_ids) - len(answers))
+        correct = sum(answers)
+        total = len(self.question_ids)
+        return GradeResult(correct, total, correct / total if total else 0.0, answers)
+
+    def grade_batch(self, sheets) -> Dict[str, list]:
+        """
+        Corrige várias folhas de respostas contra o mesmo quiz.
+        :return: Colunas {"accuracy", "correct", "correct_count"}, prontas para evaluate_batch(None, colunas)
+        """
+        questions = [self.bank.get(qid) for qid in self.question_ids]
+        total = len(questions)
+        accuracy, all_correct, counts = [], [], []
+        for sheet in sheets:
+            if isinstance(sheet, dict):
+                correct = sum(q.check(sheet.get(q.id)) for q in questions)
+            else:
+                correct = sum(q.check(sub) for q, sub in zip(questions, sheet))
+            counts.append(correct)
+            accuracy.append(correct / total if total else 0.0)
+            all_correct.append(total > 0 and correct == total)
+        return {"accuracy": accuracy, "correct": all_correct, "correct_count": counts}
+
+    def evaluate_sheet(self, submissions, context: dict = None) -> int:
+        """Corrige a folha de respostas e calcula os pontos com a estratégia do quiz"""
+        result = self.grade(submissions)
+        return self.evaluate(submissions, {**(context or {}), **result.context()})
@@ -0,0 +1,127 @@
+"""
+Banco de questões indexado por ID.
+
+As respostas aceitas são normalizadas (maiúsculas/minúsculas, acentos e
+espaços) uma única vez, no cadastro, e guardadas em um conjunto: conferir
+uma resposta é uma busca O(1). Bancos compartilhados (ex.: o banco de uma
+disciplina usado por vários quizzes) são carregados uma vez e reutilizados
+via QuestionBank.shared().
+"""
+
+import json
+import numbers
+import threading
+import unicodedata
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Iterator, Optional
+
+
+@lru_cache(maxsize=65_536)
+def _normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+def _number_text(number) -> str:
+    """Texto de um número independente do tipo (1, 1.0 e Decimal("1.00") viram "1")"""
+    if isinstance(number, numbers.Integral):
+        return str(int(number))
+    value = float(number)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def normalize_answer(answer) -> str:
+    """Forma canônica de uma resposta: sem acentos, minúsculas e espaços simples ("  São Paulo " -> "sao paulo")"""
+    if type(answer) is str:
+        return _normalize_text(answer)
+    if isinstance(answer, (numbers.Real, Decimal)) and not isinstance(answer, bool):
+        return _number_text(answer)
+    # O cache recebe sempre texto: respostas não "hasheáveis" (ex.: listas) também funcionam
+    return _normalize_text(str(answer))
+
+
+@dataclass(frozen=True)
+class Question:
+    id: str
+    text: str
+    answer: object
+    accepted: FrozenSet[str]
+
+    def check(self, submission) -> bool:
+        return submission is not None and normalize_answer(submission) in self.accepted
+
+
+class QuestionBank:
+    """Questões indexadas por ID, com respostas pré-normalizadas."""
+
+    _shared: Dict[str, "QuestionBank"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._questions: Dict[str, Question] = {}
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._questions)
+
+    def __contains__(self, question_id) -> bool:
+        return question_id in self._questions
+
+    def __iter__(self) -> Iterator[Question]:
+        return iter(self._questions.values())
+
+    def add(self, text: str, answer, question_id: str = None, alternatives: Iterable = ()) -> str:
+        """
+        Cadastra uma questão e retorna seu ID.
+        :param answer: Resposta correta
+        :param question_id: ID desejado (padrão: gerado, ex.: "q1")
+        :param alternatives: Outras respostas também aceitas (ex.: "SP" para "São Paulo")
+        """
+        if question_id is None:
+            while f"q{self._next_id}" in self._questions:
+                self._next_id += 1
+            question_id = f"q{self._next_id}"
+            self._next_id += 1
+        accepted = frozenset(normalize_answer(a) for a in (answer, *alternatives))
+        self._questions[question_id] = Question(question_id, text, answer, accepted)
+        return question_id
+
+    def get(self, question_id) -> Optional[Question]:
+        return self._questions.get(question_id)
+
+    def remove(self, question_id) -> None:
+        """Remove uma questão do banco (ID desconhecido é ignorado)"""
+        self._questions.pop(question_id, None)
+
+    def check(self, question_id, submission) -> bool:
+        """Confere a resposta de uma questão; ID desconhecido gera KeyError"""
+        return self._questions[question_id].check(submission)
+
+    @classmethod
+    def load(cls, filename: str, name: str = "") -> "QuestionBank":
+        """
+        Carrega um banco de um arquivo JSON no formato
+        [{"id": "q1", "question": "...", "answer": "...", "alternatives": [...]}, ...]
+        """
+        bank = cls(name or filename)
+        with open(filename, "r", encoding="utf-8") as f:
+            for entry in json.load(f):
+                bank.add(entry["question"], entry["answer"], entry.get("id"), entry.get("alternatives", ()))
+        print(f"[QuestionBank] {len(bank)} questões carregadas de {filename}")
+        return bank
+
+    @classmethod
+    def shared(cls, name: str, filename: str = None) -> "QuestionBank":
+        """
+        Banco compartilhado: na primeira chamada é carregado (do arquivo, se informado)
+        ou criado vazio; as chamadas seguintes com o mesmo nome devolvem a mesma instância.
+        """
+        with cls._shared_lock:
+            bank = cls._shared.get(name)
+            if bank is None:
+                bank = cls._shared[name] = cls.load(filename, name) if filename else cls(name)
+            return bank
@@ -4,6 +4,14 @@ Implementa Strategy para calcular pontos de formas diferentes.
 """
 from abc import ABC, abstractmethod
 
+from utils.registry import optional_import
+
+
+def _numpy():
+    # NumPy é opcional (sem ele, o lote usa o laço item a item) e leva ~0,1 s para
+    # importar: só é carregado no primeiro lote, não na inicialização do processo
+    return optional_import("numpy")
+
 
 class ScoringStrategy(ABC):
     @abstractmethod
@@ -16,6 +24,79 @@ class ScoringStrategy(ABC):
         """
         pass
 
+    def calculate_scores(self, submissions, columns) -> list:
+        """
+        Calcula a pontuação de um lote de submissões em formato colunar.
+        :param submissions: Sequência de respostas (ou None quando não usadas)
+        :param columns: Dicionário coluna -> sequência (ex.: time, difficulty, correct, accuracy)
+        :return: Lista de pontos, na mesma ordem das submissões
+        """
+        size = _batch_size(submissions, columns)
+        if submissions is None:
+            submissions = [None] * size
+        names = list(columns)
+        values = [columns[name] for name in names]
+        return [
+            self.calculate_score(submissions[i], {name: col[i] for name, col in zip(names, values)})
+            for i in range(size)
+        ]
+
+
+def _batch_size(submissions, columns) -> int:
+    sizes = {len(col) for col in columns.values()}
+    if submissions is not None:
+        sizes.add(len(submissions))
+    if len(sizes) > 1:
+        raise ValueError("Colunas do lote com tamanhos diferentes.")
+    return sizes.pop() if sizes else 0
+
+
+def _correct_mask(columns, size):
+    """Converte a coluna 'correct' em máscara booleana com a mesma semântica de bool()."""
+    np = _numpy()
+    if "correct" not in columns:
+        return np.zeros(size, dtype=bool)
+    correct = np.asarray(columns["correct"])
+    if correct.dtype.kind in "biuf":
+        return correct.astype(bool)
+    return np.fromiter((bool(c) for c in columns["correct"]), dtype=bool, count=size)
+
+
+def _as_list(scores, int_positions) -> list:
+    """Converte para lista Python; onde o caminho escalar devolve int, converte o float para int."""
+    np = _numpy()
+    result = scores.tolist()
+    if scores.dtype.kind == "f":
+        for i in np.flatnonzero(int_positions).tolist():
+            result[i] = int(result[i])
+    return result
+
+
+def _numeric_column(columns, name, default, size):
+    """
+    Converte a coluna para array numérico.
+    :return: (array, máscara dos itens int numa coluna que o NumPy promoveu a float, ou None),
+             ou (None, None) quando o lote deve seguir item a item: coluna não numérica ou com NaN/inf
+             (o caminho escalar tem comportamento próprio para esses valores)
+    """
+    np = _numpy()
+    if name not in columns:
+        return np.full(size, default), None
+    values = columns[name]
+    column = np.asarray(values)
+    if column.dtype.kind not in "iuf":
+        return None, None
+    ints = None
+    if column.dtype.kind == "f":
+        if not np.isfinite(column).all():
+            return None, None
+        if not isinstance(values, np.ndarray):
+            # [1, 2.5] vira float64; no caminho escalar 1 continua int
+            ints = np.fromiter((not isinstance(v, float) for v in values), dtype=bool, count=size)
+            if not ints.any():
+                ints = None
+    return column, ints
+
 
 class TimeBasedScoring(ScoringStrategy):
     """
@@ -28,6 +109,17 @@ class TimeBasedScoring(ScoringStrategy):
         time = context.get("time", 999)
         return max(0, 100 - time)
 
+    def calculate_scores(self, submissions, columns) -> list:
+        np = _numpy()
+        if np is None:
+            return super().calculate_scores(submissions, columns)
+        size = _batch_size(submissions, columns)
+        time, ints = _numeric_column(columns, "time", 999, size)
+        if time is None:
+            return super().calculate_scores(submissions, columns)
+        scores = np.where(_correct_mask(columns, size), np.maximum(0, 100 - time), 0)
+        return _as_list(scores, scores <= 0 if ints is None else (scores <= 0) | ints)
+
 
 class DifficultyBasedScoring(ScoringStrategy):
     """
@@ -40,6 +132,17 @@ class DifficultyBasedScoring(ScoringStrategy):
         difficulty = context.get("difficulty", 1)
         return 10 * difficulty
 
+    def calculate_scores(self, submissions, columns) -> list:
+        np = _numpy()
+        if np is None:
+            return super().calculate_scores(submissions, columns)
+        size = _batch_size(submissions, columns)
+        difficulty, ints = _numeric_column(columns, "difficulty", 1, size)
+        if difficulty is None:
+            return super().calculate_scores(submissions, columns)
+        correct = _correct_mask(columns, size)
+        return _as_list(np.where(correct, 10 * difficulty, 0), ~correct if ints is None else ~correct | ints)
+
 
 class AccuracyBasedScoring(ScoringStrategy):
     """
@@ -48,3 +151,17 @@ class AccuracyBasedScoring(ScoringStrategy):
     def calculate_score(self, submission, context) -> int:
         accuracy = context.get("accuracy", 0.0)
         return int(accuracy * 100)
+
+    def calculate_scores(self, submissions, columns) -> list:
+        np = _numpy()
+        if np is None:
+            return super().calculate_scores(submissions, columns)
+        size = _batch_size(submissions, columns)
+        accuracy, _ = _numeric_column(columns, "accuracy", 0.0, size)
+        if accuracy is None:
+            return super().calculate_scores(submissions, columns)
+        scores = np.trunc(accuracy * 100)
+        if scores.size and np.abs(scores).max() >= 2 ** 63:
+            # Fora do int64: o caminho escalar devolve o int Python exato
+            return super().calculate_scores(submissions, columns)
+        return scores.astype(np.int64).tolist()
@@ -6,9 +6,22 @@ Implementa os padrões:
 - Observer (AchievementCenter notifica observers quando uma conquista é desbloqueada)
 """
 
-from typing import List
+import threading
+import weakref
+from array import array
+from contextlib import contextmanager
+from bisect import bisect_right
+from heapq import heappush, heappop
+from typing import Dict, List, Set
 from dataclasses import dataclass, field
 
+from usuarios.user import User
+from utils.metrics import metrics
+
+_CHECK = metrics.histogram("achievements_check_seconds", "Duração de AchievementCenter.check_achievements")
+_NOTIFY = metrics.histogram("achievements_notify_seconds", "Duração de AchievementCenter.notify (observers)")
+_UNLOCKED = metrics.counter("achievements_unlocked_total", "Conquistas desbloqueadas pelo centro")
+
 
 @dataclass
 class Achievement:
@@ -33,24 +46,95 @@ class Medal(Achievement):
 
 
 class MedalCollection(Achievement):
-    """Composite: coleção de achievements/medalhas."""
+    """Composite: coleção de achievements/medalhas.
+
+    Um filho conta como conquistado quando o usuário já o possui ou, se for
+    uma coleção, quando todos os filhos dela contam (recursivamente). A
+    hierarquia é avaliada como um DAG, cada nó uma única vez, e o resultado
+    fica memorizado por usuário, pela versão do usuário (User.version) e pela
+    revisão da coleção e das coleções abaixo dela.
+    """
+
+    # Contador global, incrementado a cada alteração de filhos; permite que o
+    # AchievementCenter saiba quando reconstruir seu índice reverso.
+    _revision = 0
 
     def __init__(self, name: str, description: str = ""):
         super().__init__(name=name, points_required=0, description=description)
         self.children: List[Achievement] = []
+        # Valor do contador global na última alteração desta coleção
+        self.revision = 0
+        self._stamp_cache = (-1, 0)
+
+    def _changed(self):
+        MedalCollection._revision += 1
+        self.revision = MedalCollection._revision
 
     def add(self, achievement: Achievement):
+        if isinstance(achievement, MedalCollection) and (achievement is self or achievement.contains(self)):
+            raise ValueError(f"Ciclo: '{achievement.name}' já contém '{self.name}'.")
         self.children.append(achievement)
+        self._changed()
 
     def remove(self, achievement: Achievement):
         self.children.remove(achievement)
+        self._changed()
+
+    def _stamp(self) -> int:
+        """
+        Maior revisão entre esta coleção e as aninhadas: muda sempre que qualquer nó
+        da subárvore muda, e só então (recalculada uma vez por alteração global).
+        """
+        revision, stamp = self._stamp_cache
+        if revision != MedalCollection._revision:
+            stamp = max(node.revision for node in self.topological_order())
+            self._stamp_cache = (MedalCollection._revision, stamp)
+        return stamp
+
+    def contains(self, achievement: Achievement) -> bool:
+        """Verifica se a conquista aparece em qualquer nível abaixo desta coleção"""
+        stack, seen = [self], set()
+        while stack:
+            node = stack.pop()
+            for child in node.children:
+                if child is achievement:
+                    return True
+                if isinstance(child, MedalCollection) and id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append(child)
+        return False
+
+    def topological_order(self) -> List["MedalCollection"]:
+        """Esta coleção e as coleções aninhadas, com os filhos antes dos pais"""
+        order, seen = [], {id(self)}
+        stack = [(self, iter(self.children))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if isinstance(child, MedalCollection) and id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append((child, iter(child.children)))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+        return order
 
     def is_unlocked(self, user) -> bool:
-        user_medal_names = [m.name for m in getattr(user, 'achievements', [])]
-        for c in self.children:
-            if c.name not in user_medal_names:
-                return False
-        return True
+        memo = _memo_for(user)
+        # Entradas (nó, stamp, resultado): o nó guardado impede reaproveitar o id de um nó coletado
+        entry = memo.results.get(id(self))
+        if entry is not None and entry[0] is self and entry[1] == self._stamp():
+            return entry[2]
+        names, results = memo.names, memo.results
+        for node in self.topological_order():
+            stamp = node._stamp()
+            entry = results.get(id(node))
+            if entry is None or entry[0] is not node or entry[1] != stamp:
+                results[id(node)] = (node, stamp, all(
+                    c.name in names or (isinstance(c, MedalCollection) and results[id(c)][2])
+                    for c in node.children))
+        return results[id(self)][2]
 
     def to_dict(self) -> dict:
         return {"name": self.name, "children": [c.to_dict() for c in self.children], "description": self.description}
@@ -59,54 +143,354 @@ class MedalCollection(Achievement):
         return f"MedalCollection({self.name}) -> [{', '.join(c.name for c in self.children)}]"
 
 
-class AchievementCenter:
-    """Centro de conquistas com Observer pattern."""
+class _Memo:
+    """Nomes das conquistas de um usuário e resultados já calculados das coleções."""
+
+    __slots__ = ("version", "names", "results")
 
     def __init__(self):
-        self.subscribers: List = []
+        self.version = None
+        self.names: Set[str] = set()
+        self.results: Dict[int, tuple] = {}
+
+
+_memos = weakref.WeakKeyDictionary()
+
+
+def _memo_for(user) -> _Memo:
+    version = getattr(user, 'version', None)
+    if version is None:
+        # Sem versão não há como saber se o cache vale: sem memorização
+        memo = _Memo()
+        memo.names = {a.name for a in getattr(user, 'achievements', [])}
+        return memo
+    try:
+        memo = _memos.get(user)
+        if memo is None:
+            memo = _memos[user] = _Memo()
+    except TypeError:
+        # Objeto sem suporte a weakref: sem memorização
+        memo = _Memo()
+    if memo.version == version:
+        return memo
+    names = {a.name for a in getattr(user, 'achievements', [])}
+    if memo.names <= names:
+        # Só entraram conquistas: coleções já desbloqueadas continuam desbloqueadas
+        memo.results = {k: entry for k, entry in memo.results.items() if entry[2]}
+    else:
+        # Conquistas removidas (ex.: rollback de uma transação): recalcula tudo
+        memo.results = {}
+    memo.names = names
+    memo.version = version
+    return memo
+
+
+class _UserState:
+    """Estado incremental de um usuário dentro do AchievementCenter."""
+
+    __slots__ = ("version", "points", "seen", "user_version", "truncations", "names", "satisfied", "remaining")
+
+    def __init__(self):
+        self.version = -1
+        self.points = 0
+        self.seen = 0
+        # user.version e User._truncations na última leitura das conquistas
+        self.user_version = None
+        self.truncations = 0
+        self.names: Set[str] = set()
+        # Nomes já propagados no grafo: conquistas do usuário + coleções satisfeitas
+        self.satisfied: Set[str] = set()
+        # Filhos ainda não satisfeitos de cada nó do grafo de coleções
+        self.remaining = array("i")
+
+
+class AchievementCenter:
+    """Centro de conquistas com Observer pattern.
+
+    A verificação é incremental: medalhas por pontos ficam ordenadas por
+    ``points_required`` (só os limiares cruzados desde a última verificação
+    são avaliados). As coleções (inclusive as aninhadas, registradas ou não)
+    formam um DAG em ordem topológica; cada usuário guarda quantos filhos
+    ainda faltam em cada nó, e cada conquista nova só decrementa os
+    contadores dos pais, através de um índice reverso filho -> nós.
+
+    Com um ObserverDispatcher (gamificacao.dispatch), as notificações são
+    enfileiradas e entregues em segundo plano em vez de chamadas em linha.
+    """
+
+    def __init__(self, dispatcher=None):
+        """
+        :param dispatcher: ObserverDispatcher para entrega assíncrona (None = entrega síncrona)
+        """
+        self.dispatcher = dispatcher
+        # dict como conjunto ordenado: inscrição/remoção em O(1)
+        self._subscribers: Dict = {}
         self.registry_medals: List[Achievement] = []
         self.registry_collections: List[MedalCollection] = []
-
-    def subscribe(self, observer):
-        if observer not in self.subscribers:
-            self.subscribers.append(observer)
+        self._medal_names: Set[str] = set()
+        self._collection_names: Set[str] = set()
+        # Medalhas puramente por pontos, ordenadas por limiar: (ordem, medalha)
+        self._thresholds: List = []
+        self._threshold_medals: List[tuple] = []
+        # Medalhas com regra própria, avaliadas a cada verificação
+        self._dynamic_medals: List[tuple] = []
+        # Grafo de coleções em ordem topológica (filhos antes dos pais)
+        self._nodes: List[MedalCollection] = []
+        self._node_children: List[frozenset] = []
+        self._node_registry: List[int] = []  # índice no registro, ou -1 se só aparece aninhada
+        # Nome do filho -> nós que o contêm
+        self._parents: Dict[str, List[int]] = {}
+        self._dynamic_collections: Set[int] = set()
+        self._index_revision = MedalCollection._revision
+        self._version = 0
+        self._states = weakref.WeakKeyDictionary()
+        # Notificações retidas por thread durante deferred_notifications()
+        self._deferred = threading.local()
+
+    @property
+    def subscribers(self) -> List:
+        return list(self._subscribers)
+
+    def subscribe(self, observer, **options):
+        """
+        :param options: Com dispatcher, opções da fila deste observer (queue_size, overflow, timeout)
+        """
+        if observer in self._subscribers:
+            return
+        self._subscribers[observer] = None
+        if self.dispatcher is not None:
+            self.dispatcher.add(observer, **options)
 
     def unsubscribe(self, observer):
-        if observer in self.subscribers:
-            self.subscribers.remove(observer)
+        if self._subscribers.pop(observer, 0) is None and self.dispatcher is not None:
+            self.dispatcher.remove(observer)
+
+    @contextmanager
+    def deferred_notifications(self):
+        """
+        Retém as notificações desta thread e entrega a lista (user, conquista) ao bloco;
+        quem abriu o bloco decide quando entregá-las (ex.: após confirmar uma transação).
+        Em caso de exceção as notificações retidas são descartadas.
+        """
+        previous = getattr(self._deferred, "pending", None)
+        pending = self._deferred.pending = []
+        try:
+            yield pending
+        finally:
+            self._deferred.pending = previous
 
     def notify(self, user, achievement: Achievement):
-        for s in self.subscribers:
+        pending = getattr(self._deferred, "pending", None)
+        if pending is not None:
+            pending.append((user, achievement))
+            return
+        self._notify(user, achievement)
+
+    @_NOTIFY.timed
+    def _notify(self, user, achievement: Achievement):
+        if self.dispatcher is not None:
+            self.dispatcher.dispatch(user, achievement)
+            return
+        for s in list(self._subscribers):
             s.update(user, achievement)
 
     def register_medal(self, medal: Achievement):
-        if not any(m.name == medal.name for m in self.registry_medals):
-            self.registry_medals.append(medal)
+        if medal.name in self._medal_names:
+            return
+        order = len(self.registry_medals)
+        self.registry_medals.append(medal)
+        self._medal_names.add(medal.name)
+        if type(medal).is_unlocked is Achievement.is_unlocked:
+            pos = bisect_right(self._thresholds, medal.points_required)
+            self._thresholds.insert(pos, medal.points_required)
+            self._threshold_medals.insert(pos, (order, medal))
+        else:
+            self._dynamic_medals.append((order, medal))
+        self._version += 1
 
     def register_collection(self, collection: MedalCollection):
-        if not any(c.name == collection.name for c in self.registry_collections):
-            self.registry_collections.append(collection)
-
+        if collection.name in self._collection_names:
+            return
+        self.registry_collections.append(collection)
+        self._collection_names.add(collection.name)
+        self._build_graph()
+        self._version += 1
+
+    @staticmethod
+    def _is_structural(collection) -> bool:
+        return isinstance(collection, MedalCollection) and type(collection).is_unlocked is MedalCollection.is_unlocked
+
+    def _build_graph(self):
+        """Ordena topologicamente as coleções registradas e as aninhadas nelas."""
+        registry = {id(c): idx for idx, c in enumerate(self.registry_collections)}
+        self._nodes, self._node_children, self._node_registry = [], [], []
+        self._parents = {}
+        self._dynamic_collections = set()
+        seen: Set[int] = set()
+        for idx, root in enumerate(self.registry_collections):
+            if not self._is_structural(root):
+                self._dynamic_collections.add(idx)
+                continue
+            if id(root) in seen:
+                continue
+            seen.add(id(root))
+            stack = [(root, iter(root.children))]
+            while stack:
+                node, children = stack[-1]
+                for child in children:
+                    if self._is_structural(child) and id(child) not in seen:
+                        seen.add(id(child))
+                        stack.append((child, iter(child.children)))
+                        break
+                else:
+                    stack.pop()
+                    node_id = len(self._nodes)
+                    child_names = frozenset(c.name for c in node.children)
+                    self._nodes.append(node)
+                    self._node_children.append(child_names)
+                    self._node_registry.append(registry.get(id(node), -1))
+                    for name in child_names:
+                        self._parents.setdefault(name, []).append(node_id)
+        self._index_revision = MedalCollection._revision
+
+    def _refresh_index(self):
+        """Reconstrói o grafo se alguma coleção teve filhos alterados."""
+        if self._index_revision == MedalCollection._revision:
+            return
+        self._build_graph()
+        self._version += 1
+
+    def _state_for(self, user) -> _UserState:
+        try:
+            state = self._states.get(user)
+            if state is None:
+                state = self._states[user] = _UserState()
+            return state
+        except TypeError:
+            # Objeto sem suporte a weakref: verificação completa, sem cache
+            return _UserState()
+
+    def _sync_names(self, state: _UserState, user, achievements) -> Set[str]:
+        """Incorpora conquistas adicionadas fora do centro desde a última verificação."""
+        version = getattr(user, "version", None)
+        if version is not None and version == state.user_version:
+            return set()
+        truncations = User._truncations
+        # Um rollback remove conquistas e depois novas podem devolver a lista ao mesmo
+        # tamanho: com a versão do usuário alterada após alguma remoção, relê tudo
+        if len(achievements) < state.seen or (truncations != state.truncations and state.seen):
+            state.names = set()
+            state.seen = 0
+            state.version = -1
+        state.user_version = version
+        state.truncations = truncations
+        new_names = set()
+        for a in achievements[state.seen:]:
+            if a.name not in state.names:
+                state.names.add(a.name)
+                new_names.add(a.name)
+        state.seen = len(achievements)
+        return new_names
+
+    def _reset_graph(self, state: _UserState, ready: list):
+        """Recalcula os contadores do usuário percorrendo o grafo uma vez, em ordem topológica."""
+        satisfied = state.satisfied = set(state.names)
+        remaining = state.remaining = array("i", bytes(4 * len(self._nodes)))
+        for node_id, node in enumerate(self._nodes):
+            missing = sum(1 for name in self._node_children[node_id] if name not in satisfied)
+            remaining[node_id] = missing
+            if missing == 0 and node.name not in satisfied:
+                satisfied.add(node.name)
+                if self._node_registry[node_id] >= 0:
+                    heappush(ready, self._node_registry[node_id])
+
+    def _satisfy(self, state: _UserState, name: str, ready: list):
+        """Propaga um nome satisfeito: decrementa os pais e sobe pelos que chegarem a zero."""
+        stack = [name]
+        satisfied, remaining = state.satisfied, state.remaining
+        while stack:
+            current = stack.pop()
+            if current in satisfied:
+                continue
+            satisfied.add(current)
+            for node_id in self._parents.get(current, ()):
+                remaining[node_id] -= 1
+                if remaining[node_id] == 0:
+                    if self._node_registry[node_id] >= 0:
+                        heappush(ready, self._node_registry[node_id])
+                    stack.append(self._nodes[node_id].name)
+
+    @_CHECK.timed
     def check_achievements(self, user) -> List[Achievement]:
         unlocked: List[Achievement] = []
-        user_achievements = [a.name for a in getattr(user, 'achievements', [])]
+        self._refresh_index()
+        state = self._state_for(user)
+        achievements = getattr(user, 'achievements', [])
+        points = getattr(user, 'points', 0)
+        new_names = self._sync_names(state, user, achievements)
+        names = state.names
+        ready: List[int] = []
+
+        if state.version != self._version:
+            state.version = self._version
+            lo = 0
+            self._reset_graph(state, ready)
+        else:
+            lo = bisect_right(self._thresholds, state.points)
+            for name in new_names:
+                self._satisfy(state, name, ready)
+        hi = bisect_right(self._thresholds, points)
+        state.points = points
 
         # Medals
-        for m in self.registry_medals:
-            if m.is_unlocked(user) and m.name not in user_achievements:
-                user.add_achievement(m)
-                unlocked.append(m)
-                self.notify(user, m)
-                user_achievements.append(m.name)
-
-        # Collections
-        for c in self.registry_collections:
-            if c.is_unlocked(user) and c.name not in user_achievements:
-                user.add_achievement(c)
-                unlocked.append(c)
-                self.notify(user, c)
-                user_achievements.append(c.name)
-
+        heap = self._threshold_medals[lo:hi] + self._dynamic_medals
+        heap.sort(key=lambda om: om[0])
+        scanned = hi
+        while heap:
+            order, m = heappop(heap)
+            if m.name in names or not m.is_unlocked(user):
+                continue
+            user.add_achievement(m)
+            unlocked.append(m)
+            self.notify(user, m)
+            names.add(m.name)
+            self._satisfy(state, m.name, ready)
+            # Um observer pode ter concedido pontos: limiares recém-cruzados
+            # que vêm depois na ordem de registro entram nesta mesma passagem.
+            reach = bisect_right(self._thresholds, getattr(user, 'points', 0))
+            if reach > scanned:
+                for om in self._threshold_medals[scanned:reach]:
+                    if om[0] > order:
+                        heappush(heap, om)
+                scanned = reach
+
+        # Collections: as que chegaram a zero filhos pendentes, em ordem de registro
+        for name in self._sync_names(state, user, achievements):
+            self._satisfy(state, name, ready)
+        for idx in self._dynamic_collections:
+            heappush(ready, idx)
+        visited: Set[int] = set()
+        while ready:
+            idx = heappop(ready)
+            if idx in visited:
+                continue
+            visited.add(idx)
+            c = self.registry_collections[idx]
+            if c.name in names:
+                continue
+            if idx in self._dynamic_collections and not c.is_unlocked(user):
+                continue
+            user.add_achievement(c)
+            unlocked.append(c)
+            self.notify(user, c)
+            names.add(c.name)
+            self._satisfy(state, c.name, ready)
+            # Conquistas adicionadas pelos observers durante a notificação
+            for name in self._sync_names(state, user, achievements):
+                self._satisfy(state, name, ready)
+
+        if unlocked:
+            _UNLOCKED.inc(len(unlocked))
         return unlocked
 
 
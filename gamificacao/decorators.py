@@ -1,5 +1,8 @@
+import copy
 from abc import ABC, abstractmethod
-from typing import Final
+from typing import Final, List, Optional, Tuple, Union
+
+from utils.registry import optional_import
 
 
 class AchievementComponent(ABC):
@@ -31,6 +34,13 @@ class AchievementDecorator(AchievementComponent):
     def get_points(self) -> int:
         pass
 
+    def affine(self) -> Optional[Tuple[int, int]]:
+        """
+        Coeficientes (a, b) se o bônus equivale a a * pontos + b.
+        Decorators customizados que não são afins retornam None.
+        """
+        return None
+
 
 class StreakBonus(AchievementDecorator):
     """Bônus por sequência de conquistas (streak)."""
@@ -45,6 +55,9 @@ class StreakBonus(AchievementDecorator):
     def _calculate_bonus(self) -> int:
         return self._streak_count * 10  # 10 pontos por streak
 
+    def affine(self) -> Tuple[int, int]:
+        return 1, self._calculate_bonus()
+
 
 class DoubleXP(AchievementDecorator):
     """Bônus de pontos dobrados."""
@@ -52,6 +65,104 @@ class DoubleXP(AchievementDecorator):
     def get_points(self) -> int:
         return self._component.get_points() * 2
 
+    def affine(self) -> Tuple[int, int]:
+        return 2, 0
+
+
+class CompiledBonus(AchievementComponent):
+    """
+    Cadeia de decorators achatada: sequências de bônus afins viram um único
+    a * x + b; decorators não afins ficam como passos avaliados individualmente.
+    """
+
+    def __init__(self, base: AchievementComponent, steps: List[Union[Tuple[int, int], AchievementDecorator]]):
+        self._base = base
+        self._steps = steps
+
+    @property
+    def affine_coefficients(self) -> Optional[Tuple[int, int]]:
+        """(a, b) quando toda a cadeia é afim; None se houver decorator customizado"""
+        if len(self._steps) == 1 and isinstance(self._steps[0], tuple):
+            return self._steps[0]
+        return None
+
+    def get_points(self) -> int:
+        return self.evaluate(self._base.get_points())
+
+    def evaluate(self, points: int) -> int:
+        """Aplica a cadeia compilada a uma pontuação base qualquer"""
+        for step in self._steps:
+            if isinstance(step, tuple):
+                points = step[0] * points + step[1]
+            else:
+                points = _apply_decorator(step, points)
+        return points
+
+    def apply(self, points):
+        """
+        Aplica a cadeia a um lote de pontuações base (ex.: evento de double XP).
+        :param points: Array NumPy ou sequência de pontos base
+        :return: Array NumPy (se disponível) ou lista
+        """
+        # NumPy é opcional (sem ele, avalia item a item) e só é importado aqui
+        np = optional_import("numpy")
+        if np is None:
+            return [self.evaluate(p) for p in points]
+        result = np.asarray(points)
+        for step in self._steps:
+            if isinstance(step, tuple):
+                result = step[0] * result + step[1]
+            else:
+                result = np.array([_apply_decorator(step, p) for p in result.tolist()])
+        return result
+
+
+def _apply_decorator(decorator: AchievementDecorator, points: int) -> int:
+    """Avalia um decorator não afim sobre uma pontuação arbitrária, sem alterar o original."""
+    clone = copy.copy(decorator)
+    clone._component = BaseAchievement(points)
+    return clone.get_points()
+
+
+def _affine(layer: AchievementDecorator) -> Optional[Tuple[int, int]]:
+    """
+    affine() da camada, mas só se get_points não foi sobrescrito abaixo da classe que
+    definiu affine() (ex.: subclasse de StreakBonus com outra regra); senão a camada é opaca.
+    """
+    cls = type(layer)
+    owner = next(klass for klass in cls.__mro__ if "affine" in vars(klass))
+    if owner.get_points is not cls.get_points:
+        return None
+    return layer.affine()
+
+
+def compile_chain(component: AchievementComponent) -> CompiledBonus:
+    """
+    Compila uma cadeia de decorators (ex.: DoubleXP(StreakBonus(base))) em um avaliador plano,
+    percorrendo a cadeia de forma iterativa (sem recursão).
+    """
+    layers = []
+    node = component
+    while isinstance(node, AchievementDecorator):
+        layers.append(node)
+        node = node._component
+
+    steps: List[Union[Tuple[int, int], AchievementDecorator]] = []
+    a, b = 1, 0
+    for layer in reversed(layers):
+        coefficients = _affine(layer)
+        if coefficients is None:
+            if (a, b) != (1, 0):
+                steps.append((a, b))
+                a, b = 1, 0
+            steps.append(layer)
+        else:
+            layer_a, layer_b = coefficients
+            a, b = layer_a * a, layer_a * b + layer_b
+    if (a, b) != (1, 0) or not steps:
+        steps.append((a, b))
+    return CompiledBonus(node, steps)
+
 
 # Exemplo de uso
 if __name__ == "__main__":
@@ -61,4 +172,7 @@ if __name__ == "__main__":
 
     print(f"Pontos base: {base.get_points()}")
     print(f"Com streak: {streak.get_points()}")
-    print(f"Com double XP: {double.get_points()}")
\ No newline at end of file
+    print(f"Com double XP: {double.get_points()}")
+
+    compiled = compile_chain(double)
+    print(f"Compilado (a, b): {compiled.affine_coefficients} -> {compiled.get_points()}")
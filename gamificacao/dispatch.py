@@ -0,0 +1,293 @@
+"""
+Entrega assíncrona e em lote das notificações do AchievementCenter.
+
+Cada observer recebe sua própria fila limitada e sua própria thread de
+entrega, então um observer lento (push, e-mail) não atrasa a verificação de
+conquistas nem os demais observers. Desbloqueios do mesmo usuário que se
+acumulam na fila são entregues juntos: via update_batch(user, achievements)
+quando o observer o implementa, ou como chamadas update() em sequência. A
+junção só acontece dentro de um lote retirado da fila; por isso a entrega
+espera `batch_window` segundos (padrão 10 ms) para o lote se formar.
+
+Observers assíncronos (update/update_batch definidos com `async def`) rodam
+em um event loop compartilhado, com timeout e cancelamento. Falhas e
+timeouts consecutivos suspendem temporariamente o observer (os eventos do
+período são descartados e contabilizados).
+"""
+
+import asyncio
+import inspect
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.metrics import metrics
+
+_LAG = metrics.histogram("achievements_dispatch_lag_seconds", "Tempo entre o desbloqueio e a entrega ao observer")
+_DROPPED = metrics.counter("achievements_dispatch_dropped_total", "Notificações descartadas pelo dispatcher")
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class _Channel:
+    """Fila limitada + thread de entrega de um único observer."""
+
+    def __init__(self, dispatcher: "ObserverDispatcher", observer, queue_size: int, overflow: str,
+                 timeout: float, batch_size: int, batch_window: float):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de overflow inválida: {overflow}. Use uma de {OVERFLOW_POLICIES}.")
+        self.dispatcher = dispatcher
+        self.observer = observer
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.batch_handler = getattr(observer, "update_batch", None)
+        handler = self.batch_handler or observer.update
+        self.is_async = inspect.iscoroutinefunction(handler)
+        self._events: deque = deque()
+        self._in_flight = 0
+        self._failures = 0
+        self._suspended_until = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {"enqueued": 0, "delivered": 0, "batches": 0, "dropped": 0, "failures": 0,
+                      "timeouts": 0, "max_lag": 0.0, "last_lag": 0.0}
+        self._worker = threading.Thread(target=self._run, name=f"observer-{type(observer).__name__}", daemon=True)
+        self._worker.start()
+
+    def put(self, user, achievement) -> bool:
+        with self._cond:
+            if self._closed:
+                return False
+            if self._suspended_until and time.monotonic() < self._suspended_until:
+                return self._drop(1)
+            if len(self._events) >= self.queue_size:
+                if self.overflow == "drop_newest":
+                    return self._drop(1)
+                if self.overflow == "drop_oldest":
+                    self._events.popleft()
+                    self._drop(1)
+                elif not self._cond.wait_for(lambda: len(self._events) < self.queue_size or self._closed,
+                                             self.timeout):
+                    return self._drop(1)
+            self._events.append((user, achievement, time.monotonic()))
+            self.stats["enqueued"] += 1
+            self._cond.notify_all()
+            return True
+
+    def _drop(self, count: int) -> bool:
+        self.stats["dropped"] += count
+        _DROPPED.inc(count)
+        return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._events or self._closed)
+                if not self._events and self._closed:
+                    return
+                if self.batch_window > 0 and len(self._events) < self.batch_size and not self._closed:
+                    # Espera um pouco mais para juntar desbloqueios do mesmo usuário
+                    self._cond.wait_for(lambda: len(self._events) >= self.batch_size or self._closed,
+                                        self.batch_window)
+                batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+                self._in_flight = len(batch)
+                self._cond.notify_all()
+            try:
+                self._deliver(batch)
+            except Exception as e:
+                # Um erro fora da chamada ao observer não pode encerrar a thread de entrega
+                self._drop(len(batch))
+                print(f"[Dispatcher] Falha ao entregar lote para {type(self.observer).__name__}: {e}")
+            finally:
+                with self._cond:
+                    self._in_flight = 0
+                    self._cond.notify_all()
+
+    def _deliver(self, batch: List[Tuple[Any, Any, float]]):
+        # Agrupa por usuário, preservando a ordem de chegada
+        grouped: Dict[int, Tuple[Any, list, float]] = {}
+        for user, achievement, enqueued_at in batch:
+            entry = grouped.get(id(user))
+            if entry is None:
+                grouped[id(user)] = (user, [achievement], enqueued_at)
+            else:
+                entry[1].append(achievement)
+
+        for user, achievements, enqueued_at in grouped.values():
+            lag = time.monotonic() - enqueued_at
+            self.stats["last_lag"] = lag
+            self.stats["max_lag"] = max(self.stats["max_lag"], lag)
+            _LAG.observe(lag)
+            if self._suspended_until:
+                if time.monotonic() < self._suspended_until:
+                    self._drop(len(achievements))
+                    continue
+                self._suspended_until = 0.0
+            started = time.monotonic()
+            try:
+                self._call(user, achievements)
+            except TimeoutError:
+                self.stats["timeouts"] += 1
+                self._failed("excedeu o timeout")
+                continue
+            except Exception as e:
+                self.stats["failures"] += 1
+                self._failed(f"falhou: {e}")
+                continue
+            self.stats["batches"] += 1
+            self.stats["delivered"] += len(achievements)
+            if self.timeout is not None and time.monotonic() - started > self.timeout:
+                # Observer síncrono não pode ser interrompido: conta como timeout
+                self.stats["timeouts"] += 1
+                self._failed("excedeu o timeout")
+            else:
+                self._failures = 0
+
+    def _call(self, user, achievements: list):
+        if self.is_async:
+            future = asyncio.run_coroutine_threadsafe(self._call_async(user, achievements), self.dispatcher.loop())
+            try:
+                future.result(self.timeout)
+            except TimeoutError:
+                future.cancel()
+                raise
+            return
+        if self.batch_handler is not None:
+            self.batch_handler(user, achievements)
+        else:
+            for achievement in achievements:
+                self.observer.update(user, achievement)
+
+    async def _call_async(self, user, achievements: list):
+        if self.batch_handler is not None:
+            await self.batch_handler(user, achievements)
+        else:
+            for achievement in achievements:
+                await self.observer.update(user, achievement)
+
+    def _failed(self, reason: str):
+        self._failures += 1
+        print(f"[Dispatcher] Observer {type(self.observer).__name__} {reason}")
+        if self._failures >= self.dispatcher.max_failures:
+            self._failures = 0
+            self._suspended_until = time.monotonic() + self.dispatcher.cooldown
+            print(f"[Dispatcher] Observer {type(self.observer).__name__} suspenso por {self.dispatcher.cooldown}s")
+
+    def idle(self) -> bool:
+        return not self._events and not self._in_flight
+
+    def wait_idle(self, timeout: Optional[float]) -> bool:
+        with self._cond:
+            return self._cond.wait_for(self.idle, timeout)
+
+    def close(self, timeout: Optional[float]):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            stats = dict(self.stats)
+            stats["queued"] = len(self._events)
+            stats["suspended"] = bool(self._suspended_until and time.monotonic() < self._suspended_until)
+            oldest = self._events[0][2] if self._events else None
+        stats["current_lag"] = time.monotonic() - oldest if oldest is not None else 0.0
+        return stats
+
+
+class ObserverDispatcher:
+    """
+    Distribui notificações de conquistas para observers síncronos e assíncronos.
+    :param queue_size: Capacidade da fila de cada observer
+    :param overflow: O que fazer com a fila cheia: drop_oldest, drop_newest ou block
+    :param timeout: Tempo máximo (s) de uma entrega (e de espera no overflow "block"); None = sem limite
+    :param batch_size: Máximo de eventos retirados da fila por entrega
+    :param batch_window: Espera extra (s) para juntar eventos antes de entregar; com 0 cada
+        entrega leva o que já estiver na fila e quase nunca junta desbloqueios
+    :param max_failures: Falhas/timeouts seguidos que suspendem o observer
+    :param cooldown: Duração (s) da suspensão
+    """
+
+    def __init__(self, queue_size: int = 1_000, overflow: str = "drop_oldest", timeout: float = 5.0,
+                 batch_size: int = 100, batch_window: float = 0.01, max_failures: int = 5,
+                 cooldown: float = 30.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de overflow inválida: {overflow}. Use uma de {OVERFLOW_POLICIES}.")
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._channels: Dict[Any, _Channel] = {}
+        # Cópia imutável percorrida por dispatch() sem lock
+        self._active: Tuple[_Channel, ...] = ()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def add(self, observer, queue_size: int = None, overflow: str = None, timeout: float = None) -> None:
+        """Registra um observer (os parâmetros omitidos usam os padrões do dispatcher)"""
+        with self._lock:
+            if observer in self._channels:
+                return
+            channel = _Channel(self, observer, queue_size or self.queue_size, overflow or self.overflow,
+                               self.timeout if timeout is None else timeout, self.batch_size, self.batch_window)
+            self._channels[observer] = channel
+            self._active = tuple(self._channels.values())
+
+    def remove(self, observer, timeout: float = None) -> None:
+        """Remove o observer, entregando antes o que já estava na fila dele"""
+        with self._lock:
+            channel = self._channels.pop(observer, None)
+            self._active = tuple(self._channels.values())
+        if channel is not None:
+            channel.close(timeout)
+
+    def dispatch(self, user, achievement) -> None:
+        """Enfileira a notificação para todos os observers (não espera a entrega)"""
+        for channel in self._active:
+            channel.put(user, achievement)
+
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop compartilhado pelos observers assíncronos (criado sob demanda)"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, name="observer-loop",
+                                                     daemon=True)
+                self._loop_thread.start()
+            return self._loop
+
+    def flush(self, timeout: float = None) -> bool:
+        """Espera todas as filas esvaziarem; retorna False no timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for channel in self._active:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not channel.wait_idle(remaining):
+                return False
+        return True
+
+    def close(self, timeout: float = None) -> None:
+        """Entrega o que estiver pendente e encerra as threads (e o event loop)"""
+        with self._lock:
+            channels = list(self._channels.values())
+            self._channels = {}
+            self._active = ()
+        for channel in channels:
+            channel.close(timeout)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join(timeout)
+            self._loop.close()
+            self._loop = None
+
+    def stats(self) -> Dict[str, dict]:
+        """Métricas por observer: entregues, descartados, falhas, timeouts, atraso (lag) e fila atual"""
+        return {f"{type(ch.observer).__name__}#{i}": ch.snapshot() for i, ch in enumerate(self._active)}
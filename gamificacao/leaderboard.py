@@ -0,0 +1,224 @@
+"""
+Módulo de ranking (leaderboard) em tempo real.
+
+Mantém os usuários ordenados por pontos em uma skip list indexada
+(cada ligação guarda quantas posições ela salta), o que permite consultar
+"top N", "posição do usuário X" e "usuários ao redor de X" em O(log n),
+sem ordenar todos os usuários a cada requisição.
+"""
+
+import itertools
+import random
+from threading import RLock
+from typing import Any, Dict, List, Optional, Tuple
+
+from usuarios.user import User
+
+
+class _Node:
+    __slots__ = ("key", "member", "forward", "span")
+
+    def __init__(self, key, member, level: int):
+        self.key = key
+        self.member = member
+        self.forward: List[Optional["_Node"]] = [None] * level
+        self.span: List[int] = [0] * level
+
+
+class IndexedSkipList:
+    """
+    Skip list ordenada por chave com estatísticas de ordem.
+    As posições (rank) são 1-based, como em um ranking.
+    """
+
+    MAX_LEVEL = 32
+
+    def __init__(self, seed: Optional[int] = None):
+        self._head = _Node(None, None, self.MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and self._random.getrandbits(1):
+            level += 1
+        return level
+
+    def insert(self, key, member) -> None:
+        """Insere um membro com a chave informada (chaves devem ser únicas)"""
+        update = [self._head] * self.MAX_LEVEL
+        rank = [0] * self.MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while node.forward[i] is not None and node.forward[i].key < key:
+                rank[i] += node.span[i]
+                node = node.forward[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._size
+            self._level = level
+
+        new = _Node(key, member, level)
+        for i in range(level):
+            new.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new
+            new.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = (rank[0] - rank[i]) + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        self._size += 1
+
+    def remove(self, key) -> bool:
+        """Remove o membro com a chave informada; retorna False se não existir"""
+        update = [self._head] * self.MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+
+        target = node.forward[0]
+        if target is None or target.key != key:
+            return False
+        for i in range(self._level):
+            if update[i].forward[i] is target:
+                update[i].span[i] += target.span[i] - 1
+                update[i].forward[i] = target.forward[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+        return True
+
+    def rank(self, key) -> Optional[int]:
+        """Posição (1-based) da chave, ou None se não existir"""
+        traversed = 0
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.forward[i] is not None and node.forward[i].key <= key:
+                traversed += node.span[i]
+                node = node.forward[i]
+            if node is not self._head and node.key == key:
+                return traversed
+        return None
+
+    def _node_at(self, rank: int) -> Optional[_Node]:
+        if rank < 1 or rank > self._size:
+            return None
+        traversed = 0
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.forward[i] is not None and traversed + node.span[i] <= rank:
+                traversed += node.span[i]
+                node = node.forward[i]
+            if traversed == rank:
+                return node
+        return None
+
+    def slice(self, start: int, count: int) -> List[Tuple[Any, Any]]:
+        """Retorna até `count` pares (chave, membro) a partir da posição `start` (1-based)"""
+        result = []
+        node = self._node_at(max(start, 1))
+        while node is not None and len(result) < count:
+            result.append((node.key, node.member))
+            node = node.forward[0]
+        return result
+
+
+class Leaderboard:
+    """
+    Ranking de usuários por pontos, sincronizado com User.add_points.
+
+    Empates são desempatados pela ordem em que o usuário entrou no ranking.
+    Com sync=True o ranking se registra como observer de pontos e acompanha
+    automaticamente os usuários adicionados via track(). O registro é uma
+    referência fraca, então um ranking descartado sem close() não vaza.
+    """
+
+    def __init__(self, sync: bool = True, seed: Optional[int] = None):
+        self._index = IndexedSkipList(seed)
+        self._keys: Dict[Any, tuple] = {}
+        self._sequence = itertools.count()
+        self._lock = RLock()
+        self._sync = sync
+        if sync:
+            User.subscribe_points(self)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, member) -> bool:
+        return member in self._keys
+
+    def track(self, user) -> None:
+        """Adiciona (ou atualiza) um usuário no ranking com seus pontos atuais"""
+        self.update(user, getattr(user, "points", 0))
+
+    def update(self, member, score) -> None:
+        """Define a pontuação de um membro no ranking"""
+        with self._lock:
+            key = self._keys.get(member)
+            if key is not None:
+                if -key[0] == score:
+                    return
+                self._index.remove(key)
+                sequence = key[1]
+            else:
+                sequence = next(self._sequence)
+            key = (-score, sequence)
+            self._index.insert(key, member)
+            self._keys[member] = key
+
+    def discard(self, member) -> None:
+        """Remove um membro do ranking"""
+        with self._lock:
+            key = self._keys.pop(member, None)
+            if key is not None:
+                self._index.remove(key)
+
+    def points_changed(self, user, old_points, new_points) -> None:
+        """Observer de User.add_points: só atualiza usuários já rastreados"""
+        if user in self._keys:
+            self.update(user, new_points)
+
+    def score(self, member):
+        key = self._keys.get(member)
+        return None if key is None else -key[0]
+
+    def rank(self, member) -> Optional[int]:
+        """Posição (1-based) do membro no ranking, ou None se não estiver nele"""
+        with self._lock:
+            key = self._keys.get(member)
+            return None if key is None else self._index.rank(key)
+
+    def top(self, n: int = 10) -> List[Tuple[Any, Any]]:
+        """Retorna os N primeiros como pares (membro, pontos)"""
+        with self._lock:
+            return [(member, -key[0]) for key, member in self._index.slice(1, n)]
+
+    def around(self, member, radius: int = 5) -> List[Tuple[int, Any, Any]]:
+        """Retorna (posição, membro, pontos) dos vizinhos do membro, até `radius` para cada lado"""
+        with self._lock:
+            position = self.rank(member)
+            if position is None:
+                return []
+            start = max(1, position - radius)
+            entries = self._index.slice(start, position - start + radius + 1)
+            return [(start + i, m, -key[0]) for i, (key, m) in enumerate(entries)]
+
+    def close(self) -> None:
+        """Deixa de acompanhar as alterações de pontos dos usuários"""
+        if self._sync:
+            User.unsubscribe_points(self)
+            self._sync = False
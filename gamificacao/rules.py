@@ -0,0 +1,466 @@
+"""
+Regras de conquista em uma pequena linguagem de expressões.
+
+    points >= 500 and challenges >= 10 and (streak >= 7 or role == "Professor")
+    role in ("Aluno", "Visitante") and not achievements > 3
+
+A regra é analisada uma única vez e compilada em dois avaliadores:
+- closures Python (um usuário por vez), usadas por RuleAchievement.is_unlocked
+  no AchievementCenter;
+- predicados vetorizados (NumPy) sobre colunas de usuários, usados pela
+  varredura em massa (sweep): cada regra vira algumas operações de array
+  sobre a população inteira, em vez de uma chamada por usuário.
+
+Campos: points, achievements (quantidade), challenges e streak (do
+ActivityTracker) e role. Novos campos entram em rule_fields.
+Operadores: == != < <= > >=, in (...), and, or, not e parênteses.
+"""
+
+import operator
+import re
+from functools import lru_cache
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from gamificacao.achievements import Achievement
+from utils.registry import PluginRegistry, optional_import
+
+
+class RuleField(NamedTuple):
+    kind: str  # "int" ou "str"
+    getter: Callable[[Any, Any], Any]  # (usuário, activity) -> valor
+
+
+def _activity_value(index: int):
+    def getter(user, activity):
+        return activity.get(user)[index] if activity is not None else 0
+    return getter
+
+
+rule_fields = PluginRegistry("Campo de regra")
+rule_fields.register("points", RuleField("int", lambda user, activity: getattr(user, "points", 0)))
+rule_fields.register("achievements", RuleField("int", lambda user, activity: len(getattr(user, "achievements", ()))))
+rule_fields.register("challenges", RuleField("int", _activity_value(0)))
+rule_fields.register("streak", RuleField("int", _activity_value(1)))
+rule_fields.register("role", RuleField("str", lambda user, activity: getattr(user, "role", type(user).__name__)))
+
+
+class ActivityTracker:
+    """Desafios concluídos e sequência (streak) de dias consecutivos com desafios, por usuário."""
+
+    _EMPTY = (0, 0)
+
+    def __init__(self):
+        # usuário -> [desafios, streak, último dia (ordinal)]
+        self._stats: Dict[Any, list] = {}
+
+    def record(self, user, day=None) -> None:
+        """
+        Registra um desafio concluído.
+        :param day: date ou ordinal do dia (padrão: hoje)
+        """
+        if day is None:
+            day = date.today()
+        if isinstance(day, date):
+            day = day.toordinal()
+        stats = self._stats.get(user)
+        if stats is None:
+            self._stats[user] = [1, 1, day]
+            return
+        stats[0] += 1
+        # Dias anteriores ao último registrado (fora de ordem) contam o desafio, mas não mexem no streak
+        if day == stats[2] + 1:
+            stats[1] += 1
+        elif day > stats[2]:
+            stats[1] = 1
+        stats[2] = max(stats[2], day)
+
+    def get(self, user) -> tuple:
+        """(desafios concluídos, streak) do usuário"""
+        stats = self._stats.get(user)
+        return (stats[0], stats[1]) if stats is not None else self._EMPTY
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def columns(self, users: Sequence) -> Dict[str, list]:
+        """Colunas challenges e streak na ordem dos usuários informados"""
+        values = [self.get(user) for user in users]
+        return {"challenges": [v[0] for v in values], "streak": [v[1] for v in values]}
+
+    def store_columns(self, store) -> Dict[str, Any]:
+        """Colunas challenges e streak de um UserStore (custo proporcional aos usuários com atividade)"""
+        np = _numpy_required()
+        challenges = np.zeros(len(store), dtype=np.int64)
+        streak = np.zeros(len(store), dtype=np.int64)
+        for user, stats in self._stats.items():
+            if getattr(user, "store", None) is store:
+                challenges[user.row] = stats[0]
+                streak[user.row] = stats[1]
+        return {"challenges": challenges, "streak": streak}
+
+
+# ---------------------------------------------------------------- análise
+
+_TOKEN = re.compile(r"""\s*(?:(?P<number>\d+(?:\.\d+)?)|(?P<string>"[^"]*"|'[^']*')|"""
+                    r"""(?P<name>[A-Za-z_][A-Za-z_0-9]*)|(?P<op>==|!=|<=|>=|<|>|\(|\)|,))""")
+_COMPARISONS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+                ">": operator.gt, ">=": operator.ge}
+# a op b  <=>  b FLIPPED[op] a
+_FLIPPED = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+_KEYWORDS = {"and", "or", "not", "in"}
+
+
+def _tokenize(text: str) -> List[tuple]:
+    tokens, position = [], 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Regra inválida: caractere inesperado na posição {position}: {text[position:]!r}")
+        group = match.lastgroup
+        value = match.group(group)
+        kind = value if group == "op" or (group == "name" and value in _KEYWORDS) else group
+        tokens.append((kind, value, match.start(group)))
+        position = match.end()
+    tokens.append(("end", "", len(text)))
+    return tokens
+
+
+class _Parser:
+    """Descida recursiva; produz uma árvore de tuplas (tipo, ...)."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def parse(self) -> tuple:
+        node = self._or()
+        self._expect("end")
+        return node
+
+    def _peek(self) -> str:
+        return self.tokens[self.position][0]
+
+    def _take(self) -> tuple:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _expect(self, kind: str) -> tuple:
+        token = self._take()
+        if token[0] != kind:
+            found = token[1] or "fim da regra"
+            raise ValueError(f"Regra inválida: esperado {kind!r}, encontrado {found!r} na posição {token[2]}")
+        return token
+
+    def _or(self) -> tuple:
+        parts = [self._and()]
+        while self._peek() == "or":
+            self._take()
+            parts.append(self._and())
+        return parts[0] if len(parts) == 1 else ("or", tuple(parts))
+
+    def _and(self) -> tuple:
+        parts = [self._not()]
+        while self._peek() == "and":
+            self._take()
+            parts.append(self._not())
+        return parts[0] if len(parts) == 1 else ("and", tuple(parts))
+
+    def _not(self) -> tuple:
+        if self._peek() == "not":
+            self._take()
+            return ("not", self._not())
+        return self._comparison()
+
+    def _comparison(self) -> tuple:
+        if self._peek() == "(":
+            self._take()
+            node = self._or()
+            self._expect(")")
+            return node
+        left = self._operand()
+        kind = self._peek()
+        if kind == "in":
+            self._take()
+            self._expect("(")
+            values = [self._literal()]
+            while self._peek() == ",":
+                self._take()
+                values.append(self._literal())
+            self._expect(")")
+            if left[0] != "field":
+                raise ValueError(f"Regra inválida: 'in' exige um campo à esquerda em {self.text!r}")
+            return _typed(("in", left, tuple(values)), self.text)
+        if kind not in _COMPARISONS:
+            raise ValueError(f"Regra inválida: esperada uma comparação na posição {self.tokens[self.position][2]}")
+        self._take()
+        right = self._operand()
+        if left[0] == "const" and right[0] == "field":
+            # Normaliza "10 <= points" para "points >= 10"
+            left, right, kind = right, left, _FLIPPED[kind]
+        return _typed(("cmp", kind, left, right), self.text)
+
+    def _operand(self) -> tuple:
+        if self._peek() == "name":
+            name = self._take()[1]
+            return ("field", name, rule_fields.get(name))
+        return ("const", self._literal())
+
+    def _literal(self):
+        kind, value, position = self._take()
+        if kind == "number":
+            return float(value) if "." in value else int(value)
+        if kind == "string":
+            return value[1:-1]
+        raise ValueError(f"Regra inválida: esperado um valor, encontrado {value or 'fim da regra'!r} "
+                         f"na posição {position}")
+
+
+def _kind_of(node: tuple) -> str:
+    if node[0] == "field":
+        return node[2].kind
+    return "str" if isinstance(node[1], str) else "int"
+
+
+def _typed(node: tuple, text: str) -> tuple:
+    """Valida os tipos da comparação na compilação (e não a cada avaliação)"""
+    if node[0] == "in":
+        kinds = {_kind_of(node[1])} | {"str" if isinstance(v, str) else "int" for v in node[2]}
+        op = "in"
+    else:
+        kinds = {_kind_of(node[2]), _kind_of(node[3])}
+        op = node[1]
+    if len(kinds) > 1:
+        raise ValueError(f"Regra inválida: comparação entre texto e número em {text!r}")
+    if kinds == {"str"} and op not in ("==", "!=", "in"):
+        raise ValueError(f"Regra inválida: texto só aceita ==, != e in em {text!r}")
+    return node
+
+
+# ------------------------------------------------------------- compilação
+
+def _closure(node: tuple, activity) -> Callable[[Any], Any]:
+    kind = node[0]
+    if kind == "field":
+        getter = node[2].getter
+        return lambda user: getter(user, activity)
+    if kind == "const":
+        value = node[1]
+        return lambda user: value
+    if kind == "cmp":
+        compare = _COMPARISONS[node[1]]
+        if node[2][0] == "field" and node[3][0] == "const":
+            # Caso comum (campo op valor): uma única chamada de getter, sem closures intermediárias
+            getter, value = node[2][2].getter, node[3][1]
+            return lambda user: compare(getter(user, activity), value)
+        left = _closure(node[2], activity)
+        right = _closure(node[3], activity)
+        return lambda user: compare(left(user), right(user))
+    if kind == "in":
+        left = _closure(node[1], activity)
+        values = frozenset(node[2])
+        return lambda user: left(user) in values
+    if kind == "not":
+        inner = _closure(node[1], activity)
+        return lambda user: not inner(user)
+    parts = [_closure(part, activity) for part in node[1]]
+    if kind == "and":
+        if len(parts) == 2:
+            first, second = parts
+            return lambda user: first(user) and second(user)
+        return lambda user: all(part(user) for part in parts)
+    if len(parts) == 2:
+        first, second = parts
+        return lambda user: first(user) or second(user)
+    return lambda user: any(part(user) for part in parts)
+
+
+class Categorical(NamedTuple):
+    """Coluna de texto codificada: códigos inteiros + categorias (ex.: role do UserStore)"""
+    codes: Any
+    categories: Sequence[str]
+
+
+def _numpy_required():
+    np = optional_import("numpy")
+    if np is None:
+        raise ValueError("A avaliação em massa requer o pacote numpy (pip install numpy).")
+    return np
+
+
+def _column(columns: Dict[str, Any], name: str, np):
+    if name not in columns:
+        raise ValueError(f"Coluna ausente para a regra: {name}. Disponíveis: {', '.join(columns)}")
+    column = columns[name]
+    return column if isinstance(column, Categorical) else np.asarray(column)
+
+
+def _codes_of(column: Categorical, values: Iterable[str]) -> List[int]:
+    positions = {category: code for code, category in enumerate(column.categories)}
+    return [positions[v] for v in values if v in positions]
+
+
+def _vector(node: tuple, columns: Dict[str, Any], np):
+    kind = node[0]
+    if kind == "field":
+        return _column(columns, node[1], np)
+    if kind == "const":
+        return node[1]
+    if kind == "cmp":
+        op, left, right = node[1], _vector(node[2], columns, np), _vector(node[3], columns, np)
+        if isinstance(left, Categorical) or isinstance(right, Categorical):
+            if isinstance(right, Categorical) or not isinstance(left, Categorical):
+                raise ValueError("Comparação entre campos de texto codificados não é suportada.")
+            # Texto comparado nos códigos: uma comparação de inteiros por usuário
+            codes = _codes_of(left, [right])
+            matched = (np.asarray(left.codes) == codes[0]) if codes else np.zeros(len(left.codes), dtype=bool)
+            return matched if op == "==" else ~matched
+        return _COMPARISONS[op](left, right)
+    if kind == "in":
+        left = _vector(node[1], columns, np)
+        if isinstance(left, Categorical):
+            return np.isin(np.asarray(left.codes), _codes_of(left, node[2]))
+        return np.isin(left, list(node[2]))
+    if kind == "not":
+        return np.logical_not(_vector(node[1], columns, np))
+    combine = np.logical_and if kind == "and" else np.logical_or
+    result = _vector(node[1][0], columns, np)
+    for part in node[1][1:]:
+        result = combine(result, _vector(part, columns, np))
+    return result
+
+
+@lru_cache(maxsize=1024)
+def _parse(text: str) -> tuple:
+    """Árvore da regra; o mesmo texto é analisado uma única vez por processo"""
+    return _Parser(text).parse()
+
+
+def _size(column) -> int:
+    return len(column.codes) if isinstance(column, Categorical) else len(column)
+
+
+def _fields_of(node: tuple, found: set) -> set:
+    if node[0] == "field":
+        found.add(node[1])
+    elif node[0] == "cmp":
+        _fields_of(node[2], found)
+        _fields_of(node[3], found)
+    elif node[0] in ("in", "not"):
+        _fields_of(node[1], found)
+    elif node[0] in ("and", "or"):
+        for part in node[1]:
+            _fields_of(part, found)
+    return found
+
+
+class Rule:
+    """Regra analisada e compilada uma única vez."""
+
+    def __init__(self, text: str, activity: ActivityTracker = None):
+        """
+        :param text: Expressão da regra (ver o docstring do módulo)
+        :param activity: Fonte dos campos challenges e streak na avaliação por usuário
+        """
+        self.text = text
+        self._tree = _parse(text)
+        self.fields = frozenset(_fields_of(self._tree, set()))
+        self._matches = _closure(self._tree, activity)
+
+    def matches(self, user) -> bool:
+        return bool(self._matches(user))
+
+    __call__ = matches
+
+    def mask(self, columns: Dict[str, Any]):
+        """
+        Avalia a regra para todos os usuários de uma vez.
+        :param columns: Nome do campo -> array/sequência (ou Categorical), uma posição por usuário
+        :return: Array NumPy de bool
+        """
+        np = _numpy_required()
+        size = _size(next(iter(columns.values()))) if columns else 0
+        result = _vector(self._tree, columns, np)
+        return np.broadcast_to(np.asarray(result, dtype=bool), (size,))
+
+    def __repr__(self) -> str:
+        return f"Rule({self.text!r})"
+
+
+@dataclass
+class RuleAchievement(Achievement):
+    """Conquista desbloqueada por uma regra (ex.: 'points >= 500 and streak >= 7')."""
+    rule: str = ""
+    activity: Optional[ActivityTracker] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._rule = Rule(self.rule, self.activity)
+
+    @property
+    def compiled(self) -> Rule:
+        return self._rule
+
+    def is_unlocked(self, user) -> bool:
+        return self._rule.matches(user)
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data["rule"] = self.rule
+        return data
+
+
+# ------------------------------------------------------- avaliação em massa
+
+def store_columns(store, fields: Iterable[str] = ("points", "achievements", "role"),
+                  activity: ActivityTracker = None) -> Dict[str, Any]:
+    """
+    Colunas de um UserStore para Rule.mask, sem materializar um objeto por usuário.
+    Pontos e papéis são copiados dos arrays do store: uma visão direta (frombuffer)
+    impediria o store de crescer (BufferError em append) enquanto as colunas existissem.
+    """
+    np = _numpy_required()
+    fields = set(fields)
+    columns: Dict[str, Any] = {}
+    if "points" in fields:
+        columns["points"] = np.array(store.points, dtype=np.int64)
+    if "role" in fields:
+        columns["role"] = Categorical(np.array(store.role_codes, dtype=np.uint8), store.roles)
+    if "achievements" in fields:
+        columns["achievements"] = np.array(store.achievement_counts(), dtype=np.int64)
+    if fields & {"challenges", "streak"}:
+        if activity is not None:
+            columns.update(activity.store_columns(store))
+        else:
+            columns["challenges"] = columns["streak"] = np.zeros(len(store), dtype=np.int64)
+    return columns
+
+
+def reader_columns(reader, fields: Iterable[str]) -> Dict[str, Any]:
+    """Colunas de um relatório colunar (relatorios.columnar.ColumnarReader); texto fica codificado"""
+    np = _numpy_required()
+    columns: Dict[str, Any] = {}
+    for name in fields:
+        raw = np.asarray(reader.raw(name))
+        columns[name] = Categorical(raw, reader.dictionary(name)) if reader.type_of(name) == "string" else raw
+    return columns
+
+
+def sweep(achievements: Iterable, columns: Dict[str, Any], held: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Varredura "quem desbloqueou o quê": avalia cada RuleAchievement sobre todas as linhas.
+    :param columns: Colunas dos usuários (store_columns, reader_columns ou arrays próprios)
+    :param held: Nome da conquista -> máscara de quem já a possui (excluídos do resultado)
+    :return: Nome da conquista -> índices (linhas) dos usuários que a desbloquearam
+    """
+    np = _numpy_required()
+    result = {}
+    for achievement in achievements:
+        mask = achievement.compiled.mask(columns)
+        if held and achievement.name in held:
+            mask = mask & ~np.asarray(held[achievement.name], dtype=bool)
+        result[achievement.name] = np.flatnonzero(mask)
+    return result
@@ -0,0 +1,246 @@
+"""
+Rankings por janela de tempo (dia, semana, temporada).
+
+Cada pontuação recebida entra no bucket atual de cada resolução (ex.: hora
+e dia); a janela "day" soma as últimas 24 horas em buckets de hora e a
+"week" os últimos 7 dias em buckets de dia. Os buckets de uma resolução
+ficam em uma roda de tempo (timing wheel): quando o relógio avança, só os
+buckets que saíram da janela são visitados e seus pontos descontados, sem
+varrer o histórico. Janelas "tumbling" (ex.: temporada) não têm buckets:
+são zeradas ao fim de cada período.
+
+Por usuário, a memória fica limitada a um valor por bucket ainda ativo em
+cada roda e uma entrada por janela; quem para de pontuar sai das janelas
+deslizantes quando os buckets expiram.
+"""
+
+import time
+from dataclasses import dataclass
+from threading import RLock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from gamificacao.leaderboard import Leaderboard
+from usuarios.user import User
+
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+
+@dataclass(frozen=True)
+class Window:
+    """
+    :param span: Duração da janela em segundos
+    :param resolution: Tamanho do bucket em segundos (a janela expira um bucket por vez)
+    :param tumbling: True para períodos fixos zerados no fim (ex.: temporada), False para janela deslizante
+    :param origin: Início do primeiro período (janelas tumbling), em segundos desde a época
+    """
+    name: str
+    span: float
+    resolution: float = HOUR
+    tumbling: bool = False
+    origin: float = 0.0
+
+    @property
+    def buckets(self) -> int:
+        return max(1, int(round(self.span / self.resolution)))
+
+
+DEFAULT_WINDOWS = (Window("day", DAY, HOUR), Window("week", WEEK, DAY))
+
+
+class _WindowState:
+    """Totais de uma janela e o Leaderboard que responde top/rank."""
+
+    def __init__(self, window: Window, seed: Optional[int]):
+        self.window = window
+        self.seed = seed
+        self.totals: Dict[Any, int] = {}
+        self.ranking = Leaderboard(sync=False, seed=seed)
+        self.period: Optional[int] = None
+
+    def add(self, member, points) -> None:
+        total = self.totals.get(member, 0) + points
+        if total:
+            self.totals[member] = total
+            self.ranking.update(member, total)
+        else:
+            self.totals.pop(member, None)
+            self.ranking.discard(member)
+
+    def reset(self) -> None:
+        self.totals = {}
+        self.ranking = Leaderboard(sync=False, seed=self.seed)
+
+
+class _BucketWheel:
+    """Roda de buckets de uma resolução; cada slot guarda membro -> pontos do bucket."""
+
+    def __init__(self, resolution: float, windows: List[_WindowState]):
+        self.resolution = resolution
+        self.windows = windows
+        self.size = max(w.window.buckets for w in windows) + 1
+        self.slots: List[Dict[Any, int]] = [{} for _ in range(self.size)]
+        self.current: Optional[int] = None
+
+    def bucket_of(self, timestamp: float) -> int:
+        return int(timestamp // self.resolution)
+
+    def add(self, member, points, bucket: int) -> None:
+        slot = self.slots[bucket % self.size]
+        slot[member] = slot.get(member, 0) + points
+
+    def advance(self, bucket: int) -> None:
+        """Move o relógio para `bucket`, descontando das janelas os buckets que saíram delas"""
+        previous = self.current
+        self.current = bucket
+        if previous is None or bucket <= previous:
+            return
+        if bucket - previous >= self.size:
+            # Ficou parada mais que a maior janela: tudo expirou
+            for slot in self.slots:
+                slot.clear()
+            for state in self.windows:
+                state.reset()
+            return
+        for state in self.windows:
+            length = state.window.buckets
+            for expired in range(previous - length + 1, bucket - length + 1):
+                for member, points in self.slots[expired % self.size].items():
+                    state.add(member, -points)
+        # Slots que saíram da maior janela ficam livres para os próximos buckets
+        for expired in range(previous - self.size + 2, bucket - self.size + 2):
+            self.slots[expired % self.size].clear()
+
+
+class _WindowView:
+    """Visão de uma janela com a interface de consulta do Leaderboard (usável no RankingAdapter)."""
+
+    def __init__(self, owner: "WindowedLeaderboard", state: _WindowState):
+        self._owner = owner
+        self._state = state
+        self.name = state.window.name
+
+    def __len__(self) -> int:
+        with self._owner._sync():
+            return len(self._state.totals)
+
+    def __contains__(self, member) -> bool:
+        with self._owner._sync():
+            return member in self._state.totals
+
+    def score(self, member):
+        with self._owner._sync():
+            return self._state.totals.get(member)
+
+    def rank(self, member) -> Optional[int]:
+        with self._owner._sync():
+            return self._state.ranking.rank(member)
+
+    def top(self, n: int = 10) -> List[Tuple[Any, Any]]:
+        with self._owner._sync():
+            return self._state.ranking.top(n)
+
+    def around(self, member, radius: int = 5) -> List[Tuple[int, Any, Any]]:
+        with self._owner._sync():
+            return self._state.ranking.around(member, radius)
+
+
+class WindowedLeaderboard:
+    """
+    Rankings por janela alimentados pelas pontuações (User.add_points ou record()).
+
+        boards = WindowedLeaderboard()                      # "day" e "week" deslizantes
+        boards.window("week").top(10)
+        boards.window("day").rank(aluno)
+
+    Pontuações com timestamp anterior ao relógio atual entram no bucket atual.
+    """
+
+    def __init__(self, windows: Iterable[Window] = DEFAULT_WINDOWS, sync: bool = True,
+                 clock: Callable[[], float] = time.time, seed: Optional[int] = None):
+        """
+        :param windows: Janelas mantidas (nomes únicos)
+        :param sync: Registra-se como observer de pontos dos usuários (referência fraca:
+            o acompanhamento dura enquanto houver uma referência a este objeto)
+        :param clock: Relógio em segundos (substituível para replays e simulações)
+        """
+        self._clock = clock
+        self._lock = RLock()
+        self._states: Dict[str, _WindowState] = {}
+        for window in windows:
+            if window.name in self._states:
+                raise ValueError(f"Janela duplicada: {window.name}")
+            self._states[window.name] = _WindowState(window, seed)
+        by_resolution: Dict[float, List[_WindowState]] = {}
+        for state in self._states.values():
+            if not state.window.tumbling:
+                by_resolution.setdefault(state.window.resolution, []).append(state)
+        self._wheels = [_BucketWheel(resolution, states) for resolution, states in by_resolution.items()]
+        self._tumbling = [s for s in self._states.values() if s.window.tumbling]
+        self._now = float("-inf")
+        self._sync_points = sync
+        if sync:
+            User.subscribe_points(self)
+
+    def _sync(self):
+        """Avança o relógio até agora e retorna o lock (para uso em with)"""
+        with self._lock:
+            self._advance(self._clock())
+        return self._lock
+
+    def _advance(self, now: float) -> None:
+        if now <= self._now:
+            return
+        self._now = now
+        for wheel in self._wheels:
+            wheel.advance(wheel.bucket_of(now))
+        for state in self._tumbling:
+            period = int((now - state.window.origin) // state.window.span)
+            if state.period != period:
+                if state.period is not None:
+                    state.reset()
+                state.period = period
+
+    def record(self, member, points: int, timestamp: float = None) -> None:
+        """Registra uma pontuação (positiva ou negativa) do membro"""
+        if not points:
+            return
+        with self._lock:
+            self._advance(self._clock() if timestamp is None else timestamp)
+            for wheel in self._wheels:
+                wheel.add(member, points, wheel.current)
+                for state in wheel.windows:
+                    state.add(member, points)
+            for state in self._tumbling:
+                state.add(member, points)
+
+    def points_changed(self, user, old_points, new_points) -> None:
+        """Observer de User.add_points"""
+        self.record(user, new_points - old_points)
+
+    def advance(self, timestamp: float = None) -> None:
+        """Expira os buckets vencidos até `timestamp` (padrão: agora), sem esperar uma consulta"""
+        with self._lock:
+            self._advance(self._clock() if timestamp is None else timestamp)
+
+    def window(self, name: str) -> _WindowView:
+        state = self._states.get(name)
+        if state is None:
+            raise ValueError(f"Janela desconhecida: {name}. Disponíveis: {', '.join(self._states)}")
+        return _WindowView(self, state)
+
+    def windows(self) -> List[str]:
+        return list(self._states)
+
+    def top(self, name: str, n: int = 10) -> List[Tuple[Any, Any]]:
+        return self.window(name).top(n)
+
+    def rank(self, name: str, member) -> Optional[int]:
+        return self.window(name).rank(member)
+
+    def close(self) -> None:
+        """Deixa de acompanhar as alterações de pontos dos usuários"""
+        if self._sync_points:
+            User.unsubscribe_points(self)
+            self._sync_points = False
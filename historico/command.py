@@ -2,6 +2,7 @@
 Módulo de histórico de ações usando Command Pattern.
 Permite registrar ações e desfazer (undo) quando necessário.
 """
+from collections import deque
 
 
 class ActionCommand:
@@ -34,23 +35,61 @@ class LogAction(ActionCommand):
 class ActionHistory:
     """
     Invoker/History: mantém a lista de comandos e permite undo.
+
+    Com um CommandLog, cada execução e cada undo também são gravados no log
+    persistente (o undo como registro de compensação), e o histórico pode ser
+    reconstruído após um reinício com ActionHistory.restore().
     """
-    def __init__(self):
-        self.history = []
+    def __init__(self, log=None, user: str = "", verbose: bool = True, max_in_memory: int = None):
+        """
+        :param log: CommandLog opcional para persistir o histórico
+        :param user: Usuário dono deste histórico (chave do índice no log)
+        :param verbose: Exibe as ações no console
+        :param max_in_memory: Limite de comandos mantidos em memória (os mais antigos saem)
+        """
+        self.log = log
+        self.user = user
+        self.verbose = verbose
+        self.history = [] if max_in_memory is None else deque(maxlen=max_in_memory)
+        self._seqs = [] if max_in_memory is None else deque(maxlen=max_in_memory)
+
+    def _print(self, message: str):
+        if self.verbose:
+            print(f"[Histórico] {message}")
 
     def execute(self, command: ActionCommand):
         result = command.execute()
         self.history.append(command)
-        print(f"[Histórico] {result}")
+        if self.log is not None:
+            payload = str(getattr(command, "description", "")).encode("utf-8")
+            self._seqs.append(self.log.execute(self.user, type(command).__name__, payload))
+        self._print(result)
 
     def undo_last(self):
         if not self.history:
-            print("[Histórico] Nenhuma ação para desfazer.")
+            self._print("Nenhuma ação para desfazer.")
             return
         command = self.history.pop()
         undone = command.undo()
-        print(f"[Histórico] {undone}")
+        if self.log is not None and self._seqs:
+            self.log.undo(self._seqs.pop())
+        self._print(undone)
 
     def clear(self):
         self.history.clear()
-        print("[Histórico] Histórico limpo.")
+        self._seqs.clear()
+        self._print("Histórico limpo.")
+
+    @classmethod
+    def restore(cls, log, user: str, since: float = None, factories: dict = None, **kwargs) -> "ActionHistory":
+        """
+        Reconstrói o histórico de um usuário a partir do log, sem reexecutar os comandos.
+        :param factories: Tipo do comando -> função que recebe a descrição e devolve o comando
+        """
+        factories = {"LogAction": LogAction, **(factories or {})}
+        history = cls(log=log, user=user, **kwargs)
+        for record in log.live_commands(user, since=since):
+            factory = factories.get(record.command_type, LogAction)
+            history.history.append(factory(record.payload.decode("utf-8")))
+            history._seqs.append(record.seq)
+        return history
@@ -0,0 +1,436 @@
+"""
+Log persistente (append-only) de comandos do histórico de ações.
+
+Cada registro é binário e compacto:
+
+    tamanho u32 | crc32 u32 | seq u64 | tipo u8 | timestamp f64 | ref u64 |
+    len(usuário) u16 | len(tipo do comando) u16 | len(payload) u32 | dados...
+
+Os registros ficam em segmentos (arquivos "<seq inicial>.log") que são
+rotacionados por tamanho e lidos via mmap. Desfazer um comando não apaga
+nada: grava um registro de compensação (UNDO) que referencia o seq original.
+A compactação reescreve segmentos fechados removendo pares EXECUTE/UNDO.
+
+Um índice por usuário (timestamp, seq) permite reproduzir a atividade de
+um usuário num intervalo sem percorrer o histórico de todos. Para segmentos
+fechados o índice é salvo ao lado do segmento (".idx") e carregado na
+abertura, sem reler os registros.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+EXECUTE = 1
+UNDO = 2
+
+_HEADER = struct.Struct("<IIQBdQHHI")
+_CRC_START = 8  # o CRC cobre tudo a partir do seq
+
+
+class LogRecord(NamedTuple):
+    seq: int
+    kind: int
+    timestamp: float
+    user: str
+    command_type: str
+    payload: bytes
+    ref: int
+
+
+def _encode(seq: int, kind: int, timestamp: float, ref: int, user: str, command_type: str, payload: bytes) -> bytes:
+    user_b = user.encode("utf-8")
+    type_b = command_type.encode("utf-8")
+    length = _HEADER.size + len(user_b) + len(type_b) + len(payload)
+    body = bytearray(_HEADER.pack(length, 0, seq, kind, timestamp, ref, len(user_b), len(type_b), len(payload)))
+    body += user_b
+    body += type_b
+    body += payload
+    struct.pack_into("<I", body, 4, zlib.crc32(memoryview(body)[_CRC_START:]))
+    return bytes(body)
+
+
+def _decode(buffer, pos: int, limit: int) -> Optional[LogRecord]:
+    """Lê o registro na posição; retorna None se estiver truncado ou corrompido."""
+    if pos + _HEADER.size > limit:
+        return None
+    length, crc, seq, kind, ts, ref, user_len, type_len, payload_len = _HEADER.unpack_from(buffer, pos)
+    if length != _HEADER.size + user_len + type_len + payload_len or pos + length > limit:
+        return None
+    if zlib.crc32(buffer[pos + _CRC_START:pos + length]) != crc:
+        return None
+    start = pos + _HEADER.size
+    user = bytes(buffer[start:start + user_len]).decode("utf-8")
+    start += user_len
+    command_type = bytes(buffer[start:start + type_len]).decode("utf-8")
+    start += type_len
+    payload = bytes(buffer[start:start + payload_len])
+    return LogRecord(seq, kind, ts, user, command_type, payload, ref)
+
+
+class _Segment:
+    """Um arquivo de log com o mapa seq -> posição dos seus registros."""
+
+    def __init__(self, directory: str, base: int):
+        self.base = base
+        self.path = os.path.join(directory, f"{base:020d}.log")
+        self.index_path = self.path[:-4] + ".idx"
+        self.seqs = array("Q")
+        self.positions = array("Q")
+        self.size = 0
+        self._map = None
+        self._mapped_size = 0
+
+    def view(self):
+        """mmap somente leitura do segmento, remapeado se o arquivo cresceu."""
+        if self.size == 0:
+            return b""
+        if self._map is None or self._mapped_size < self.size:
+            self.close_map()
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_size = len(self._map)
+        return self._map
+
+    def position_of(self, seq: int) -> Optional[int]:
+        i = bisect_left(self.seqs, seq)
+        if i < len(self.seqs) and self.seqs[i] == seq:
+            return self.positions[i]
+        return None
+
+    def close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._mapped_size = 0
+
+
+class CommandLog:
+    """
+    Log segmentado e durável de comandos.
+    :param directory: Pasta dos segmentos
+    :param segment_bytes: Tamanho a partir do qual o segmento ativo é fechado e um novo é aberto
+    :param sync_interval: Intervalo (s) do group commit: um único fsync cobre todos os registros pendentes
+    :param sync_every: Quantidade de registros pendentes que antecipa o fsync
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 sync_interval: float = 0.05, sync_every: int = 256):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.sync_interval = sync_interval
+        self.sync_every = sync_every
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._synced = threading.Condition(self._lock)
+        self._segments: List[_Segment] = []
+        self._user_index: Dict[str, tuple] = {}
+        self._undone: Dict[int, int] = {}  # seq executado -> seq do UNDO
+        self._next_seq = 0
+        self._synced_seq = -1
+        self._unsynced = 0
+        self._closed = False
+        self._load()
+        self._writer = open(self._segments[-1].path, "ab")
+        self._committer = threading.Thread(target=self._commit_loop, name="command-log-sync", daemon=True)
+        self._committer.start()
+
+    # ------------------------------------------------------------------ abertura
+
+    def _load(self) -> None:
+        bases = sorted(int(name[:-4]) for name in os.listdir(self.directory) if name.endswith(".log"))
+        for i, base in enumerate(bases):
+            segment = _Segment(self.directory, base)
+            segment.size = os.path.getsize(segment.path)
+            sealed = i < len(bases) - 1
+            if not (sealed and self._load_sidecar(segment)):
+                self._scan(segment, truncate=not sealed)
+                if sealed:
+                    self._write_sidecar(segment)
+            self._segments.append(segment)
+            self._next_seq = max(self._next_seq, base)
+        if not self._segments:
+            segment = _Segment(self.directory, 0)
+            open(segment.path, "ab").close()
+            self._segments.append(segment)
+        self._synced_seq = self._next_seq - 1
+
+    def _scan(self, segment: _Segment, truncate: bool) -> None:
+        buffer = segment.view()
+        pos = 0
+        while pos < segment.size:
+            record = _decode(buffer, pos, segment.size)
+            if record is None:
+                break
+            self._index(segment, record, pos)
+            pos += struct.unpack_from("<I", buffer, pos)[0]
+        if pos < segment.size and truncate:
+            # Cauda parcial de uma escrita interrompida: descarta
+            segment.close_map()
+            with open(segment.path, "r+b") as f:
+                f.truncate(pos)
+            segment.size = pos
+
+    def _load_sidecar(self, segment: _Segment) -> bool:
+        try:
+            with open(segment.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            stat = os.stat(segment.path)
+        except (OSError, ValueError):
+            return False
+        # Índice de outra versão do segmento (ex.: queda entre a compactação e a
+        # gravação do índice): descarta e reconstrói a partir dos registros
+        if data.get("size") != stat.st_size or data.get("mtime_ns") != stat.st_mtime_ns:
+            return False
+        segment.seqs = array("Q", data["seqs"])
+        segment.positions = array("Q", data["positions"])
+        for user, entries in data["users"].items():
+            for ts, seq in entries:
+                self._index_user(user, ts, seq)
+        for seq, undo_seq in data["undone"]:
+            self._undone[seq] = undo_seq
+        if segment.seqs:
+            self._next_seq = max(self._next_seq, segment.seqs[-1] + 1)
+        return True
+
+    def _write_sidecar(self, segment: _Segment) -> None:
+        buffer = segment.view()
+        users: Dict[str, list] = {}
+        undone = []
+        for pos in segment.positions.tolist():
+            record = _decode(buffer, pos, segment.size)
+            users.setdefault(record.user, []).append([record.timestamp, record.seq])
+            if record.kind == UNDO:
+                undone.append([record.ref, record.seq])
+        stat = os.stat(segment.path)
+        data = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "seqs": segment.seqs.tolist(), "positions": segment.positions.tolist(),
+                "users": users, "undone": undone}
+        tmp = segment.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, segment.index_path)
+
+    def _index(self, segment: _Segment, record: LogRecord, pos: int) -> None:
+        segment.seqs.append(record.seq)
+        segment.positions.append(pos)
+        self._index_user(record.user, record.timestamp, record.seq)
+        if record.kind == UNDO:
+            self._undone[record.ref] = record.seq
+        self._next_seq = max(self._next_seq, record.seq + 1)
+
+    def _index_user(self, user: str, timestamp: float, seq: int) -> None:
+        entry = self._user_index.get(user)
+        if entry is None:
+            entry = self._user_index[user] = (array("d"), array("Q"))
+        timestamps, seqs = entry
+        if not seqs or seq > seqs[-1]:
+            timestamps.append(timestamp)
+            seqs.append(seq)
+        else:
+            i = bisect_left(seqs, seq)
+            timestamps.insert(i, timestamp)
+            seqs.insert(i, seq)
+
+    # ------------------------------------------------------------------ escrita
+
+    def append(self, kind: int, user: str, command_type: str, payload: bytes = b"",
+               ref: int = 0, durable: bool = False) -> int:
+        """
+        Acrescenta um registro e retorna seu seq.
+        :param durable: Espera o fsync (group commit) que cobre este registro
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("CommandLog já foi fechado.")
+            seq = self._next_seq
+            self._next_seq += 1
+            timestamp = time.time()
+            data = _encode(seq, kind, timestamp, ref, user, command_type, payload)
+            segment = self._segments[-1]
+            self._writer.write(data)
+            self._index(segment, LogRecord(seq, kind, timestamp, user, command_type, payload, ref), segment.size)
+            segment.size += len(data)
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                self._synced.notify_all()
+            if segment.size >= self.segment_bytes:
+                self._rotate()
+            if durable:
+                self._synced.wait_for(lambda: self._synced_seq >= seq or self._closed)
+            return seq
+
+    def execute(self, user: str, command_type: str, payload: bytes = b"", durable: bool = False) -> int:
+        """Registra a execução de um comando."""
+        return self.append(EXECUTE, user, command_type, payload, durable=durable)
+
+    def undo(self, seq: int, durable: bool = False) -> int:
+        """Registra o desfazer de um comando (registro de compensação)."""
+        with self._lock:
+            record = self.read(seq)
+            if record is None or record.kind != EXECUTE:
+                raise ValueError(f"Registro {seq} não é um comando executado.")
+            if seq in self._undone:
+                raise ValueError(f"Registro {seq} já foi desfeito.")
+            return self.append(UNDO, record.user, record.command_type, b"", ref=seq, durable=durable)
+
+    def sync(self) -> None:
+        """Grava em disco (fsync) todos os registros pendentes."""
+        with self._lock:
+            self._flush_and_sync()
+
+    def _flush_and_sync(self) -> None:
+        if self._writer.closed:
+            return
+        self._writer.flush()
+        if self._unsynced:
+            os.fsync(self._writer.fileno())
+            self._unsynced = 0
+        self._synced_seq = self._next_seq - 1
+        self._synced.notify_all()
+
+    def _commit_loop(self) -> None:
+        with self._lock:
+            while not self._closed:
+                self._synced.wait(self.sync_interval)
+                if self._unsynced:
+                    self._flush_and_sync()
+
+    def _rotate(self) -> None:
+        self._flush_and_sync()
+        self._writer.close()
+        sealed = self._segments[-1]
+        self._write_sidecar(sealed)
+        segment = _Segment(self.directory, self._next_seq)
+        self._segments.append(segment)
+        self._writer = open(segment.path, "ab")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_and_sync()
+            self._closed = True
+            self._synced.notify_all()
+            self._writer.close()
+        self._committer.join()
+        for segment in self._segments:
+            segment.close_map()
+
+    # ------------------------------------------------------------------ leitura
+
+    def _segment_of(self, seq: int) -> Optional[_Segment]:
+        bases = [s.base for s in self._segments]
+        i = bisect_right(bases, seq) - 1
+        return self._segments[i] if i >= 0 else None
+
+    def read(self, seq: int) -> Optional[LogRecord]:
+        """Lê um registro pelo seq (None se não existir ou tiver sido compactado)."""
+        with self._lock:
+            segment = self._segment_of(seq)
+            if segment is None:
+                return None
+            pos = segment.position_of(seq)
+            if pos is None:
+                return None
+            if segment is self._segments[-1]:
+                self._writer.flush()
+            record = _decode(segment.view(), pos, segment.size)
+            # Um índice desatualizado apontaria para outro registro
+            return record if record is not None and record.seq == seq else None
+
+    def replay(self, from_seq: int = 0) -> Iterator[LogRecord]:
+        """Percorre todos os registros a partir de um seq, na ordem de gravação."""
+        with self._lock:
+            segments = [s for s in self._segments if not s.seqs or s.seqs[-1] >= from_seq]
+        for segment in segments:
+            start = bisect_left(segment.seqs, from_seq)
+            for seq in segment.seqs[start:].tolist():
+                record = self.read(seq)
+                if record is not None:
+                    yield record
+
+    def replay_user(self, user: str, since: float = None, until: float = None) -> Iterator[LogRecord]:
+        """Percorre os registros de um usuário num intervalo de tempo, usando o índice por usuário."""
+        with self._lock:
+            entry = self._user_index.get(user)
+            if entry is None:
+                return
+            timestamps, seqs = entry
+            lo = 0 if since is None else bisect_left(timestamps, since)
+            hi = len(timestamps) if until is None else bisect_right(timestamps, until)
+            wanted = seqs[lo:hi].tolist()
+        for seq in wanted:
+            record = self.read(seq)
+            if record is not None:
+                yield record
+
+    def live_commands(self, user: str, since: float = None, until: float = None) -> Iterator[LogRecord]:
+        """Comandos executados pelo usuário que não foram desfeitos."""
+        for record in self.replay_user(user, since, until):
+            if record.kind == EXECUTE and record.seq not in self._undone:
+                yield record
+
+    def is_undone(self, seq: int) -> bool:
+        return seq in self._undone
+
+    # ------------------------------------------------------------------ compactação
+
+    def compact(self) -> int:
+        """
+        Remove dos segmentos fechados os comandos desfeitos junto com seus UNDOs
+        (quando ambos estão em segmentos fechados). Retorna quantos registros saíram.
+        """
+        with self._lock:
+            sealed = self._segments[:-1]
+            if not sealed:
+                return 0
+            limit = self._segments[-1].base
+            dropped = {seq for seq, undo in self._undone.items() if undo < limit}
+            dropped |= {self._undone[seq] for seq in dropped}
+            removed = 0
+            for segment in sealed:
+                if any(seq in dropped for seq in segment.seqs):
+                    removed += self._rewrite(segment, dropped)
+            for seq in list(self._undone):
+                if seq in dropped:
+                    del self._undone[seq]
+            for user, (timestamps, seqs) in list(self._user_index.items()):
+                keep = [i for i, seq in enumerate(seqs) if seq not in dropped]
+                if len(keep) != len(seqs):
+                    self._user_index[user] = (array("d", (timestamps[i] for i in keep)),
+                                              array("Q", (seqs[i] for i in keep)))
+            for segment in sealed:
+                self._write_sidecar(segment)
+            return removed
+
+    def _rewrite(self, segment: _Segment, dropped: set) -> int:
+        buffer = segment.view()
+        tmp = segment.path + ".tmp"
+        seqs, positions = array("Q"), array("Q")
+        removed = 0
+        with open(tmp, "wb") as out:
+            pos = 0
+            for seq, old_pos in zip(segment.seqs.tolist(), segment.positions.tolist()):
+                length = struct.unpack_from("<I", buffer, old_pos)[0]
+                if seq in dropped:
+                    removed += 1
+                    continue
+                out.write(buffer[old_pos:old_pos + length])
+                seqs.append(seq)
+                positions.append(pos)
+                pos += length
+            out.flush()
+            os.fsync(out.fileno())
+        segment.close_map()
+        os.replace(tmp, segment.path)
+        segment.seqs, segment.positions, segment.size = seqs, positions, pos
+        return removed
@@ -0,0 +1,433 @@
+"""
+Livro-razão (ledger) de pontos: cada alteração de pontos vira um evento
+imutável (usuário, delta, desafio de origem, estratégia, timestamp).
+
+Os eventos são gravados em segmentos append-only ("<seq inicial>.ledger").
+Periodicamente os totais de todos os usuários são salvos em um snapshot
+compacto ("<seq>.snap"); cada snapshot fecha o segmento atual, então a
+abertura carrega o snapshot mais recente e reproduz apenas os segmentos
+seguintes. Consultas "pontos em uma data" partem do snapshot anterior à
+data e reproduzem só o trecho entre ele e a data.
+
+Para saber a origem de pontos concedidos via User.add_points, use o
+contexto de concessão da thread:
+
+    ledger.attach()
+    with award_context(challenge):          # ou award_context("Quiz 1", "TimeBasedScoring")
+        user.add_points(challenge.evaluate(submission, context))
+"""
+
+import os
+import struct
+import threading
+import time
+import weakref
+import zlib
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from usuarios.locks import USER_LOCKS
+from usuarios.user import User
+
+# tamanho u32 | crc32 u32 | seq u64 | timestamp f64 | delta i64 | len(usuário) u16 | len(desafio) u16 | len(estratégia) u16
+_RECORD = struct.Struct("<IIQdqHHH")
+_CRC_START = 8
+# magic | seq | timestamp | usuários | bytes dos nomes | crc32
+_SNAPSHOT = struct.Struct("<8sQdIQI")
+_MAGIC = b"PLEDGER1"
+
+
+class PointsEvent(NamedTuple):
+    seq: int
+    timestamp: float
+    user: str
+    delta: int
+    challenge: str
+    strategy: str
+
+
+class _Snapshot(NamedTuple):
+    seq: int           # primeiro evento NÃO incluído
+    timestamp: float   # timestamp do último evento incluído
+    path: str
+
+
+_context = threading.local()
+
+
+@contextmanager
+def award_context(challenge=None, strategy: str = None):
+    """
+    Define a origem dos pontos concedidos nesta thread enquanto o bloco executa.
+    :param challenge: Challenge (título e estratégia são extraídos) ou o nome do desafio
+    :param strategy: Nome da estratégia (opcional se `challenge` for um Challenge)
+    """
+    if challenge is not None and not isinstance(challenge, str):
+        strategy = strategy or type(challenge.strategy).__name__
+        challenge = challenge.title
+    previous = getattr(_context, "source", None)
+    _context.source = (challenge or "", strategy or "")
+    try:
+        yield
+    finally:
+        _context.source = previous
+
+
+def _encode(seq: int, timestamp: float, user: str, delta: int, challenge: str, strategy: str) -> bytes:
+    user_b, challenge_b, strategy_b = user.encode("utf-8"), challenge.encode("utf-8"), strategy.encode("utf-8")
+    length = _RECORD.size + len(user_b) + len(challenge_b) + len(strategy_b)
+    body = bytearray(_RECORD.pack(length, 0, seq, timestamp, delta, len(user_b), len(challenge_b), len(strategy_b)))
+    body += user_b
+    body += challenge_b
+    body += strategy_b
+    struct.pack_into("<I", body, 4, zlib.crc32(memoryview(body)[_CRC_START:]))
+    return bytes(body)
+
+
+def _decode_all(buffer: bytes) -> Iterator[tuple]:
+    """Percorre os registros válidos do buffer: (posição final, evento). Para no primeiro registro inválido."""
+    pos, size = 0, len(buffer)
+    unpack = _RECORD.unpack_from
+    while pos + _RECORD.size <= size:
+        length, crc, seq, ts, delta, user_len, challenge_len, strategy_len = unpack(buffer, pos)
+        if length != _RECORD.size + user_len + challenge_len + strategy_len or pos + length > size:
+            return
+        if zlib.crc32(buffer[pos + _CRC_START:pos + length]) != crc:
+            return
+        start = pos + _RECORD.size
+        user = buffer[start:start + user_len].decode("utf-8")
+        start += user_len
+        challenge = buffer[start:start + challenge_len].decode("utf-8")
+        start += challenge_len
+        strategy = buffer[start:start + strategy_len].decode("utf-8")
+        pos += length
+        yield pos, PointsEvent(seq, ts, user, delta, challenge, strategy)
+
+
+class PointsLedger:
+    """
+    Ledger de pontos com snapshots.
+    :param directory: Pasta dos segmentos e snapshots
+    :param snapshot_every: Eventos entre snapshots automáticos (0 = só em snapshot())
+    :param segment_bytes: Tamanho máximo de um segmento antes de abrir outro
+    :param keep_snapshots: Quantos snapshots manter (None = todos; mais snapshots = consultas por data mais rápidas)
+    """
+
+    def __init__(self, directory: str, snapshot_every: int = 1_000_000, segment_bytes: int = 64 * 1024 * 1024,
+                 keep_snapshots: Optional[int] = None):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.segment_bytes = segment_bytes
+        self.keep_snapshots = keep_snapshots
+        os.makedirs(directory, exist_ok=True)
+        self.totals: Dict[str, int] = {}
+        # Os totais são por nome: cada nome pertence a um único usuário em memória
+        self._owners = weakref.WeakValueDictionary()
+        self._lock = threading.RLock()
+        self._segments: List[int] = []
+        self._snapshots: List[_Snapshot] = []
+        self._snapshot_cache: Dict[str, Dict[str, int]] = {}
+        self._next_seq = 0
+        self._last_timestamp = 0.0
+        self._since_snapshot = 0
+        self._segment_size = 0
+        self._closed = False
+        self._load()
+        self._writer = open(self._segment_path(self._segments[-1]), "ab")
+
+    # ------------------------------------------------------------------ arquivos
+
+    def _segment_path(self, base: int) -> str:
+        return os.path.join(self.directory, f"{base:020d}.ledger")
+
+    def _snapshot_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:020d}.snap")
+
+    def _load(self) -> None:
+        names = os.listdir(self.directory)
+        self._segments = sorted(int(n[:-7]) for n in names if n.endswith(".ledger"))
+        for seq in sorted(int(n[:-5]) for n in names if n.endswith(".snap")):
+            header = self._read_snapshot_header(self._snapshot_path(seq))
+            if header is not None:
+                self._snapshots.append(_Snapshot(seq, header[2], self._snapshot_path(seq)))
+
+        # Snapshot mais recente que estiver íntegro (um snapshot corrompido é ignorado)
+        start = 0
+        for snapshot in reversed(self._snapshots):
+            totals = self._read_snapshot(snapshot.path)
+            if totals is not None:
+                self.totals = totals
+                self._next_seq = start = snapshot.seq
+                self._last_timestamp = snapshot.timestamp
+                break
+
+        first = max(0, bisect_right(self._segments, start) - 1)
+        tail = self._segments[first:]
+        for i, base in enumerate(tail):
+            path = self._segment_path(base)
+            with open(path, "rb") as f:
+                buffer = f.read()
+            end = 0
+            for end, event in _decode_all(buffer):
+                if event.seq < start:
+                    continue
+                self.totals[event.user] = self.totals.get(event.user, 0) + event.delta
+                self._next_seq = event.seq + 1
+                self._last_timestamp = event.timestamp
+                self._since_snapshot += 1
+            if end < len(buffer) and i == len(tail) - 1:
+                # Cauda parcial de uma escrita interrompida: descarta
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+            self._segment_size = end
+        if not self._segments:
+            self._segments.append(self._next_seq)
+            open(self._segment_path(self._next_seq), "ab").close()
+
+    @staticmethod
+    def _read_snapshot_header(path: str):
+        try:
+            with open(path, "rb") as f:
+                header = f.read(_SNAPSHOT.size)
+        except OSError:
+            return None
+        if len(header) < _SNAPSHOT.size:
+            return None
+        fields = _SNAPSHOT.unpack(header)
+        return fields if fields[0] == _MAGIC else None
+
+    @staticmethod
+    def _read_snapshot(path: str) -> Optional[Dict[str, int]]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < _SNAPSHOT.size:
+            return None
+        magic, _, _, count, names_len, crc = _SNAPSHOT.unpack_from(data)
+        body = memoryview(data)[_SNAPSHOT.size:]
+        if magic != _MAGIC or len(body) != names_len + 8 * count or zlib.crc32(body) != crc:
+            return None
+        totals = array("q")
+        totals.frombytes(body[names_len:])
+        names = bytes(body[:names_len]).decode("utf-8").split("\0") if count else []
+        return dict(zip(names, totals))
+
+    # ------------------------------------------------------------------ escrita
+
+    def record(self, user: str, delta: int, challenge: str = "", strategy: str = "",
+               timestamp: float = None) -> int:
+        """
+        Acrescenta um evento e retorna seu seq.
+        :param timestamp: Instante do evento (padrão: agora); os timestamps do ledger
+            nunca diminuem, então um valor anterior ao último evento é ajustado para ele
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PointsLedger já foi fechado.")
+            if "\0" in user:
+                raise ValueError("Nome de usuário inválido para o ledger.")
+            seq = self._next_seq
+            timestamp = max(time.time() if timestamp is None else timestamp, self._last_timestamp)
+            data = _encode(seq, timestamp, user, delta, challenge, strategy)
+            self._writer.write(data)
+            self._segment_size += len(data)
+            self._next_seq += 1
+            self._last_timestamp = timestamp
+            self.totals[user] = self.totals.get(user, 0) + delta
+            self._since_snapshot += 1
+            if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+                self.snapshot()
+            elif self._segment_size >= self.segment_bytes:
+                self._rotate()
+            return seq
+
+    def points_changed(self, user, old_points: int, new_points: int):
+        """
+        Observer de pontos (User.subscribe_points): registra o delta com a origem do award_context.
+        Roda depois que os pontos já mudaram, então uma falha de gravação é registrada no log
+        em vez de propagar para User.add_points.
+        """
+        if new_points == old_points:
+            return
+        challenge, strategy = getattr(_context, "source", None) or ("", "")
+        try:
+            self._claim(user)
+            self.record(user.name, new_points - old_points, challenge, strategy)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"[Erro] Ledger não registrou {new_points - old_points:+d} pontos de {user.name}: {e}")
+
+    def _claim(self, user) -> None:
+        """
+        Associa o nome ao usuário; os totais são por nome, então dois usuários distintos
+        com o mesmo nome somariam pontos um do outro.
+        :raises ValueError: O nome já pertence a outro usuário
+        """
+        with self._lock:
+            owner = self._owners.get(user.name)
+            if owner is None:
+                self._owners[user.name] = user
+            elif owner != user:
+                raise ValueError(f"Outro usuário já usa o nome {user.name!r} no ledger.")
+
+    def attach(self) -> None:
+        """
+        Passa a registrar todas as alterações de pontos feitas por User.add_points.
+        O registro mantém o ledger vivo até detach()/close(), mesmo sem outra referência.
+        """
+        User.subscribe_points(self, weak=False)
+
+    def detach(self) -> None:
+        User.unsubscribe_points(self)
+
+    def _rotate(self) -> None:
+        self._writer.close()
+        self._segments.append(self._next_seq)
+        self._writer = open(self._segment_path(self._next_seq), "ab")
+        self._segment_size = 0
+
+    def snapshot(self) -> Optional[int]:
+        """Grava os totais atuais e abre um segmento novo; retorna o seq do snapshot"""
+        with self._lock:
+            if self._snapshots and self._snapshots[-1].seq == self._next_seq:
+                return None
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+            names = list(self.totals)
+            names_blob = "\0".join(names).encode("utf-8")
+            body = names_blob + array("q", self.totals.values()).tobytes()
+            path = self._snapshot_path(self._next_seq)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(_SNAPSHOT.pack(_MAGIC, self._next_seq, self._last_timestamp, len(names),
+                                       len(names_blob), zlib.crc32(body)))
+                f.write(body)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            self._snapshots.append(_Snapshot(self._next_seq, self._last_timestamp, path))
+            self._since_snapshot = 0
+            self._rotate()
+            if self.keep_snapshots is not None:
+                for old in self._snapshots[:-self.keep_snapshots]:
+                    os.remove(old.path)
+                    self._snapshot_cache.pop(old.path, None)
+                self._snapshots = self._snapshots[-self.keep_snapshots:]
+            print(f"[Ledger] Snapshot gravado: {len(names)} usuários até o evento {self._next_seq - 1}")
+            return self._next_seq
+
+    def sync(self) -> None:
+        """Grava em disco os eventos pendentes"""
+        with self._lock:
+            if not self._closed:
+                self._writer.flush()
+                os.fsync(self._writer.fileno())
+
+    def close(self) -> None:
+        User.unsubscribe_points(self)
+        with self._lock:
+            if self._closed:
+                return
+            self.sync()
+            self._closed = True
+            self._writer.close()
+
+    # ------------------------------------------------------------------ leitura
+
+    def points(self, user: str) -> int:
+        return self.totals.get(user, 0)
+
+    def apply(self, users) -> None:
+        """
+        Restaura os pontos dos usuários a partir do ledger. Cada alteração avança a versão
+        do usuário e notifica os demais observers de pontos (o próprio ledger já tem os eventos).
+        :raises ValueError: Dois usuários com o mesmo nome (nada é alterado)
+        """
+        users = list(users)
+        seen = {}
+        for user in users:
+            if seen.setdefault(user.name, user) != user:
+                raise ValueError(f"Usuários distintos com o mesmo nome: {user.name!r}.")
+        with self._lock:
+            for user in users:
+                owner = self._owners.get(user.name)
+                if owner is not None and owner != user:
+                    raise ValueError(f"Outro usuário já usa o nome {user.name!r} no ledger.")
+            for user in users:
+                self._owners[user.name] = user
+        for user in users:
+            with USER_LOCKS.lock_for(user):
+                old_points = user.points
+                new_points = self.totals.get(user.name, 0)
+                if new_points == old_points:
+                    continue
+                user._set_state(new_points, len(user.achievements), user.version + 1)
+                for observer in User._points_observers:
+                    if observer is not self:
+                        observer.points_changed(user, old_points, new_points)
+
+    def events(self, from_seq: int = 0) -> Iterator[PointsEvent]:
+        """Percorre os eventos a partir de um seq (os segmentos anteriores nem são lidos)"""
+        with self._lock:
+            if not self._closed:
+                self._writer.flush()
+            segments = list(self._segments)
+        first = max(0, bisect_right(segments, from_seq) - 1)
+        for base in segments[first:]:
+            with open(self._segment_path(base), "rb") as f:
+                buffer = f.read()
+            for _, event in _decode_all(buffer):
+                if event.seq >= from_seq:
+                    yield event
+
+    def history(self, user: str, since: float = None, until: float = None) -> List[PointsEvent]:
+        """Trilha de auditoria de um usuário (varre os segmentos do intervalo)"""
+        start = 0
+        if since is not None:
+            previous = self._snapshot_before(since)
+            start = previous.seq if previous is not None else 0
+        result = []
+        for event in self.events(start):
+            if until is not None and event.timestamp > until:
+                break
+            if event.user == user and (since is None or event.timestamp >= since):
+                result.append(event)
+        return result
+
+    def _snapshot_before(self, when: float) -> Optional[_Snapshot]:
+        with self._lock:
+            timestamps = [s.timestamp for s in self._snapshots]
+            i = bisect_right(timestamps, when)
+            return self._snapshots[i - 1] if i else None
+
+    def _snapshot_totals(self, snapshot: _Snapshot) -> Dict[str, int]:
+        totals = self._snapshot_cache.get(snapshot.path)
+        if totals is None:
+            totals = self._read_snapshot(snapshot.path) or {}
+            # Mantém só o último snapshot consultado em memória
+            self._snapshot_cache = {snapshot.path: totals}
+        return totals
+
+    def totals_as_of(self, when: float) -> Dict[str, int]:
+        """Totais de todos os usuários no instante informado (timestamp Unix)"""
+        snapshot = self._snapshot_before(when)
+        totals = dict(self._snapshot_totals(snapshot)) if snapshot is not None else {}
+        for event in self.events(snapshot.seq if snapshot is not None else 0):
+            if event.timestamp > when:
+                break
+            totals[event.user] = totals.get(event.user, 0) + event.delta
+        return totals
+
+    def points_as_of(self, user: str, when: float) -> int:
+        """Pontos de um usuário no instante informado (timestamp Unix)"""
+        snapshot = self._snapshot_before(when)
+        points = self._snapshot_totals(snapshot).get(user, 0) if snapshot is not None else 0
+        for event in self.events(snapshot.seq if snapshot is not None else 0):
+            if event.timestamp > when:
+                break
+            if event.user == user:
+                points += event.delta
+        return points
@@ -0,0 +1,216 @@
+"""
+Envio em lote para serviços externos de ranking.
+
+O RankingBatcher acumula atualizações por chave (a última vence), e uma
+thread em segundo plano as envia em lotes quando o lote enche ou quando o
+intervalo máximo expira. Quem submete nunca espera pelo serviço externo:
+com a fila cheia, a atualização é recusada (ou espera no máximo
+`submit_timeout` segundos). Um lote que continua falhando volta ao buffer
+no máximo `max_requeues` vezes; depois disso vai para `dead_letters`.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, List
+
+
+class ClientPool:
+    """
+    Pool de clientes reutilizáveis do serviço externo.
+    Evita criar uma conexão/cliente novo a cada envio.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 2):
+        self._clients: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(size):
+            self._clients.put(factory())
+
+    @contextmanager
+    def client(self):
+        client = self._clients.get()
+        try:
+            yield client
+        finally:
+            self._clients.put(client)
+
+
+class RankingBatcher:
+    """
+    Buffer com coalescência por chave e descarga em segundo plano.
+    :param send_batch: Função que recebe a lista de payloads de um lote
+    :param batch_size: Quantidade de registros que dispara um envio imediato
+    :param flush_interval: Tempo máximo (s) que uma atualização espera no buffer
+    :param max_pending: Limite de chaves distintas no buffer (backpressure)
+    :param max_retries: Tentativas extras por lote antes de devolvê-lo ao buffer
+    :param retry_backoff: Espera inicial (s) entre tentativas, dobrada a cada falha
+    :param submit_timeout: Espera máxima (s) de submit() com o buffer cheio
+    :param max_requeues: Vezes que uma atualização volta ao buffer após um lote falho; depois
+        disso ela vai para dead_letters (e para on_dead_letter, se informado)
+    :param on_dead_letter: Função chamada com a lista de (chave, payload) descartados
+    """
+
+    def __init__(self, send_batch: Callable[[List[Any]], None], batch_size: int = 500,
+                 flush_interval: float = 1.0, max_pending: int = 10_000, max_retries: int = 3,
+                 retry_backoff: float = 0.05, submit_timeout: float = 0.0, max_requeues: int = 3,
+                 on_dead_letter: Callable[[List[Any]], None] = None):
+        self._send_batch = send_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.submit_timeout = submit_timeout
+        self.max_requeues = max_requeues
+        self.on_dead_letter = on_dead_letter
+        # Últimas atualizações abandonadas: (chave, payload)
+        self.dead_letters: deque = deque(maxlen=max_pending)
+        self._requeues: Dict[Hashable, int] = {}
+        self._pending: Dict[Hashable, Any] = {}
+        self._oldest = 0.0
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {"submitted": 0, "coalesced": 0, "sent": 0, "batches": 0,
+                      "retries": 0, "failed_batches": 0, "dropped": 0, "dead_lettered": 0}
+        self._worker = threading.Thread(target=self._run, name="ranking-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, key: Hashable, payload: Any) -> bool:
+        """
+        Enfileira a atualização de uma chave; retorna False se foi descartada por falta de espaço.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("RankingBatcher já foi encerrado.")
+            self.stats["submitted"] += 1
+            # Valor novo da chave: recomeça a contagem de reenvios
+            self._requeues.pop(key, None)
+            if key in self._pending:
+                self._pending[key] = payload
+                self.stats["coalesced"] += 1
+                return True
+            if len(self._pending) >= self.max_pending:
+                self._flush_requested = True
+                self._cond.notify_all()
+                if self.submit_timeout <= 0 or not self._cond.wait_for(
+                        lambda: len(self._pending) < self.max_pending, self.submit_timeout):
+                    self.stats["dropped"] += 1
+                    return False
+            if not self._pending:
+                self._oldest = time.monotonic()
+                # A thread de envio espera sem prazo com o buffer vazio: acorda para contar o intervalo
+                self._cond.notify_all()
+            self._pending[key] = payload
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """Força o envio do que estiver no buffer e espera terminar; retorna False no timeout"""
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def close(self, timeout: float = None) -> None:
+        """Envia o que restar e encerra a thread de envio"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _ready(self) -> bool:
+        if not self._pending:
+            return False
+        return (self._closed or self._flush_requested or len(self._pending) >= self.batch_size
+                or time.monotonic() - self._oldest >= self.flush_interval)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._ready():
+                    if self._closed and not self._pending:
+                        return
+                    if not self._pending:
+                        self._flush_requested = False
+                        self._cond.notify_all()
+                        self._cond.wait()
+                    else:
+                        self._cond.wait(max(0.0, self._oldest + self.flush_interval - time.monotonic()))
+                keys = list(islice(self._pending, self.batch_size))
+                batch = [(k, self._pending.pop(k)) for k in keys]
+                self._in_flight += 1
+            ok = self._deliver([payload for _, payload in batch])
+            dead = []
+            with self._cond:
+                self._in_flight -= 1
+                if ok:
+                    for key, _ in batch:
+                        self._requeues.pop(key, None)
+                else:
+                    dead = self._requeue(batch)
+                self._cond.notify_all()
+            if dead and self.on_dead_letter is not None:
+                try:
+                    self.on_dead_letter(dead)
+                except Exception as e:
+                    print(f"[Batcher] Falha no tratamento de dead letters: {e}")
+
+    def _deliver(self, payloads: List[Any]) -> bool:
+        delay = self.retry_backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._send_batch(payloads)
+                with self._cond:
+                    self.stats["sent"] += len(payloads)
+                    self.stats["batches"] += 1
+                return True
+            except Exception:
+                if attempt == self.max_retries:
+                    break
+                with self._cond:
+                    self.stats["retries"] += 1
+                time.sleep(delay)
+                delay *= 2
+        with self._cond:
+            self.stats["failed_batches"] += 1
+        return False
+
+    def _requeue(self, batch) -> List[Any]:
+        """
+        Devolve um lote que falhou, sem sobrescrever valores mais novos da mesma chave.
+        :return: Atualizações que esgotaram os reenvios (dead letters)
+        """
+        if self._closed:
+            self.stats["dropped"] += len(batch)
+            return []
+        dead = []
+        for key, payload in batch:
+            if key in self._pending:
+                continue
+            attempts = self._requeues.get(key, 0) + 1
+            if attempts > self.max_requeues:
+                self._requeues.pop(key, None)
+                dead.append((key, payload))
+                continue
+            if len(self._pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+                continue
+            self._requeues[key] = attempts
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending[key] = payload
+        if dead:
+            self.dead_letters.extend(dead)
+            self.stats["dead_lettered"] += len(dead)
+        return dead
+
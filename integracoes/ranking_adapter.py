@@ -2,6 +2,14 @@
 Adapter para integração com sistema externo de ranking.
 Permite enviar dados de usuários e pontos sem alterar o core do sistema.
 """
+from integracoes.batching import ClientPool, RankingBatcher
+from utils.metrics import metrics
+
+_SEND = metrics.histogram("ranking_send_seconds", "Duração dos envios ao ranking externo", kind="user")
+_SEND_TOP = metrics.histogram("ranking_send_seconds", "Duração dos envios ao ranking externo", kind="top")
+_SEND_BATCH = metrics.histogram("ranking_send_seconds", "Duração dos envios ao ranking externo", kind="batch")
+_BATCH_ITEMS = metrics.counter("ranking_batch_items_total", "Atualizações enviadas em lote ao ranking externo")
+
 
 class ExternalRankingService:
     """
@@ -12,21 +20,82 @@ class ExternalRankingService:
         # Simula envio para serviço externo
         print(f"[RankingService] Dados enviados: {user_data}")
 
+    def send_batch(self, items: list):
+        # Simula envio em lote (uma única chamada para vários usuários)
+        print(f"[RankingService] Lote enviado: {len(items)} registros")
+
 
 class RankingAdapter:
     """
     Adapter que adapta a interface do sistema para o serviço externo.
+
+    Com batching=True os envios viram atualizações enfileiradas: cada usuário
+    mantém só o último valor e uma thread em segundo plano envia lotes usando
+    clientes de um pool. As opções extras são repassadas ao RankingBatcher.
     """
-    def __init__(self):
-        self.service = ExternalRankingService()
+    def __init__(self, leaderboard=None, batching: bool = False,
+                 service_factory=ExternalRankingService, pool_size: int = 2, **batch_options):
+        if batch_options and not batching:
+            raise TypeError(f"Opções de lote sem batching=True: {', '.join(batch_options)}")
+        # Com batching os envios usam os clientes do pool; um cliente avulso seria pool_size + 1
+        self.service = None if batching else service_factory()
+        self.leaderboard = leaderboard
+        self.batcher = None
+        if batching:
+            self.pool = ClientPool(service_factory, pool_size)
+            self.batcher = RankingBatcher(self._send_batch, **batch_options)
+
+    @_SEND_BATCH.timed
+    def _send_batch(self, items: list):
+        with self.pool.client() as client:
+            client.send_batch(items)
+        _BATCH_ITEMS.inc(len(items))
 
+    @_SEND.timed
     def send_user_ranking(self, user):
         """
         Adapta os dados do usuário para o formato esperado pelo serviço externo.
+        Se houver um Leaderboard associado, inclui a posição do usuário.
         """
         data = {
             "nome": getattr(user, "name", ""),
             "pontos": getattr(user, "points", 0),
             "conquistas": [a.name for a in getattr(user, "achievements", [])]
         }
+        if self.leaderboard is not None and user in self.leaderboard:
+            data["posicao"] = self.leaderboard.rank(user)
+        if self.batcher is not None:
+            return self.batcher.submit(user, data)
         self.service.send_data(data)
+        return True
+
+    @_SEND_TOP.timed
+    def send_top(self, n: int = 10):
+        """
+        Publica os N primeiros do Leaderboard associado em um único envio.
+        Com uma janela de WindowedLeaderboard (ex.: boards.window("week")), o envio leva o nome da janela.
+        """
+        if self.leaderboard is None:
+            raise ValueError("Nenhum leaderboard associado ao RankingAdapter.")
+        ranking = [
+            {"posicao": position, "nome": getattr(user, "name", ""), "pontos": points}
+            for position, (user, points) in enumerate(self.leaderboard.top(n), start=1)
+        ]
+        payload = {"ranking": ranking}
+        window = getattr(self.leaderboard, "name", None)
+        if window is not None:
+            payload["janela"] = window
+        if self.batcher is not None:
+            with self.pool.client() as client:
+                client.send_data(payload)
+            return
+        self.service.send_data(payload)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Envia imediatamente as atualizações pendentes (modo batching)"""
+        return self.batcher.flush(timeout) if self.batcher is not None else True
+
+    def close(self):
+        """Envia o que restar e encerra a thread de envio (modo batching)"""
+        if self.batcher is not None:
+            self.batcher.close()
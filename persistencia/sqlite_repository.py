@@ -0,0 +1,415 @@
+"""
+Persistência em SQLite (modo WAL) para usuários, pontos e conquistas.
+
+As escritas passam por um buffer: pontos são coalescidos por usuário (vale o
+último valor) e desbloqueios são acumulados; o buffer é gravado em uma única
+transação com executemany quando enche, a cada `flush_interval` segundos
+(thread em segundo plano) ou em flush()/close(). As consultas usam índices
+por pontos e por conquista, e os objetos User são criados (hidratados) só
+quando pedidos.
+
+Integração sem alterar as APIs existentes:
+    repo = SQLiteRepository("plataforma.db")
+    factory = UserFactory(repository=repo)   # usuários criados são gravados
+    repo.attach(center)                      # registros, desbloqueios e pontos
+"""
+
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from gamificacao.achievements import Achievement, Medal, MedalCollection
+from usuarios.user import User
+from usuarios.user_factory import UserFactory
+from utils.registry import user_types
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    name   TEXT PRIMARY KEY,
+    role   TEXT NOT NULL,
+    points INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_users_points ON users (points DESC);
+
+CREATE TABLE IF NOT EXISTS achievements (
+    name            TEXT PRIMARY KEY,
+    kind            TEXT NOT NULL,
+    points_required INTEGER NOT NULL DEFAULT 0,
+    description     TEXT NOT NULL DEFAULT '',
+    position        INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS achievement_children (
+    parent   TEXT NOT NULL,
+    child    TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (parent, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS user_achievements (
+    user        TEXT NOT NULL,
+    achievement TEXT NOT NULL,
+    unlocked_at REAL NOT NULL,
+    PRIMARY KEY (user, achievement)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_achievements_achievement ON user_achievements (achievement, user);
+"""
+
+UPSERT_USER = ("INSERT INTO users (name, role, points) VALUES (?, ?, ?) "
+               "ON CONFLICT (name) DO UPDATE SET role = excluded.role, points = excluded.points")
+INSERT_USER = "INSERT OR IGNORE INTO users (name, role, points) VALUES (?, ?, ?)"
+INSERT_NEW_USER = "INSERT INTO users (name, role, points) VALUES (?, ?, ?)"
+INSERT_UNLOCK = "INSERT OR IGNORE INTO user_achievements (user, achievement, unlocked_at) VALUES (?, ?, ?)"
+UPSERT_ACHIEVEMENT = ("INSERT INTO achievements (name, kind, points_required, description, position) "
+                      "VALUES (?, ?, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET kind = excluded.kind, "
+                      "points_required = excluded.points_required, description = excluded.description")
+
+
+def _role_of(user) -> str:
+    return getattr(user, "role", type(user).__name__)
+
+
+class SQLiteRepository:
+    """
+    Repositório de usuários e conquistas sobre SQLite.
+    :param path: Arquivo do banco (":memory:" para testes rápidos)
+    :param batch_size: Escritas pendentes que disparam uma gravação imediata
+    :param flush_interval: Tempo máximo (s) que uma escrita fica no buffer (0 = só em flush())
+
+    attach() registra o repositório como observer de pontos com referência forte, até
+    detach()/close(). Registrado direto com User.subscribe_points(repo), o registro é
+    fraco: quem registra precisa manter o repositório vivo.
+    """
+
+    def __init__(self, path: str = "plataforma.db", batch_size: int = 5_000, flush_interval: float = 0.1):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("PRAGMA temp_store = MEMORY")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        # Buffers de escrita
+        self._new_users: Dict[str, Tuple[str, str, int]] = {}
+        self._points: Dict[str, Tuple[str, str, int]] = {}
+        self._unlocks: List[Tuple[str, str, float]] = []
+        # Identidade: o mesmo nome sempre devolve o mesmo objeto enquanto ele estiver em uso
+        self._identity = weakref.WeakValueDictionary()
+        self._achievements: Dict[str, Achievement] = {}
+        # Conquistas citadas por desbloqueios mas ausentes do registro mesmo após recarregá-lo
+        self._missing: Set[str] = set()
+        self._closed = False
+        self._stop = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="sqlite-flusher", daemon=True)
+            self._flusher.start()
+
+    # ---------- escrita ----------
+
+    def _pending(self) -> int:
+        return len(self._new_users) + len(self._points) + len(self._unlocks)
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError(f"Repositório fechado: {self.path}")
+
+    def _after_write(self):
+        if self._pending() >= self.batch_size:
+            self.flush()
+
+    def _check_name(self, user) -> bool:
+        """
+        O nome identifica o usuário no banco: outro objeto com o mesmo nome é recusado.
+        :return: True se o usuário já está gravado (ou no buffer) como este mesmo objeto
+        :raises ValueError: O nome já pertence a outro usuário
+        """
+        current = self._identity.get(user.name)
+        if current is not None:
+            if current == user:
+                return True
+        elif user.name not in self._new_users and self._conn.execute(
+                "SELECT 1 FROM users WHERE name = ?", (user.name,)).fetchone() is None:
+            return False
+        raise ValueError(f"Já existe um usuário chamado {user.name!r} (use get_user para carregá-lo).")
+
+    def save_user(self, user) -> None:
+        """
+        Grava um usuário novo (gravar de novo o mesmo objeto não muda nada).
+        :raises ValueError: Já existe outro usuário com o mesmo nome
+        """
+        with self._lock:
+            self._check_open()
+            if self._check_name(user):
+                return
+            self._new_users[user.name] = (user.name, _role_of(user), user.points)
+            self._identity[user.name] = user
+            self._after_write()
+
+    def save_users(self, users: Iterable) -> None:
+        """
+        Grava vários usuários novos em uma única transação (tudo ou nada).
+        :raises ValueError: Algum nome repetido no lote ou já usado por outro usuário
+        """
+        with self._lock:
+            self._check_open()
+            rows, created = [], []
+            for user in users:
+                current = self._identity.get(user.name)
+                if current is not None:
+                    if current == user:
+                        continue
+                    raise ValueError(f"Já existe um usuário chamado {user.name!r} (use get_user para carregá-lo).")
+                rows.append((user.name, _role_of(user), user.points))
+                created.append(user)
+            self.flush()
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany(INSERT_NEW_USER, rows)
+            except sqlite3.IntegrityError as e:
+                raise ValueError(f"Nome de usuário repetido ou já gravado: {e}") from None
+            for user in created:
+                self._identity[user.name] = user
+
+    def save_points(self, user) -> None:
+        """
+        Registra o total de pontos atual do usuário (coalescido até a próxima gravação)
+        :raises ValueError: O nome pertence a outro usuário carregado
+        """
+        with self._lock:
+            self._check_open()
+            current = self._identity.get(user.name)
+            if current is not None and current != user:
+                raise ValueError(f"Pontos de outro usuário chamado {user.name!r}.")
+            self._points[user.name] = (user.name, _role_of(user), user.points)
+            self._after_write()
+
+    def save_unlock(self, user, achievement: Achievement) -> None:
+        """Registra o desbloqueio de uma conquista"""
+        with self._lock:
+            self._check_open()
+            self._unlocks.append((user.name, achievement.name, time.time()))
+            self._after_write()
+
+    def flush(self) -> None:
+        """
+        Grava tudo o que estiver no buffer em uma única transação.
+        :raises sqlite3.Error: A transação falhou; o buffer é mantido para a próxima tentativa
+        """
+        with self._lock:
+            if not self._pending() or self._closed:
+                return
+            new_users, points, unlocks = self._new_users, self._points, self._unlocks
+            self._new_users, self._points, self._unlocks = {}, {}, []
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    if new_users:
+                        self._conn.executemany(INSERT_USER, new_users.values())
+                    if points:
+                        self._conn.executemany(UPSERT_USER, points.values())
+                    if unlocks:
+                        self._conn.executemany(INSERT_UNLOCK, unlocks)
+            except BaseException:
+                # Devolve o lote ao buffer; escritas mais novas da mesma chave prevalecem
+                new_users.update(self._new_users)
+                points.update(self._points)
+                self._new_users, self._points = new_users, points
+                self._unlocks = unlocks + self._unlocks
+                raise
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"[Repositório] Falha ao gravar lote (mantido no buffer): {e}")
+
+    def close(self) -> None:
+        """Grava o que estiver pendente e fecha a conexão"""
+        User.unsubscribe_points(self)
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                self.flush()
+            finally:
+                self._closed = True
+                self._conn.close()
+
+    # ---------- integração ----------
+
+    def points_changed(self, user, old_points: int, new_points: int):
+        """
+        Observer de pontos (User.subscribe_points). Roda dentro de User.add_points, com os
+        pontos já alterados: uma falha é registrada no log em vez de interromper a chamada.
+        """
+        if self._closed:
+            print(f"[Repositório] Pontos de {user.name} não gravados: repositório fechado")
+            return
+        try:
+            self.save_points(user)
+        except sqlite3.Error as e:
+            print(f"[Repositório] Falha ao gravar lote (mantido no buffer): {e}")
+        except (RuntimeError, ValueError) as e:
+            print(f"[Repositório] Pontos de {user.name} não gravados: {e}")
+
+    def update(self, user, achievement: Achievement):
+        """Observer do AchievementCenter: cada desbloqueio é persistido"""
+        if self._closed:
+            print(f"[Repositório] Conquista {achievement.name} de {user.name} não gravada: repositório fechado")
+            return
+        try:
+            self.save_unlock(user, achievement)
+        except sqlite3.Error as e:
+            print(f"[Repositório] Falha ao gravar lote (mantido no buffer): {e}")
+        except RuntimeError as e:
+            print(f"[Repositório] Conquista {achievement.name} de {user.name} não gravada: {e}")
+
+    def attach(self, center) -> None:
+        """
+        Liga o repositório a um AchievementCenter: carrega as conquistas gravadas,
+        grava as que só existem em memória e passa a persistir desbloqueios e pontos.
+        """
+        self.load_registry(center)
+        self.save_registry(center)
+        center.subscribe(self)
+        User.subscribe_points(self, weak=False)
+
+    def detach(self, center) -> None:
+        center.unsubscribe(self)
+        User.unsubscribe_points(self)
+        self.flush()
+
+    def save_registry(self, center) -> None:
+        """Grava as medalhas e coleções registradas no centro"""
+        achievements = list(center.registry_medals) + list(center.registry_collections)
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            start = self._conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM achievements").fetchone()[0]
+            known = {row[0] for row in self._conn.execute("SELECT name FROM achievements")}
+            rows, children = [], []
+            for a in achievements:
+                kind = "collection" if isinstance(a, MedalCollection) else "medal"
+                position = start + len(rows) if a.name not in known else 0
+                rows.append((a.name, kind, a.points_required, a.description, position))
+                if kind == "collection":
+                    self._conn.execute("DELETE FROM achievement_children WHERE parent = ?", (a.name,))
+                    children.extend((a.name, c.name, i) for i, c in enumerate(a.children))
+                self._achievements[a.name] = a
+            self._conn.executemany(UPSERT_ACHIEVEMENT, rows)
+            self._conn.executemany("INSERT INTO achievement_children (parent, child, position) VALUES (?, ?, ?)",
+                                   children)
+            self._missing.clear()
+
+    def load_registry(self, center=None) -> Dict[str, Achievement]:
+        """
+        Reconstrói as conquistas gravadas (na ordem original de registro) e,
+        se um centro for informado, registra nele as que ainda não existem.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, kind, points_required, description FROM achievements ORDER BY position").fetchall()
+            links = self._conn.execute(
+                "SELECT parent, child FROM achievement_children ORDER BY parent, position").fetchall()
+        for name, kind, points_required, description in rows:
+            if name not in self._achievements:
+                if kind == "collection":
+                    self._achievements[name] = MedalCollection(name, description)
+                else:
+                    self._achievements[name] = Medal(name, points_required, description)
+        for parent, child in links:
+            collection = self._achievements[parent]
+            if child in self._achievements and all(c.name != child for c in collection.children):
+                collection.add(self._achievements[child])
+        if center is not None:
+            for name, kind, _, _ in rows:
+                if kind == "collection":
+                    center.register_collection(self._achievements[name])
+                else:
+                    center.register_medal(self._achievements[name])
+        return dict(self._achievements)
+
+    # ---------- leitura ----------
+
+    def _hydrate(self, name: str, role: str, points: int):
+        user = self._identity.get(name)
+        if user is not None:
+            return user
+        # Papéis fora do registro de tipos (ex.: "User" de um usuário base) viram User
+        user = UserFactory().create_user(role, name) if role in user_types else User(name)
+        # Atribuição direta: carregar do banco não deve notificar observers de pontos
+        user.points = points
+        names = [row[0] for row in self._conn.execute(
+            "SELECT achievement FROM user_achievements WHERE user = ? ORDER BY unlocked_at", (name,))]
+        unknown = {n for n in names if n not in self._achievements} - self._missing
+        if unknown:
+            # No máximo uma recarga por usuário; o que continuar ausente não provoca novas recargas
+            self.load_registry()
+            self._missing.update(n for n in unknown if n not in self._achievements)
+        for achievement in names:
+            if achievement in self._achievements:
+                user.achievements.append(self._achievements[achievement])
+        self._identity[name] = user
+        return user
+
+    def get_user(self, name: str):
+        """Usuário pelo nome (None se não existir), hidratado sob demanda"""
+        with self._lock:
+            self.flush()
+            row = self._conn.execute("SELECT name, role, points FROM users WHERE name = ?", (name,)).fetchone()
+            return self._hydrate(*row) if row else None
+
+    def iter_users(self, batch_size: int = 1_000) -> Iterator:
+        """Percorre todos os usuários, hidratando um lote de cada vez"""
+        last = ""
+        while True:
+            with self._lock:
+                self.flush()
+                rows = self._conn.execute("SELECT name, role, points FROM users WHERE name > ? ORDER BY name LIMIT ?",
+                                          (last, batch_size)).fetchall()
+                users = [self._hydrate(*row) for row in rows]
+            if not users:
+                return
+            yield from users
+            last = rows[-1][0]
+
+    def top_by_points(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Os N usuários com mais pontos: [(nome, pontos)] (não hidrata objetos)"""
+        with self._lock:
+            self.flush()
+            return self._conn.execute("SELECT name, points FROM users ORDER BY points DESC, name LIMIT ?",
+                                      (n,)).fetchall()
+
+    def users_with_points_between(self, low: int, high: int) -> List[str]:
+        with self._lock:
+            self.flush()
+            return [row[0] for row in self._conn.execute(
+                "SELECT name FROM users WHERE points BETWEEN ? AND ? ORDER BY points DESC", (low, high))]
+
+    def users_with_achievement(self, achievement_name: str) -> List[str]:
+        with self._lock:
+            self.flush()
+            return [row[0] for row in self._conn.execute(
+                "SELECT user FROM user_achievements WHERE achievement = ? ORDER BY user", (achievement_name,))]
+
+    def achievement_counts(self) -> Dict[str, int]:
+        """Quantidade de usuários por conquista"""
+        with self._lock:
+            self.flush()
+            return dict(self._conn.execute(
+                "SELECT achievement, COUNT(*) FROM user_achievements GROUP BY achievement"))
+
+    def count_users(self) -> int:
+        with self._lock:
+            self.flush()
+            return self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
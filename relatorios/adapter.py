@@ -2,6 +2,10 @@
 Adapter para integração com sistema externo de ranking.
 Permite enviar dados do relatório sem alterar a Facade principal.
 """
+import itertools
+
+from integracoes.batching import ClientPool, RankingBatcher
+
 
 class ExternalRankingService:
     """
@@ -12,15 +16,55 @@ class ExternalRankingService:
         # Simula envio para serviço externo
         print(f"[ExternalRankingService] Dados enviados: {data}")
 
+    def send_batch(self, items: list):
+        # Simula envio em lote para serviço externo
+        print(f"[ExternalRankingService] Lote enviado: {len(items)} registros")
+
 
 class ExternalRankingAdapter:
     """
     Adapter que adapta a interface da Facade para o serviço externo.
+
+    Com batching=True cada registro é enfileirado e enviado em lote por uma
+    thread em segundo plano; registros com o mesmo valor em `key_field`
+    são coalescidos (o último vence).
     """
-    def __init__(self):
-        self.service = ExternalRankingService()
+    def __init__(self, batching: bool = False, service_factory=ExternalRankingService,
+                 pool_size: int = 2, key_field: str = "user", **batch_options):
+        if batch_options and not batching:
+            raise TypeError(f"Opções de lote sem batching=True: {', '.join(batch_options)}")
+        # Com batching os envios usam os clientes do pool; um cliente avulso seria pool_size + 1
+        self.service = None if batching else service_factory()
+        self.key_field = key_field
+        self.batcher = None
+        if batching:
+            self._anonymous = itertools.count()
+            self.pool = ClientPool(service_factory, pool_size)
+            self.batcher = RankingBatcher(self._send_batch, **batch_options)
+
+    def _send_batch(self, items: list):
+        with self.pool.client() as client:
+            client.send_batch(items)
 
     def send(self, data: dict):
+        if self.batcher is not None:
+            rows = data if isinstance(data, list) else [data]
+            for row in rows:
+                key = row.get(self.key_field) if isinstance(row, dict) else None
+                if key is None:
+                    key = ("sem-chave", next(self._anonymous))
+                self.batcher.submit(key, row)
+            print("[Relatório] Dados enfileirados para ranking externo via Adapter.")
+            return
         # Aqui podemos adaptar campos ou formatos se necessário
         self.service.send_data(data)
-        print("[Relatório] Dados enviados para ranking externo via Adapter.")   
\ No newline at end of file
+        print("[Relatório] Dados enviados para ranking externo via Adapter.")
+
+    def flush(self, timeout: float = None) -> bool:
+        """Envia imediatamente os registros pendentes (modo batching)"""
+        return self.batcher.flush(timeout) if self.batcher is not None else True
+
+    def close(self):
+        """Envia o que restar e encerra a thread de envio (modo batching)"""
+        if self.batcher is not None:
+            self.batcher.close()
@@ -0,0 +1,312 @@
+"""
+Formato binário colunar para relatórios.
+
+Layout do arquivo:
+    MAGIC
+    grupos de linhas: para cada coluna, um bloco de valores de largura fixa
+        (int64, float64, bool ou, nas colunas de texto, índices uint32 no dicionário)
+        e, se o grupo tiver valores None, uma máscara de nulos (um byte por linha);
+        um grupo só de None não grava bloco de valores
+    dicionários das colunas de texto: offsets uint64 + texto UTF-8 concatenado
+    rodapé JSON: colunas, tipos, grupos e o offset de cada bloco
+    tamanho do rodapé (uint64) + MAGIC
+
+O escritor processa as linhas em grupos (streaming); o leitor mapeia o
+arquivo em memória (mmap) e, a partir do rodapé, lê só os blocos da coluna
+pedida: carregar `points` não decodifica nenhuma outra coluna.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+MAGIC = b"PGCOL\x00\x01\x00"
+_TRAILER = struct.Struct("<Q8s")
+ROW_GROUP_SIZE = 65_536
+
+# tipo -> typecode do array
+TYPECODES = {"int64": "q", "float64": "d", "bool": "b", "string": "I"}
+
+
+def _infer(values: Sequence) -> Optional[str]:
+    """Tipo dos valores, ignorando None (None se não houver nenhum valor)"""
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds:
+        return None
+    if kinds <= {bool}:
+        return "bool"
+    if kinds <= {int}:
+        return "int64"
+    if kinds <= {int, float}:
+        return "float64"
+    return "string"
+
+
+def _compatible(declared: str, found: Optional[str]) -> bool:
+    """Tipo de um grupo posterior cabe na coluna já declarada sem perda?"""
+    return (found is None or found == declared or declared == "string"
+            or (declared == "float64" and found == "int64"))
+
+
+def _pad(f, alignment: int = 8) -> None:
+    f.write(b"\x00" * (-f.tell() % alignment))
+
+
+class ColumnarWriter:
+    """
+    Escreve linhas (dicionários) em grupos; o tipo de cada coluna vem do primeiro grupo em
+    que ela tem valores (None não conta e é gravado como nulo) e um grupo posterior com
+    valores de outro tipo é rejeitado (ValueError), nunca convertido.
+    O arquivo é escrito em um temporário e só aparece com o nome final em close();
+    ao sair de um bloco with por exceção nada é publicado.
+    """
+
+    def __init__(self, filename: str, columns: Sequence[str] = None, row_group_size: int = ROW_GROUP_SIZE):
+        self.filename = filename
+        self.columns: Optional[List[str]] = list(columns) if columns is not None else None
+        self.row_group_size = row_group_size
+        self.types: List[Optional[str]] = []
+        self.rows = 0
+        self._groups: List[dict] = []
+        self._dictionaries: List[Optional[Dict[str, int]]] = []
+        self._temporary = f"{filename}.tmp"
+        self._f = open(self._temporary, "wb")
+        self._f.write(MAGIC)
+
+    def write_rows(self, rows: Iterable[Dict]) -> None:
+        iterator = iter(rows)
+        while True:
+            group = list(islice(iterator, self.row_group_size))
+            if not group:
+                return
+            self._write_group(group)
+
+    def _write_group(self, group: List[Dict]) -> None:
+        if self.columns is None:
+            self.columns = list(group[0].keys())
+        values = [[row.get(c) for row in group] for c in self.columns]
+        if not self.types:
+            self.types = [None] * len(self.columns)
+            self._dictionaries = [None] * len(self.columns)
+        for i, (name, kind, column) in enumerate(zip(self.columns, self.types, values)):
+            found = _infer(column)
+            if kind is None:
+                # Coluna só com None até aqui: o primeiro grupo com valores define o tipo
+                if found is not None:
+                    self.types[i] = found
+                    self._dictionaries[i] = {} if found == "string" else None
+            elif not _compatible(kind, found):
+                raise ValueError(f"Coluna {name}: grupo com valores {found} em uma coluna {kind}")
+        offsets, nulls = [], []
+        for name, kind, column, dictionary in zip(self.columns, self.types, values, self._dictionaries):
+            mask = bytes(v is None for v in column)
+            if kind is None or mask.count(1) == len(column):
+                offsets.append(None)
+                nulls.append(None)
+                continue
+            try:
+                if dictionary is not None:
+                    data = array("I", [0 if v is None else dictionary.setdefault(str(v), len(dictionary))
+                                       for v in column])
+                elif kind == "float64":
+                    data = array("d", [0.0 if v is None else float(v) for v in column])
+                else:
+                    data = array(TYPECODES[kind], [0 if v is None else int(v) for v in column])
+            except (TypeError, ValueError, OverflowError) as e:
+                raise ValueError(f"Coluna {name}: valor incompatível com o tipo {kind} ({e})") from None
+            _pad(self._f)
+            offsets.append(self._f.tell())
+            data.tofile(self._f)
+            if 1 in mask:
+                nulls.append(self._f.tell())
+                self._f.write(mask)
+            else:
+                nulls.append(None)
+        self._groups.append({"rows": len(group), "offsets": offsets, "nulls": nulls})
+        self.rows += len(group)
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        columns = []
+        for name, kind, dictionary in zip(self.columns or [], self.types, self._dictionaries):
+            if kind is None:
+                # Só None em todos os grupos: coluna de texto vazia (todos os valores nulos)
+                kind, dictionary = "string", {}
+            column = {"name": name, "type": kind}
+            if dictionary is not None:
+                blob = "".join(dictionary).encode("utf-8")
+                ends, end = array("Q"), 0
+                for text in dictionary:
+                    end += len(text.encode("utf-8"))
+                    ends.append(end)
+                _pad(self._f)
+                column["dictionary"] = {"offset": self._f.tell(), "count": len(dictionary)}
+                ends.tofile(self._f)
+                column["dictionary"]["blob"] = self._f.tell()
+                self._f.write(blob)
+            columns.append(column)
+        footer = json.dumps({"version": 2, "byteorder": sys.byteorder, "rows": self.rows, "columns": columns,
+                             "groups": self._groups}).encode("utf-8")
+        self._f.write(footer)
+        self._f.write(_TRAILER.pack(len(footer), MAGIC))
+        self._f.close()
+        os.replace(self._temporary, self.filename)
+
+    def abort(self) -> None:
+        """Descarta o que foi escrito (o arquivo final não é criado nem alterado)"""
+        if not self._f.closed:
+            self._f.close()
+            os.remove(self._temporary)
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_columnar(rows: Union[Dict, Iterable[Dict]], filename: str, columns: Sequence[str] = None,
+                   row_group_size: int = ROW_GROUP_SIZE) -> int:
+    """
+    Escreve as linhas no formato colunar.
+    :param columns: Colunas gravadas (padrão: chaves da primeira linha)
+    :return: Quantidade de linhas escritas
+    """
+    with ColumnarWriter(filename, columns, row_group_size) as writer:
+        writer.write_rows([rows] if isinstance(rows, dict) else rows)
+    return writer.rows
+
+
+class ColumnarReader:
+    """Leitor via mmap: só os blocos da coluna pedida são lidos do arquivo."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        footer_size, magic = _TRAILER.unpack_from(self._map, len(self._map) - _TRAILER.size)
+        if magic != MAGIC or self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{filename} não é um arquivo colunar válido.")
+        start = len(self._map) - _TRAILER.size - footer_size
+        meta = json.loads(self._map[start:start + footer_size])
+        self.rows: int = meta["rows"]
+        self._swap = meta["byteorder"] != sys.byteorder
+        self._columns = {c["name"]: (i, c) for i, c in enumerate(meta["columns"])}
+        self._groups = meta["groups"]
+        for group in self._groups:
+            # Arquivos da versão 1 não têm máscaras de nulos
+            group.setdefault("nulls", [None] * len(self._columns))
+        self._dictionaries: Dict[str, List[str]] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def type_of(self, name: str) -> str:
+        return self._spec(name)[1]["type"]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _spec(self, name: str):
+        spec = self._columns.get(name)
+        if spec is None:
+            raise KeyError(f"Coluna inexistente: {name}. Disponíveis: {', '.join(self._columns)}")
+        return spec
+
+    def raw(self, name: str) -> array:
+        """
+        Valores da coluna como array (nas colunas de texto, os índices no dicionário);
+        posições nulas têm 0 (veja nulls())
+        """
+        index, column = self._spec(name)
+        typecode = TYPECODES[column["type"]]
+        values = array(typecode)
+        width = values.itemsize
+        for group in self._groups:
+            offset = group["offsets"][index]
+            if offset is None:
+                values.frombytes(bytes(group["rows"] * width))
+            else:
+                values.frombytes(self._map[offset:offset + group["rows"] * width])
+        if self._swap:
+            values.byteswap()
+        return values
+
+    def nulls(self, name: str) -> Optional[bytes]:
+        """Máscara de nulos da coluna (um byte por linha, 1 = None), ou None se não houver nulos"""
+        index, _ = self._spec(name)
+        if all(g["offsets"][index] is not None and g["nulls"][index] is None for g in self._groups):
+            return None
+        mask = bytearray()
+        for group in self._groups:
+            rows = group["rows"]
+            offset, null_offset = group["offsets"][index], group["nulls"][index]
+            if offset is None:
+                mask += b"\x01" * rows
+            elif null_offset is None:
+                mask += bytes(rows)
+            else:
+                mask += self._map[null_offset:null_offset + rows]
+        return bytes(mask)
+
+    def dictionary(self, name: str) -> List[str]:
+        """Textos distintos de uma coluna de texto, na ordem dos índices"""
+        cached = self._dictionaries.get(name)
+        if cached is None:
+            meta = self._spec(name)[1].get("dictionary")
+            if meta is None:
+                raise ValueError(f"A coluna {name} não é de texto.")
+            ends = array("Q")
+            ends.frombytes(self._map[meta["offset"]:meta["offset"] + 8 * meta["count"]])
+            if self._swap:
+                ends.byteswap()
+            blob = self._map[meta["blob"]:meta["blob"] + (ends[-1] if ends else 0)]
+            cached, start = [], 0
+            for end in ends:
+                cached.append(blob[start:end].decode("utf-8"))
+                start = end
+            self._dictionaries[name] = cached
+        return cached
+
+    def column(self, name: str) -> list:
+        """Valores de uma única coluna, já decodificados (None nas posições nulas)"""
+        kind = self.type_of(name)
+        values = self.raw(name)
+        if kind == "string":
+            dictionary = self.dictionary(name)
+            decoded = [dictionary[code] for code in values] if dictionary else [None] * len(values)
+        elif kind == "bool":
+            decoded = [bool(v) for v in values]
+        else:
+            decoded = values.tolist()
+        mask = self.nulls(name)
+        if mask is not None:
+            decoded = [None if null else value for value, null in zip(decoded, mask)]
+        return decoded
+
+    def iter_rows(self, columns: Sequence[str] = None) -> Iterator[Dict]:
+        """Reconstrói as linhas (só com as colunas pedidas, se informadas)"""
+        names = list(columns) if columns is not None else self.columns
+        data = [self.column(name) for name in names]
+        for values in zip(*data):
+            yield dict(zip(names, values))
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "ColumnarReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
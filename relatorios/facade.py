@@ -1,9 +1,41 @@
 import json
 import csv
 import os
-from typing import Union, List, Dict
-from fpdf import FPDF
+import queue
+from itertools import islice
+from typing import Union, List, Dict, Iterable, Iterator, Sequence
 from relatorios.adapter import ExternalRankingAdapter
+from utils.metrics import metrics
+from utils.registry import exporters
+
+_EXPORT = {
+    fmt: metrics.histogram("report_export_seconds", "Duração das exportações da ReportFacade", format=fmt)
+    for fmt in ("json", "csv", "pdf", "pdf_large", "ndjson", "columnar", "external")
+}
+
+DEFAULT_FORMATS = ("json", "csv", "pdf")
+# Extensão dos arquivos gerados por export_all (padrão: o próprio nome do formato)
+EXTENSIONS = {"ndjson": "ndjson.gz", "columnar": "col"}
+
+# Marca de fim de fluxo entre o leitor da fonte e os exportadores concorrentes
+_END = object()
+
+
+def _chunks(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _drain(channel: queue.Queue) -> Iterator[Dict]:
+    while True:
+        chunk = channel.get()
+        if chunk is _END:
+            return
+        yield from chunk
 
 
 class ReportFacade:
@@ -11,29 +43,144 @@ class ReportFacade:
     Facade para exportar relatórios em diferentes formatos e integrar com sistemas externos.
     """
 
-    def export_all(self, data: Union[Dict, List[Dict]], prefix: str = "report") -> None:
+    def __init__(self, external_adapter: ExternalRankingAdapter = None):
         """
-        Exporta dados em JSON, CSV e PDF, e envia para sistema externo.
-        :param data: Dicionário ou lista de dicionários com dados do relatório
+        :param external_adapter: Adapter reutilizado nos envios externos (ex.: em modo batching);
+            se omitido, um adapter novo é criado a cada envio
+        """
+        self.external_adapter = external_adapter
+
+    def export_all(self, data: Union[Dict, Iterable[Dict]], prefix: str = "report",
+                   parallel: bool = None, chunk_size: int = 500, max_chunks: int = 4,
+                   formats: Iterable[str] = DEFAULT_FORMATS) -> None:
+        """
+        Exporta dados em JSON, CSV e PDF (ou nos formatos pedidos), e envia para sistema externo.
+        :param data: Dicionário, lista ou qualquer iterável/gerador de dicionários
         :param prefix: Prefixo do nome dos arquivos
+        :param formats: Exportadores usados, por nome (ex.: ("json", "ndjson", "columnar"));
+            os arquivos são prefixo.extensão
+        :param parallel: Lê a fonte uma única vez e distribui as linhas para todos os
+            exportadores em paralelo; por padrão é usado quando `data` é um iterador
+            (que não pode ser percorrido três vezes)
+        :param chunk_size: Linhas por bloco repassado aos exportadores (modo paralelo)
+        :param max_chunks: Blocos em espera por exportador; limita a memória das filas (modo
+            paralelo). O PDF ("pdf" e "pdf_large" sem pypdf) ainda monta o documento inteiro
+            em memória antes de gravar; para fontes muito grandes prefira "pdf_large" com
+            max_rows_per_document (via export) ou os formatos em fluxo (json, csv, ndjson, columnar)
         """
         try:
-            self.export_json(data, f"{prefix}.json")
-            self.export_csv(data, f"{prefix}.csv")
-            self.export_pdf(data, f"{prefix}.pdf")
+            if parallel is None:
+                parallel = iter(data) is data
+            formats = tuple(formats)
+            unknown = [fmt for fmt in formats if fmt not in exporters]
+            if unknown:
+                raise ValueError(f"Formatos desconhecidos: {', '.join(unknown)}")
+            if parallel and not isinstance(data, dict):
+                self._export_fanout(data, prefix, chunk_size, max_chunks, formats)
+                return
+            for fmt in formats:
+                self.export(fmt, data, self._filename(prefix, fmt))
             self.send_to_external(data)
         except Exception as e:
             print(f"[Erro] Falha ao exportar relatório: {e}")
 
-    def export_json(self, data: Union[Dict, List[Dict]], filename: str) -> None:
+    def export(self, fmt: str, data: Union[Dict, Iterable[Dict]], filename: str, check: bool = False, **options):
+        """
+        Exporta usando o exportador registrado em utils.registry.exporters
+        (json, csv, pdf, pdf_large ou customizados).
+        :param fmt: Nome do exportador
+        :param check: Levanta RuntimeError se o exportador indicar falha (False, ou lista vazia no pdf_large)
+        :param options: Repassadas ao exportador (ex.: columns no pdf_large)
+        :return: Resultado do exportador (True/False nos formatos da facade; arquivos no pdf_large)
+        """
+        exporter = exporters.get(fmt)
+        name = getattr(exporter, "__name__", None)
+        if name is not None and getattr(ReportFacade, name, None) is exporter:
+            # Método da própria facade: chamado pelo nome para respeitar sobrescritas em subclasses
+            result = getattr(self, name)(data, filename, **options)
+        else:
+            result = exporter(self, data, filename, **options)
+        if check and (result is False or result == []):
+            raise RuntimeError(f"Falha ao exportar {fmt}: {filename}")
+        return result
+
+    @staticmethod
+    def _filename(prefix: str, fmt: str) -> str:
+        return f"{prefix}.{EXTENSIONS.get(fmt.lower(), fmt.lower())}"
+
+    def _export_fanout(self, rows: Iterable[Dict], prefix: str, chunk_size: int, max_chunks: int,
+                       formats: Sequence[str] = DEFAULT_FORMATS) -> None:
+        """
+        Percorre a fonte uma vez e entrega cada bloco de linhas a todos os exportadores,
+        cada um em sua thread, através de filas limitadas. A memória fica limitada às filas,
+        exceto nos exportadores que montam o arquivo inteiro antes de gravar (PDF).
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        sinks = [
+            (lambda it, fmt=fmt: self.export(fmt, it, self._filename(prefix, fmt)))
+            for fmt in formats
+        ]
+        sinks.append(lambda it: self._send_chunks(it, chunk_size))
+        channels = [queue.Queue(maxsize=max_chunks) for _ in sinks]
+
+        def run(sink, channel):
+            rows = _drain(channel)
+            try:
+                sink(rows)
+            finally:
+                # Se o exportador parou antes do fim, continua consumindo para não travar o leitor
+                for _ in rows:
+                    pass
+
+        with ThreadPoolExecutor(max_workers=len(sinks), thread_name_prefix="report-export") as pool:
+            futures = [pool.submit(run, sink, channel) for sink, channel in zip(sinks, channels)]
+            try:
+                for chunk in _chunks(rows, chunk_size):
+                    for channel in channels:
+                        channel.put(chunk)
+            finally:
+                for channel in channels:
+                    channel.put(_END)
+            for future in futures:
+                future.result()
+
+    def _send_chunks(self, rows: Iterable[Dict], chunk_size: int) -> None:
+        # Um único adapter para todos os blocos do fluxo
+        adapter = self.external_adapter or ExternalRankingAdapter()
+        try:
+            for chunk in _chunks(rows, chunk_size):
+                self._send(adapter, chunk)
+        finally:
+            if adapter is not self.external_adapter:
+                adapter.close()
+
+    @_EXPORT["json"].timed
+    def export_json(self, data: Union[Dict, Iterable[Dict]], filename: str) -> bool:
         try:
             with open(filename, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+                if isinstance(data, dict):
+                    json.dump(data, f, indent=4, ensure_ascii=False)
+                else:
+                    self._write_json_rows(data, f)
             print(f"[Relatório] JSON exportado: {os.path.abspath(filename)}")
+            return True
         except Exception as e:
             print(f"[Erro] Falha ao exportar JSON: {e}")
+            return False
+
+    @staticmethod
+    def _write_json_rows(rows: Iterable[Dict], f) -> None:
+        """Escreve uma lista JSON linha a linha, com a mesma formatação de json.dump(indent=4)."""
+        first = True
+        for row in rows:
+            f.write("[\n    " if first else ",\n    ")
+            f.write(json.dumps(row, indent=4, ensure_ascii=False).replace("\n", "\n    "))
+            first = False
+        f.write("[]" if first else "\n]")
 
-    def export_csv(self, data: Union[Dict, List[Dict]], filename: str) -> None:
+    @_EXPORT["csv"].timed
+    def export_csv(self, data: Union[Dict, Iterable[Dict]], filename: str) -> bool:
         try:
             with open(filename, "w", newline="", encoding="utf-8") as f:
                 writer = csv.writer(f)
@@ -41,20 +188,29 @@ class ReportFacade:
                 if isinstance(data, dict):
                     writer.writerow(data.keys())
                     writer.writerow(data.values())
-                elif isinstance(data, list) and all(isinstance(row, dict) for row in data):
-                    headers = data[0].keys()
-                    writer.writerow(headers)
+                else:
+                    headers = None
                     for row in data:
+                        if not isinstance(row, dict):
+                            raise ValueError("Formato de dados inválido para CSV.")
+                        if headers is None:
+                            headers = list(row.keys())
+                            writer.writerow(headers)
                         writer.writerow([row.get(h, "") for h in headers])
-                else:
-                    raise ValueError("Formato de dados inválido para CSV.")
+                    if headers is None:
+                        raise ValueError("Formato de dados inválido para CSV.")
 
             print(f"[Relatório] CSV exportado: {os.path.abspath(filename)}")
+            return True
         except Exception as e:
             print(f"[Erro] Falha ao exportar CSV: {e}")
+            return False
 
-    def export_pdf(self, data: Union[Dict, List[Dict]], filename: str) -> None:
+    @_EXPORT["pdf"].timed
+    def export_pdf(self, data: Union[Dict, Iterable[Dict]], filename: str) -> bool:
         try:
+            from fpdf import FPDF  # importado só quando um PDF é gerado
+
             pdf = FPDF()
             pdf.add_page()
             pdf.set_font("Arial", size=12)
@@ -64,7 +220,7 @@ class ReportFacade:
             if isinstance(data, dict):
                 for key, value in data.items():
                     pdf.cell(200, 10, txt=f"{key}: {value}", ln=True)
-            elif isinstance(data, list):
+            else:
                 for idx, row in enumerate(data, start=1):
                     pdf.cell(200, 10, txt=f"Item {idx}", ln=True)
                     for key, value in row.items():
@@ -73,16 +229,83 @@ class ReportFacade:
 
             pdf.output(filename)
             print(f"[Relatório] PDF exportado: {os.path.abspath(filename)}")
+            return True
         except Exception as e:
             print(f"[Erro] Falha ao exportar PDF: {e}")
+            return False
 
-    def send_to_external(self, data: Union[Dict, List[Dict]]) -> None:
+    @_EXPORT["ndjson"].timed
+    def export_ndjson(self, data: Union[Dict, Iterable[Dict]], filename: str, compression: str = None,
+                      level: int = None) -> bool:
+        """
+        NDJSON comprimido, escrito linha a linha (ver relatorios.ndjson).
+        :param compression: gzip, zstd ou none (padrão: pela extensão, ex.: .gz, .zst)
+        """
+        try:
+            from relatorios.ndjson import write_ndjson
+
+            write_ndjson(data, filename, compression=compression, level=level)
+            print(f"[Relatório] NDJSON exportado: {os.path.abspath(filename)}")
+            return True
+        except Exception as e:
+            print(f"[Erro] Falha ao exportar NDJSON: {e}")
+            return False
+
+    @_EXPORT["columnar"].timed
+    def export_columnar(self, data: Union[Dict, Iterable[Dict]], filename: str, columns: List[str] = None) -> bool:
+        """
+        Formato binário colunar com colunas tipadas, texto em dicionário e rodapé
+        indexado; relido coluna a coluna com relatorios.columnar.ColumnarReader.
+        """
+        try:
+            from relatorios.columnar import write_columnar
+
+            write_columnar(data, filename, columns=columns)
+            print(f"[Relatório] Colunar exportado: {os.path.abspath(filename)}")
+            return True
+        except Exception as e:
+            print(f"[Erro] Falha ao exportar colunar: {e}")
+            return False
+
+    @_EXPORT["pdf_large"].timed
+    def export_pdf_large(self, data: Iterable[Dict], filename: str, columns: List[str] = None,
+                         shard_pages: int = 50, workers: int = None, max_rows_per_document: int = None,
+                         progress=None) -> List[str]:
+        """
+        Modo para grandes volumes: linhas em tabela compacta com larguras medidas uma
+        única vez. Com mais de uma CPU (e pypdf) os shards de páginas são renderizados
+        em um pool de processos e unidos em um único arquivo.
+        :param shard_pages: Páginas por shard
+        :param workers: Processos do pool (1 = sem paralelismo)
+        :param max_rows_per_document: Limite de linhas por arquivo (o excedente vai para arquivo_2.pdf, ...)
+        :param progress: Função chamada com a quantidade de linhas já renderizadas
+        :return: Arquivos gerados
+        """
+        try:
+            from relatorios.pdf_tables import export_table_pdf
+
+            return export_table_pdf(data, filename, columns=columns, shard_pages=shard_pages, workers=workers,
+                                    max_rows_per_document=max_rows_per_document, progress=progress)
+        except Exception as e:
+            print(f"[Erro] Falha ao exportar PDF: {e}")
+            return []
+
+    @_EXPORT["external"].timed
+    def send_to_external(self, data: Union[Dict, Iterable[Dict]]) -> None:
         """
         Envia dados para sistema externo via Adapter.
         """
         try:
-            adapter = ExternalRankingAdapter()
+            adapter = self.external_adapter or ExternalRankingAdapter()
+        except Exception as e:
+            print(f"[Erro] Falha ao enviar dados para sistema externo: {e}")
+            return
+        self._send(adapter, data)
+
+    @staticmethod
+    def _send(adapter: ExternalRankingAdapter, data: Union[Dict, Iterable[Dict]]) -> None:
+        try:
             adapter.send(data)
             print("[Relatório] Dados enviados ao sistema externo com sucesso.")
         except Exception as e:
-            print(f"[Erro] Falha ao enviar dados para sistema externo: {e}")
\ No newline at end of file
+            print(f"[Erro] Falha ao enviar dados para sistema externo: {e}")
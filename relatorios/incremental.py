@@ -0,0 +1,277 @@
+"""
+Exportação incremental de relatórios, particionada e com manifesto.
+
+Um ChangeTracker marca como "sujos" os usuários que ganharam pontos
+(User.add_points) ou conquistas (observer do AchievementCenter). A cada
+export(), só as linhas desses usuários são recalculadas. Cada partição (por
+tipo de usuário ou por faixa de ID) mantém um hash do conteúdo atualizado
+em O(linhas alteradas): a soma, módulo 2^128, dos hashes das linhas. Uma
+partição só é regravada (em todos os formatos, inclusive PDF) quando esse
+hash difere do registrado no manifesto. O manifesto persiste entre
+execuções, então após um reinício as partições que não mudaram também são
+puladas.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+from relatorios.facade import EXTENSIONS, ReportFacade
+from usuarios.user import User
+from utils.registry import exporters
+
+MANIFEST = "manifest.json"
+_MASK = (1 << 128) - 1
+
+
+def default_row(user) -> Dict:
+    return {"user": getattr(user, "name", ""), "role": getattr(user, "role", type(user).__name__),
+            "points": getattr(user, "points", 0), "achievements": len(getattr(user, "achievements", []))}
+
+
+def by_role(user, user_id: int) -> str:
+    """Partição por tipo de usuário (Aluno, Professor, Visitante)"""
+    return str(getattr(user, "role", type(user).__name__)).lower()
+
+
+def by_id_range(size: int) -> Callable[[Any, int], str]:
+    """Partição por faixa de ID (ordem em que o usuário foi rastreado), `size` usuários por partição"""
+    def partition(user, user_id: int) -> str:
+        start = user_id // size * size
+        return f"{start:09d}-{start + size - 1:09d}"
+    return partition
+
+
+def _row_hash(row: Dict) -> int:
+    data = json.dumps(row, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=16).digest(), "big")
+
+
+class ChangeTracker:
+    """Conjunto de usuários alterados desde o último drain(), alimentado por pontos e conquistas."""
+
+    def __init__(self, sync: bool = True):
+        """
+        :param sync: Registra-se como observer de pontos dos usuários (referência fraca:
+            o acompanhamento dura enquanto houver uma referência a este objeto)
+        """
+        self._dirty: Dict[Any, None] = {}
+        self._lock = threading.Lock()
+        self._sync = sync
+        if sync:
+            User.subscribe_points(self)
+
+    def mark(self, user) -> None:
+        with self._lock:
+            self._dirty[user] = None
+
+    def points_changed(self, user, old_points, new_points) -> None:
+        """Observer de User.add_points"""
+        if old_points != new_points:
+            self.mark(user)
+
+    def update(self, user, achievement) -> None:
+        """Observer do AchievementCenter"""
+        self.mark(user)
+
+    def drain(self) -> List:
+        """Retorna (e limpa) os usuários alterados, na ordem da primeira alteração"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        return list(dirty)
+
+    def __len__(self) -> int:
+        return len(self._dirty)
+
+    def close(self) -> None:
+        if self._sync:
+            User.unsubscribe_points(self)
+            self._sync = False
+
+
+class _Partition:
+    __slots__ = ("rows", "hash")
+
+    def __init__(self):
+        self.rows: Dict[Any, tuple] = {}  # usuário -> (hash da linha, linha)
+        self.hash = 0
+
+
+class IncrementalExporter:
+    """
+    Mantém os relatórios de um diretório atualizados regravando só as partições que mudaram.
+
+        exporter = IncrementalExporter("relatorios", formats=("csv", "pdf"))
+        exporter.track(users)
+        center.subscribe(exporter.tracker)
+        ...
+        exporter.export()        # job horário: custo proporcional às alterações
+    """
+
+    def __init__(self, directory: str, formats: Sequence[str] = ("json", "csv", "pdf"),
+                 partition_by: Callable[[Any, int], str] = by_role, row: Callable[[Any], Dict] = default_row,
+                 prefix: str = "report", tracker: ChangeTracker = None, facade: ReportFacade = None):
+        """
+        :param formats: Exportadores (utils.registry.exporters) gerados para cada partição
+        :param partition_by: Função (usuário, id) -> chave da partição (by_role, by_id_range(n), ...)
+        :param row: Função usuário -> linha do relatório
+        :param tracker: ChangeTracker compartilhado (padrão: um novo, ligado aos pontos dos usuários)
+        :param facade: ReportFacade usada para escrever os arquivos
+        """
+        unknown = [fmt for fmt in formats if fmt not in exporters]
+        if unknown:
+            raise ValueError(f"Formatos desconhecidos: {', '.join(unknown)}")
+        self.directory = directory
+        self.formats = tuple(formats)
+        self.partition_by = partition_by
+        self.row = row
+        self.prefix = prefix
+        self.tracker = tracker if tracker is not None else ChangeTracker()
+        self.facade = facade or ReportFacade()
+        self._ids: Dict[Any, int] = {}
+        self._keys: Dict[Any, str] = {}
+        self._partitions: Dict[str, _Partition] = {}
+        self._touched: set = set()
+        self._compared = False
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict:
+        path = os.path.join(self.directory, MANIFEST)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {"version": 1, "partitions": {}}
+        if manifest.get("formats") != list(self.formats) or manifest.get("prefix") != self.prefix:
+            # Outros formatos/prefixo: nenhum arquivo registrado serve
+            return {"version": 1, "partitions": {}}
+        return manifest
+
+    def track(self, users: Iterable) -> None:
+        """Inclui usuários no relatório (na ordem recebida, que define os IDs)"""
+        with self._lock:
+            for user in users:
+                if user not in self._ids:
+                    self._ids[user] = len(self._ids)
+                    self._refresh(user)
+
+    def untrack(self, user) -> None:
+        with self._lock:
+            key = self._keys.pop(user, None)
+            self._ids.pop(user, None)
+            if key is not None:
+                partition = self._partitions[key]
+                row_hash, _ = partition.rows.pop(user)
+                partition.hash = (partition.hash - row_hash) & _MASK
+                self._touched.add(key)
+
+    def _refresh(self, user) -> None:
+        row = self.row(user)
+        row_hash = _row_hash(row)
+        key = str(self.partition_by(user, self._ids[user]))
+        previous = self._keys.get(user)
+        if previous is not None and previous != key:
+            old = self._partitions[previous]
+            old.hash = (old.hash - old.rows.pop(user)[0]) & _MASK
+            self._touched.add(previous)
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = self._partitions[key] = _Partition()
+        entry = partition.rows.get(user)
+        if entry is not None:
+            if entry[0] == row_hash:
+                return
+            partition.hash = (partition.hash - entry[0]) & _MASK
+        partition.rows[user] = (row_hash, row)
+        partition.hash = (partition.hash + row_hash) & _MASK
+        self._keys[user] = key
+        self._touched.add(key)
+
+    def _files(self, key: str) -> List[str]:
+        return [os.path.join(self.directory, f"{self.prefix}_{key}.{EXTENSIONS.get(fmt, fmt)}")
+                for fmt in self.formats]
+
+    def _write(self, key: str, rows: List[Dict]) -> bool:
+        """Grava todos os formatos da partição em arquivos temporários e só então os substitui"""
+        targets = self._files(key)
+        temporaries = [os.path.join(os.path.dirname(t), f".tmp-{os.path.basename(t)}") for t in targets]
+        # Sobras de uma execução interrompida nunca contam como saída nova
+        self._remove(temporaries)
+        try:
+            for fmt, temporary in zip(self.formats, temporaries):
+                self.facade.export(fmt, rows, temporary, check=True)
+                if not os.path.exists(temporary):
+                    raise RuntimeError(f"Falha ao exportar {fmt}: {temporary} não foi criado")
+        except Exception as e:
+            print(f"[Erro] Partição {key} não publicada: {e}")
+            self._remove(temporaries)
+            return False
+        for temporary, target in zip(temporaries, targets):
+            os.replace(temporary, target)
+        return True
+
+    @staticmethod
+    def _remove(paths: List[str]) -> None:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def export(self) -> Dict[str, Any]:
+        """
+        Recalcula as linhas dos usuários alterados e regrava as partições cujo hash mudou.
+        :return: Resumo com changed (linhas recalculadas), written, skipped, removed e failed (partições)
+        """
+        with self._lock:
+            changed = [user for user in self.tracker.drain() if user in self._ids]
+            for user in changed:
+                self._refresh(user)
+            recorded = self.manifest["partitions"]
+            # Na primeira exportação (ou após reinício) todas as partições são comparadas com o manifesto
+            if self._compared:
+                candidates = set(self._touched)
+            else:
+                candidates = set(self._partitions) | set(recorded)
+                self._compared = True
+            self._touched = set()
+            summary = {"changed": len(changed), "written": [], "skipped": 0, "removed": [], "failed": []}
+            for key in sorted(candidates):
+                partition = self._partitions.get(key)
+                if partition is None or not partition.rows:
+                    if recorded.pop(key, None) is not None:
+                        self._remove(self._files(key))
+                        summary["removed"].append(key)
+                    self._partitions.pop(key, None)
+                    continue
+                digest = f"{partition.hash:032x}"
+                entry = recorded.get(key)
+                if (entry is not None and entry["hash"] == digest and entry["rows"] == len(partition.rows)
+                        and all(os.path.exists(path) for path in self._files(key))):
+                    summary["skipped"] += 1
+                    continue
+                if self._write(key, [row for _, row in partition.rows.values()]):
+                    recorded[key] = {"hash": digest, "rows": len(partition.rows),
+                                     "files": [os.path.basename(p) for p in self._files(key)]}
+                    summary["written"].append(key)
+                else:
+                    self._touched.add(key)
+                    summary["failed"].append(key)
+            summary["skipped"] += len(self._partitions) - len(candidates & set(self._partitions))
+            self._save_manifest()
+        print(f"[Relatório] Incremental: {summary['changed']} linhas alteradas, "
+              f"{len(summary['written'])} partições regravadas, {summary['skipped']} inalteradas")
+        return summary
+
+    def _save_manifest(self) -> None:
+        self.manifest.update(version=1, formats=list(self.formats), prefix=self.prefix)
+        path = os.path.join(self.directory, MANIFEST)
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=4, ensure_ascii=False, sort_keys=True)
+        os.replace(temporary, path)
+
+    def close(self) -> None:
+        self.tracker.close()
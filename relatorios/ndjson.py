@@ -0,0 +1,82 @@
+"""
+Exportação em NDJSON comprimido (um objeto JSON por linha).
+
+As linhas são escritas uma a uma direto no compressor, então a memória não
+depende do tamanho do relatório, e a releitura também é em fluxo. A
+compressão é escolhida pela extensão (.gz, .zst) ou explicitamente; zstd usa
+o pacote opcional zstandard.
+"""
+
+import gzip
+import io
+import json
+import os
+from typing import Dict, Iterable, Iterator, Union
+
+from utils.registry import optional_import
+
+COMPRESSIONS = ("gzip", "zstd", "none")
+
+
+def compression_of(filename: str) -> str:
+    if filename.endswith(".gz"):
+        return "gzip"
+    if filename.endswith(".zst"):
+        return "zstd"
+    return "none"
+
+
+def _open(filename: str, mode: str, compression: str, level: int = None):
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compressão inválida: {compression}. Use uma de {COMPRESSIONS}.")
+    if compression == "gzip":
+        return gzip.open(filename, mode + "t", encoding="utf-8", compresslevel=6 if level is None else level)
+    if compression == "zstd":
+        zstd = optional_import("zstandard")
+        if zstd is None:
+            raise ValueError("Compressão zstd requer o pacote zstandard (pip install zstandard).")
+        raw = open(filename, mode + "b")
+        if mode == "w":
+            stream = zstd.ZstdCompressor(level=3 if level is None else level).stream_writer(raw)
+        else:
+            stream = zstd.ZstdDecompressor().stream_reader(raw)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(filename, mode, encoding="utf-8")
+
+
+def write_ndjson(rows: Union[Dict, Iterable[Dict]], filename: str, compression: str = None,
+                 level: int = None) -> int:
+    """
+    Escreve as linhas em NDJSON, em fluxo.
+    :param compression: gzip, zstd ou none (padrão: pela extensão do arquivo)
+    :param level: Nível de compressão (padrão: 6 no gzip, 3 no zstd)
+    :return: Quantidade de linhas escritas
+    O arquivo é escrito em um temporário e só recebe o nome final se todas as linhas
+    forem gravadas: uma falha no meio não deixa um arquivo truncado que parece válido.
+    """
+    if isinstance(rows, dict):
+        rows = [rows]
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    count = 0
+    temporary = f"{filename}.tmp"
+    try:
+        with _open(temporary, "w", compression or compression_of(filename), level) as f:
+            for row in rows:
+                f.write(dumps(row))
+                f.write("\n")
+                count += 1
+        os.replace(temporary, filename)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return count
+
+
+def read_ndjson(filename: str, compression: str = None) -> Iterator[Dict]:
+    """Relê um arquivo NDJSON (comprimido ou não), uma linha por vez"""
+    loads = json.loads
+    with _open(filename, "r", compression or compression_of(filename)) as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
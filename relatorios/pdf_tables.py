@@ -0,0 +1,223 @@
+"""
+Geração de PDFs grandes em formato de tabela.
+
+As linhas viram uma tabela compacta com larguras de coluna medidas uma única
+vez (em uma amostra) antes da renderização. A entrada é dividida em shards
+que ocupam um número inteiro de páginas; cada shard é renderizado em um
+processo separado e as partes são unidas no arquivo final. A união usa o
+pypdf quando ele está instalado; sem ele, os shards são renderizados em
+sequência diretamente no mesmo documento (o resultado é o mesmo, só não
+há paralelismo).
+
+O ganho principal vem do layout (uma linha de tabela por registro, sem
+medir texto a cada célula), não do pool: em uma única CPU, workers=1 é o
+padrão e o pool não é criado.
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from fpdf import FPDF
+
+try:
+    from pypdf import PdfWriter
+except ImportError:
+    PdfWriter = None
+
+PAGE_WIDTH, PAGE_HEIGHT, MARGIN = 210, 297, 10
+TITLE_HEIGHT = 8
+SAMPLE_ROWS = 200
+
+
+def _latin1(value) -> str:
+    # As fontes padrão do FPDF só cobrem latin-1
+    return str(value).encode("latin-1", "replace").decode("latin-1")
+
+
+class TableLayout:
+    """Colunas, larguras e geometria das páginas de uma tabela, medidas uma única vez."""
+
+    def __init__(self, columns: Sequence[str], widths: Sequence[float], title: str = "Relatório",
+                 font_size: int = 8, row_height: float = 5.0):
+        self.columns = list(columns)
+        self.widths = list(widths)
+        self.title = title
+        self.font_size = font_size
+        self.row_height = row_height
+        usable = PAGE_HEIGHT - 2 * MARGIN - TITLE_HEIGHT - row_height
+        self.rows_per_page = max(1, int(usable // row_height))
+
+    @classmethod
+    def measure(cls, columns: Sequence[str], sample: Iterable[Sequence[str]], **options) -> "TableLayout":
+        """Mede o texto do cabeçalho e de uma amostra de linhas e distribui a largura útil da página"""
+        pdf = FPDF()
+        pdf.set_font("Arial", size=options.get("font_size", 8))
+        natural = [pdf.get_string_width(_latin1(c)) + 3 for c in columns]
+        for row in sample:
+            for i, text in enumerate(row):
+                natural[i] = max(natural[i], pdf.get_string_width(text) + 3)
+        scale = (PAGE_WIDTH - 2 * MARGIN) / (sum(natural) or 1)
+        return cls(columns, [w * scale for w in natural], **options)
+
+    def cells(self, row: Dict) -> List[str]:
+        return [_latin1(row.get(c, "")) for c in self.columns]
+
+
+class _TableRenderer:
+    def __init__(self, layout: TableLayout):
+        self.layout = layout
+        self.pdf = FPDF()
+        self.pdf.set_auto_page_break(False)
+        self.pdf.set_margins(MARGIN, MARGIN)
+        self.pdf.set_fill_color(230, 230, 230)
+        self.pdf.set_font("Arial", size=layout.font_size)
+        # Textos até este tamanho cabem na coluna sem precisar medir: largura do caractere
+        # mais largo do latin-1 (em Helvetica, "@" e "%" são mais largos que "W")
+        widest = max(self.pdf.get_string_width(chr(code)) for code in range(32, 256))
+        self._safe_chars = [int((w - 2) // widest) for w in layout.widths]
+
+    def _fit(self, text: str, width: float) -> str:
+        # Corta o texto que não cabe na coluna (as larguras vêm de uma amostra)
+        if self.pdf.get_string_width(text) <= width - 2:
+            return text
+        while text and self.pdf.get_string_width(text + "...") > width - 2:
+            text = text[:-1]
+        return text + "..."
+
+    def _page(self, number: int):
+        layout, pdf = self.layout, self.pdf
+        pdf.add_page()
+        pdf.set_font("Arial", "B", layout.font_size + 2)
+        pdf.cell(0, TITLE_HEIGHT, txt=_latin1(f"{layout.title} - página {number}"), ln=1, align="C")
+        pdf.set_font("Arial", "B", layout.font_size)
+        for column, width in zip(layout.columns, layout.widths):
+            pdf.cell(width, layout.row_height, txt=self._fit(_latin1(column), width), border=1, fill=1)
+        pdf.ln(layout.row_height)
+        pdf.set_font("Arial", size=layout.font_size)
+
+    def render(self, rows: Sequence[Sequence[str]], first_page: int):
+        layout, pdf = self.layout, self.pdf
+        widths, height = layout.widths, layout.row_height
+        per_page = layout.rows_per_page
+        for i, row in enumerate(rows):
+            if i % per_page == 0:
+                self._page(first_page + i // per_page)
+            for text, width, safe in zip(row, widths, self._safe_chars):
+                pdf.cell(width, height, txt=text if len(text) <= safe else self._fit(text, width), border=1)
+            pdf.ln(height)
+
+    def output(self, filename: str):
+        self.pdf.output(filename, "F")
+
+
+def _render_shard(layout: TableLayout, rows: List[List[str]], first_page: int, filename: str) -> str:
+    """Executado nos processos do pool: renderiza um shard em um PDF parcial."""
+    renderer = _TableRenderer(layout)
+    renderer.render(rows, first_page)
+    renderer.output(filename)
+    return filename
+
+
+def _merge(parts: List[str], filename: str):
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(part)
+    with open(filename, "wb") as f:
+        writer.write(f)
+
+
+def _document_name(filename: str, index: int) -> str:
+    if index == 0:
+        return filename
+    base, ext = os.path.splitext(filename)
+    return f"{base}_{index + 1}{ext}"
+
+
+def _batches(iterator: Iterator, size: int) -> Iterator[list]:
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def export_table_pdf(rows: Iterable[Dict], filename: str, columns: Sequence[str] = None,
+                     title: str = "Relatório", shard_pages: int = 50, workers: int = None,
+                     max_rows_per_document: int = None,
+                     progress: Optional[Callable[[int], None]] = None) -> List[str]:
+    """
+    Exporta as linhas como tabela em um ou mais PDFs.
+    :param rows: Lista ou iterável de dicionários (lido uma única vez)
+    :param columns: Colunas da tabela (padrão: chaves da primeira linha)
+    :param shard_pages: Páginas por shard renderizado em paralelo
+    :param workers: Processos do pool (padrão: número de CPUs; 1 = tudo no processo atual)
+    :param max_rows_per_document: Limite de linhas por arquivo; o excedente vai para
+        arquivo_2.pdf, arquivo_3.pdf, ...
+    :param progress: Chamado com o total de linhas já renderizadas
+    :return: Arquivos gerados
+    """
+    iterator = iter(rows)
+    sample = list(islice(iterator, SAMPLE_ROWS))
+    if not sample:
+        raise ValueError("Nenhuma linha para exportar.")
+    if columns is None:
+        columns = list(sample[0].keys())
+    layout = TableLayout.measure(columns, ([_latin1(r.get(c, "")) for c in columns] for r in sample),
+                                 title=title)
+    cells = (layout.cells(row) for it in (sample, iterator) for row in it)
+
+    workers = workers or os.cpu_count() or 1
+    parallel = workers > 1 and PdfWriter is not None
+    shard_rows = layout.rows_per_page * shard_pages
+    documents = _batches(cells, max_rows_per_document) if max_rows_per_document else iter([cells])
+
+    written: List[str] = []
+    done = 0
+    scratch = tempfile.mkdtemp(prefix="report-pdf-") if parallel else None
+    pool = ProcessPoolExecutor(max_workers=workers) if parallel else None
+    try:
+        for index, document in enumerate(documents):
+            target = _document_name(filename, index)
+            if not parallel:
+                renderer = _TableRenderer(layout)
+                for shard_index, shard in enumerate(_batches(iter(document), shard_rows)):
+                    renderer.render(shard, 1 + shard_index * shard_pages)
+                    done += len(shard)
+                    if progress:
+                        progress(done)
+                renderer.output(target)
+            else:
+                pending, parts = [], []
+                for shard_index, shard in enumerate(_batches(iter(document), shard_rows)):
+                    part = os.path.join(scratch, f"{index:04d}_{shard_index:06d}.pdf")
+                    pending.append((pool.submit(_render_shard, layout, shard, 1 + shard_index * shard_pages, part),
+                                    len(shard)))
+                    # Limita os shards em memória aguardando um processo livre
+                    while len(pending) >= 2 * workers:
+                        done = _collect(pending.pop(0), parts, done, progress)
+                while pending:
+                    done = _collect(pending.pop(0), parts, done, progress)
+                _merge(parts, target)
+                for part in parts:
+                    os.remove(part)
+            written.append(target)
+            print(f"[Relatório] PDF exportado: {os.path.abspath(target)}")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return written
+
+
+def _collect(entry, parts: List[str], done: int, progress) -> int:
+    future, count = entry
+    parts.append(future.result())
+    done += count
+    if progress:
+        progress(done)
+    return done
@@ -1,22 +1,43 @@
+import itertools
 from threading import Lock
 from typing import Any
 
+from utils.metrics import metrics
+
+_USERS_WAIT = metrics.histogram("session_lock_wait_seconds", "Espera pelos locks da Session", lock="users")
+_ACTIONS_WAIT = metrics.histogram("session_lock_wait_seconds", "Espera pelos locks da Session", lock="actions")
+
 
 class Session:
     """
     Singleton de sessão que centraliza usuários ativos e logs de ações.
     Thread-safe para garantir consistência em ambientes concorrentes.
+
+    Os usuários ficam em um registro particionado (cada partição com seu lock),
+    e as ações em um buffer circular de capacidade fixa: só as `max_actions`
+    mais recentes são mantidas. Cada ação recebe um cursor sequencial, o que
+    permite leituras incrementais com get_actions_since().
     """
 
     _instance = None
     _lock = Lock()
 
-    def __init__(self):
+    DEFAULT_SHARDS = 16
+    DEFAULT_MAX_ACTIONS = 10_000
+
+    def __init__(self, shards: int = DEFAULT_SHARDS, max_actions: int = DEFAULT_MAX_ACTIONS):
         if Session._instance is not None:
             raise RuntimeError("Use Session.get_instance() para acessar a instância única.")
-        self._users: list[str] = []
-        self._actions: list[Any] = []
-        self._data_lock = Lock()
+        if shards < 1 or max_actions < 1:
+            raise ValueError("shards e max_actions devem ser positivos.")
+        # usuário -> ordem de entrada (preserva a ordem original em get_users)
+        self._user_shards: list[dict[str, int]] = [{} for _ in range(shards)]
+        self._user_locks = [Lock() for _ in range(shards)]
+        self._user_sequence = itertools.count()
+        self._actions: list[Any] = [None] * max_actions
+        self._action_count = 0
+        self._first_cursor = 0
+        self._actions_lock = Lock()
 
     @classmethod
     def get_instance(cls) -> "Session":
@@ -25,32 +46,84 @@ class Session:
                 cls._instance = cls()
             return cls._instance
 
+    def _shard_of(self, user: str) -> int:
+        return hash(user) % len(self._user_shards)
+
     def add_user(self, user: str) -> None:
         """Adiciona um usuário ativo na sessão (thread-safe)."""
-        with self._data_lock:
-            if user not in self._users:
-                self._users.append(user)
+        idx = self._shard_of(user)
+        with _USERS_WAIT.hold(self._user_locks[idx]):
+            shard = self._user_shards[idx]
+            if user not in shard:
+                shard[user] = next(self._user_sequence)
 
     def remove_user(self, user: str) -> None:
         """Remove um usuário da sessão (thread-safe)."""
-        with self._data_lock:
-            if user in self._users:
-                self._users.remove(user)
+        idx = self._shard_of(user)
+        with _USERS_WAIT.hold(self._user_locks[idx]):
+            self._user_shards[idx].pop(user, None)
+
+    def has_user(self, user: str) -> bool:
+        """Verifica se o usuário está ativo na sessão."""
+        idx = self._shard_of(user)
+        with _USERS_WAIT.hold(self._user_locks[idx]):
+            return user in self._user_shards[idx]
 
     def log_action(self, action: Any) -> None:
         """Registra uma ação realizada na sessão (thread-safe)."""
-        with self._data_lock:
-            self._actions.append(action)
+        with _ACTIONS_WAIT.hold(self._actions_lock):
+            self._actions[self._action_count % len(self._actions)] = action
+            self._action_count += 1
 
     def get_users(self) -> tuple[str, ...]:
-        """Retorna os usuários ativos (imutável)."""
-        with self._data_lock:
-            return tuple(self._users)
+        """Retorna os usuários ativos (imutável), na ordem em que entraram."""
+        entries: list[tuple[int, str]] = []
+        for lock, shard in zip(self._user_locks, self._user_shards):
+            with _USERS_WAIT.hold(lock):
+                entries.extend((order, user) for user, order in shard.items())
+        entries.sort()
+        return tuple(user for _, user in entries)
 
     def get_actions(self) -> tuple[Any, ...]:
-        """Retorna o histórico de ações (imutável)."""
-        with self._data_lock:
-            return tuple(self._actions)
+        """Retorna o histórico de ações retido (imutável)."""
+        return self.get_actions_since(0)[0]
+
+    def get_actions_since(self, cursor: int) -> tuple[tuple[Any, ...], int]:
+        """
+        Retorna as ações registradas a partir do cursor e o novo cursor.
+        Ações que já saíram do buffer circular são omitidas.
+        :param cursor: Valor devolvido pela chamada anterior (0 para começar do início)
+        :return: (ações, cursor para a próxima leitura)
+        """
+        with _ACTIONS_WAIT.hold(self._actions_lock):
+            end = self._action_count
+            capacity = len(self._actions)
+            start = max(cursor, end - capacity, self._first_cursor)
+            if start >= end:
+                return (), end
+            first, last = start % capacity, end % capacity
+            if first < last:
+                return tuple(self._actions[first:last]), end
+            return tuple(self._actions[first:]) + tuple(self._actions[:last]), end
+
+    @property
+    def action_cursor(self) -> int:
+        """Total de ações já registradas (cursor atual)."""
+        with _ACTIONS_WAIT.hold(self._actions_lock):
+            return self._action_count
+
+    def set_action_retention(self, max_actions: int) -> None:
+        """Altera a capacidade do buffer de ações, mantendo as mais recentes."""
+        if max_actions < 1:
+            raise ValueError("max_actions deve ser positivo.")
+        with _ACTIONS_WAIT.hold(self._actions_lock):
+            end = self._action_count
+            capacity = len(self._actions)
+            kept = [self._actions[i % capacity] for i in range(max(0, end - min(capacity, max_actions)), end)]
+            self._actions = [None] * max_actions
+            self._first_cursor = end - len(kept)
+            for i, action in zip(range(end - len(kept), end), kept):
+                self._actions[i % max_actions] = action
 
 
 class SessionManager:
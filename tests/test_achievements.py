@@ -0,0 +1,60 @@
+import random
+
+from benchmarks import data
+from gamificacao.achievements import AchievementCenter, Medal
+from usuarios.locks import USER_LOCKS
+from usuarios.user import User
+
+
+def _center(*medals):
+    center = AchievementCenter()
+    for medal in medals:
+        center.register_medal(medal)
+    return center
+
+
+def test_unlock_is_not_missed_after_rollback_and_readd():
+    bronze, manual = Medal("Bronze", 10), Medal("Manual", 10_000)
+    center = _center(bronze)
+    ana = User("ana")
+    ana.add_points(50)
+    assert center.check_achievements(ana) == [bronze]
+
+    # Rollback (como em AwardBatch) e uma conquista nova: a lista volta ao mesmo tamanho
+    with USER_LOCKS.lock_for(ana):
+        ana._set_state(ana.points, 0, ana.version + 1)
+    ana.add_achievement(manual)
+    assert center.check_achievements(ana) == [bronze]
+
+
+def _naive_unlocks(center, user):
+    """Verificação ingênua: percorre todo o catálogo até nada mais desbloquear"""
+    unlocked, changed = [], True
+    while changed:
+        changed = False
+        for achievement in center.registry_medals + center.registry_collections:
+            held = any(a.name == achievement.name for a in user.achievements)
+            if not held and achievement.is_unlocked(user):
+                user.add_achievement(achievement)
+                unlocked.append(achievement.name)
+                changed = True
+    return unlocked
+
+
+def test_incremental_check_matches_naive_check():
+    rng = random.Random(7)
+    center = data.make_center(medals=60, collections=15, max_points=1_000, seed=3)
+    users = [User(f"u{i}") for i in range(20)]
+    shadows = [User(f"u{i}") for i in range(20)]
+    for step in range(600):
+        i = rng.randrange(len(users))
+        points = rng.randint(-20, 80)
+        users[i].add_points(points)
+        shadows[i].add_points(points)
+        if step == 300:
+            # Catálogo alterado no meio: o estado incremental precisa ser refeito
+            center.register_medal(Medal("tardia", 150))
+        expected = _naive_unlocks(center, shadows[i])
+        assert sorted(a.name for a in center.check_achievements(users[i])) == sorted(expected)
+    for user, shadow in zip(users, shadows):
+        assert {a.name for a in user.achievements} == {a.name for a in shadow.achievements}
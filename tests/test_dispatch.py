@@ -0,0 +1,33 @@
+from gamificacao.dispatch import ObserverDispatcher
+from usuarios.user import User
+
+
+class _Recorder:
+    def __init__(self):
+        self.batches = []
+
+    def update_batch(self, user, achievements):
+        self.batches.append((user.name, list(achievements)))
+
+
+def test_unlocks_of_the_same_user_are_coalesced_by_default():
+    dispatcher = ObserverDispatcher()
+    observer = _Recorder()
+    dispatcher.add(observer)
+    ana = User("ana")
+    for i in range(5):
+        dispatcher.dispatch(ana, f"medalha {i}")
+    assert dispatcher.flush(timeout=5)
+    dispatcher.close()
+    assert observer.batches == [("ana", [f"medalha {i}" for i in range(5)])]
+
+
+def test_timeout_none_means_no_limit():
+    dispatcher = ObserverDispatcher(timeout=None)
+    observer = _Recorder()
+    dispatcher.add(observer)
+    dispatcher.dispatch(User("ana"), "medalha")
+    assert dispatcher.flush(timeout=5)
+    stats = next(iter(dispatcher.stats().values()))
+    dispatcher.close()
+    assert stats["delivered"] == 1 and stats["timeouts"] == 0
@@ -0,0 +1,27 @@
+import json
+
+import relatorios.facade as facade_module
+from relatorios.adapter import ExternalRankingAdapter
+from relatorios.facade import ReportFacade
+
+
+class _CountingAdapter(ExternalRankingAdapter):
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        type(self).created += 1
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+
+def test_streamed_export_uses_one_adapter_for_all_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(facade_module, "ExternalRankingAdapter", _CountingAdapter)
+    rows = ({"user": f"u{i}", "points": i} for i in range(1_000))
+    prefix = str(tmp_path / "r")
+    ReportFacade().export_all(rows, prefix, chunk_size=100, formats=("json", "csv"))
+    assert _CountingAdapter.created == 1
+    with open(prefix + ".json", encoding="utf-8") as f:
+        assert len(json.load(f)) == 1_000
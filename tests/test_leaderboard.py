@@ -0,0 +1,55 @@
+import random
+
+from gamificacao.leaderboard import IndexedSkipList, Leaderboard
+from usuarios.user import User
+
+
+def test_skip_list_rank_and_slice_match_a_sorted_list():
+    rng = random.Random(11)
+    index = IndexedSkipList(seed=5)
+    expected = []
+    for step in range(3_000):
+        if expected and rng.random() < 0.35:
+            key = expected.pop(rng.randrange(len(expected)))
+            assert index.remove(key)
+            assert not index.remove(key)
+        else:
+            key = (rng.randint(-500, 500), step)
+            index.insert(key, f"m{step}")
+            expected.append(key)
+        if step % 97 == 0:
+            expected.sort()
+            assert len(index) == len(expected)
+            for position, key in enumerate(expected, start=1):
+                assert index.rank(key) == position
+            assert [k for k, _ in index.slice(1, len(expected) + 5)] == expected
+            start = rng.randint(1, len(expected) + 1)
+            assert [k for k, _ in index.slice(start, 7)] == expected[start - 1:start + 6]
+    assert index.rank((1_000, 0)) is None
+
+
+def test_leaderboard_follows_add_points_and_breaks_ties_by_arrival():
+    users = [User(name) for name in ("ana", "bia", "caio", "davi")]
+    leaderboard = Leaderboard(seed=1)
+    try:
+        for user in users:
+            leaderboard.track(user)
+        ana, bia, caio, davi = users
+        bia.add_points(30)
+        davi.add_points(30)
+        ana.add_points(10)
+        assert leaderboard.top(3) == [(bia, 30), (davi, 30), (ana, 10)]
+        assert [leaderboard.rank(u) for u in users] == [3, 1, 4, 2]
+
+        caio.add_points(50)
+        assert leaderboard.top(1) == [(caio, 50)]
+        assert leaderboard.around(davi, radius=1) == [(2, bia, 30), (3, davi, 30), (4, ana, 10)]
+
+        leaderboard.discard(bia)
+        bia.add_points(100)   # não rastreado: ignorado
+        assert bia not in leaderboard and leaderboard.rank(bia) is None
+        assert [u for u, _ in leaderboard.top(10)] == [caio, davi, ana]
+    finally:
+        leaderboard.close()
+    ana.add_points(500)
+    assert leaderboard.score(ana) == 10
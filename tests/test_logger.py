@@ -0,0 +1,33 @@
+import threading
+
+from utils.logger import Logger
+
+
+def test_records_logged_during_close_are_not_lost():
+    for _ in range(20):
+        log = Logger(async_mode=True, echo=False, capacity=100_000, queue_size=100_000)
+        started = threading.Barrier(5)
+
+        def producer(i):
+            started.wait()
+            for j in range(500):
+                log.info("t%s %s", i, j)
+
+        threads = [threading.Thread(target=producer, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        started.wait()
+        log.close()
+        for thread in threads:
+            thread.join()
+
+        assert log.dropped == 0
+        assert len(log.get_logs()) == 4 * 500
+
+
+def test_log_after_close_is_synchronous():
+    log = Logger(async_mode=True, echo=False)
+    log.info("antes")
+    log.close()
+    log.info("depois")
+    assert [entry.split("] ")[-1] for entry in log.logs] == ["antes", "depois"]
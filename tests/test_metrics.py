@@ -0,0 +1,38 @@
+import threading
+import time
+
+from utils.metrics import MetricsRegistry
+
+
+class _Yielding(float):
+    """Valor que cede a vez a outras threads no meio de um observe() (ao ser somado)"""
+
+    def __radd__(self, other):
+        time.sleep(0)
+        return other + float(self)
+
+
+def test_histogram_snapshot_is_consistent_while_observing():
+    registry = MetricsRegistry(enabled=True)
+    histogram = registry.histogram("latency", buckets=(0.5, 2.0))
+    stop = threading.Event()
+
+    def observe():
+        while not stop.is_set():
+            histogram.observe(_Yielding(1.0))
+            time.sleep(0)
+
+    thread = threading.Thread(target=observe)
+    thread.start()
+    try:
+        for _ in range(500):
+            data = registry.snapshot()["histograms"].get("latency")
+            if data is None:
+                continue
+            assert data["sum"] == data["count"] == data["buckets"][2.0] == data["buckets"][float("inf")]
+    finally:
+        stop.set()
+        thread.join()
+
+    data = registry.snapshot()["histograms"]["latency"]
+    assert data["sum"] == data["count"] > 0
@@ -0,0 +1,32 @@
+import pytest
+
+from relatorios.pdf_tables import TableLayout, _TableRenderer, export_table_pdf
+
+
+def _rows(count):
+    return [{"user": f"aluno{i}", "points": i * 7, "email": f"aluno{i}@escola.br"} for i in range(count)]
+
+
+def test_text_within_the_safe_length_fits_its_column():
+    layout = TableLayout(["a", "b"], [20.0, 40.0])
+    renderer = _TableRenderer(layout)
+    for width, safe in zip(layout.widths, renderer._safe_chars):
+        for char in "W@%M":
+            assert renderer.pdf.get_string_width(char * safe) <= width - 2
+
+
+def test_sequential_export_writes_every_document(tmp_path):
+    target = str(tmp_path / "r.pdf")
+    written = export_table_pdf(_rows(500), target, workers=1, max_rows_per_document=300)
+    assert written == [target, str(tmp_path / "r_2.pdf")]
+    for path in written:
+        with open(path, "rb") as f:
+            assert f.read(4) == b"%PDF"
+
+
+def test_parallel_export_matches_sequential_page_count(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+    rows = _rows(2_000)
+    sequential = export_table_pdf(rows, str(tmp_path / "seq.pdf"), workers=1, shard_pages=2)[0]
+    parallel = export_table_pdf(rows, str(tmp_path / "par.pdf"), workers=2, shard_pages=2)[0]
+    assert len(pypdf.PdfReader(parallel).pages) == len(pypdf.PdfReader(sequential).pages)
@@ -0,0 +1,73 @@
+import glob
+import os
+import random
+
+import pytest
+
+from historico.points_ledger import PointsLedger
+from usuarios.user import User
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = PointsLedger(str(tmp_path / "ledger"))
+    ledger.attach()
+    yield ledger
+    ledger.detach()
+    ledger.close()
+
+
+def test_users_with_the_same_name_do_not_share_a_total(ledger):
+    first, second = User("ana"), User("ana")
+    first.add_points(10)
+    second.add_points(5)   # recusado pelo ledger, mas add_points não falha
+    assert second.points == 5
+    assert ledger.points("ana") == 10
+
+    with pytest.raises(ValueError):
+        ledger.apply([first, second])
+    assert (first.points, second.points) == (10, 5)
+
+
+def test_reopen_and_point_in_time_queries_match_the_event_stream(tmp_path):
+    directory = str(tmp_path / "replay")
+    rng = random.Random(3)
+    events = []
+    ledger = PointsLedger(directory, snapshot_every=7, segment_bytes=256)
+    for i in range(60):
+        user, delta = f"u{rng.randrange(5)}", rng.randint(-10, 30)
+        ledger.record(user, delta, "Quiz", "TimeBasedScoring", timestamp=1_000.0 + i)
+        events.append((1_000.0 + i, user, delta))
+    ledger.close()
+
+    def totals_at(when):
+        totals = {}
+        for timestamp, user, delta in events:
+            if timestamp <= when:
+                totals[user] = totals.get(user, 0) + delta
+        return totals
+
+    ledger = PointsLedger(directory, snapshot_every=7, segment_bytes=256)
+    try:
+        assert ledger.totals == totals_at(float("inf"))
+        for when in (999.0, 1_000.0, 1_013.5, 1_041.0, 2_000.0):
+            assert ledger.totals_as_of(when) == totals_at(when)
+            assert ledger.points_as_of("u2", when) == totals_at(when).get("u2", 0)
+        assert [e.delta for e in ledger.history("u1")] == [d for _, u, d in events if u == "u1"]
+
+        users = [User(f"u{i}") for i in range(5)]
+        ledger.apply(users)
+        assert {u.name: u.points for u in users if u.points} == {k: v for k, v in ledger.totals.items() if v}
+    finally:
+        ledger.close()
+
+    # Snapshot mais recente corrompido: a abertura volta ao anterior e reproduz o resto
+    latest = max(glob.glob(os.path.join(directory, "*.snap")))
+    with open(latest, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\xff")
+    ledger = PointsLedger(directory, snapshot_every=0)
+    try:
+        assert ledger.totals == totals_at(float("inf"))
+    finally:
+        ledger.close()
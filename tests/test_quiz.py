@@ -0,0 +1,30 @@
+from decimal import Decimal
+
+from desafios.challenge import QuizChallenge
+from desafios.question_bank import normalize_answer
+
+
+def test_numeric_answers_match_across_types():
+    assert normalize_answer(1) == normalize_answer(1.0) == normalize_answer(Decimal("1.00")) == "1"
+    assert normalize_answer(0.5) == "0.5"
+    assert normalize_answer(True) != normalize_answer(1)
+
+
+def test_assigning_questions_replaces_them_without_orphans():
+    quiz = QuizChallenge("Quiz", "", "time")
+    quiz.questions = [{"question": "2 + 2?", "answer": 4}, {"question": "Capital?", "answer": "Brasília"}]
+    assert len(quiz.bank) == 2
+    assert quiz.bank.check(quiz.question_ids[0], 4.0)
+
+    quiz.questions = [{"question": "3 + 3?", "answer": 6}]
+    assert quiz.questions == [{"question": "3 + 3?", "answer": 6}]
+    assert len(quiz.bank) == 1
+
+    quiz.questions.append({"question": "1 + 1?", "answer": 2})
+    del quiz.questions[0]
+    assert [q.text for q in quiz.bank] == ["1 + 1?"]
+
+    # Questões incluídas por add_question continuam no banco ao sair da lista
+    kept = quiz.add_question("5 + 5?", 10)
+    quiz.questions.pop()
+    assert kept in quiz.bank
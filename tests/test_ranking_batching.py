@@ -0,0 +1,95 @@
+import threading
+import time
+
+from integracoes.batching import RankingBatcher
+from integracoes.ranking_adapter import RankingAdapter
+from usuarios.user import User
+
+
+class _StandInService:
+    """Serviço de ranking em processo: registra as chamadas e injeta latência/falhas"""
+
+    def __init__(self, latency: float = 0.0, failures: int = 0):
+        self.latency = latency
+        self.failures = failures
+        self.batches = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        # Usado como service_factory: todos os clientes do pool registram aqui
+        return self
+
+    def send_batch(self, items: list):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("serviço indisponível")
+            self.batches.append(list(items))
+
+    def send_data(self, data: dict):
+        self.send_batch([data])
+
+    @property
+    def sent(self) -> list:
+        return [item for batch in self.batches for item in batch]
+
+
+def test_updates_are_coalesced_and_submit_does_not_wait_for_the_service():
+    service = _StandInService(latency=0.05)
+    adapter = RankingAdapter(batching=True, service_factory=service, flush_interval=10.0)
+    users = [User(f"u{i}") for i in range(3)]
+    try:
+        started = time.perf_counter()
+        for points in range(1, 21):
+            for user in users:
+                user.points = points
+                assert adapter.send_user_ranking(user)
+        assert time.perf_counter() - started < service.latency
+        assert adapter.flush(timeout=5)
+    finally:
+        adapter.close()
+    assert service.calls == 1
+    assert sorted((d["nome"], d["pontos"]) for d in service.sent) == [("u0", 20), ("u1", 20), ("u2", 20)]
+    assert adapter.batcher.stats["coalesced"] == 57
+
+
+def test_failed_batches_are_retried_then_dead_lettered():
+    service = _StandInService(failures=2)
+    batcher = RankingBatcher(service.send_batch, flush_interval=10.0, max_retries=2, retry_backoff=0.001)
+    batcher.submit("ana", {"nome": "ana"})
+    assert batcher.flush(timeout=5)
+    assert service.sent == [{"nome": "ana"}] and batcher.stats["retries"] == 2
+    batcher.close()
+
+    service = _StandInService(failures=100)
+    dead = []
+    batcher = RankingBatcher(service.send_batch, flush_interval=0.001, max_retries=0, max_requeues=1,
+                             on_dead_letter=dead.extend)
+    batcher.submit("bia", {"nome": "bia"})
+    deadline = time.monotonic() + 5
+    while not dead and time.monotonic() < deadline:
+        time.sleep(0.001)
+    batcher.close()
+    assert dead == [("bia", {"nome": "bia"})] and list(batcher.dead_letters) == dead
+    assert service.calls == 2 and service.sent == []
+
+
+def test_full_buffer_rejects_instead_of_blocking():
+    service = _StandInService(latency=0.2)
+    batcher = RankingBatcher(service.send_batch, batch_size=1, max_pending=1, flush_interval=10.0)
+    try:
+        batcher.submit("a", 1)        # vai para o envio (lento)
+        while batcher.pending():
+            time.sleep(0.001)
+        assert batcher.submit("b", 2)
+        started = time.perf_counter()
+        assert not batcher.submit("c", 3)
+        assert time.perf_counter() - started < service.latency
+        assert batcher.stats["dropped"] == 1
+        assert batcher.flush(timeout=5)
+    finally:
+        batcher.close()
+    assert service.sent == [1, 2]
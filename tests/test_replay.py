@@ -0,0 +1,30 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from benchmarks import replay
+
+
+def test_top_breaks_ties_by_name_for_any_worker_count(tmp_path):
+    filename = tmp_path / "stream.jsonl"
+    names = [f"usuario{i}" for i in range(40)]
+    with open(filename, "w", encoding="utf-8") as f:
+        for name in reversed(names):
+            f.write(json.dumps({"type": "create_user", "user": name, "role": "Aluno"}) + "\n")
+
+    expected = [(name, 0) for name in sorted(names)[:5]]
+    for workers in (1, 2, 3):
+        assert replay.replay(str(filename), workers=workers, top=5)["top"] == expected
+
+
+def test_collect_fails_when_a_shard_dies_without_reporting():
+    context = multiprocessing.get_context()
+    outbox = context.Queue()
+    process = context.Process(target=os._exit, args=(9,), name="replay-shard-0")
+    process.start()
+    process.join()
+
+    with pytest.raises(RuntimeError, match="exitcode 9"):
+        replay._collect(outbox, [process])
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from benchmarks import data
+from relatorios.columnar import ColumnarReader, write_columnar
+from relatorios.ndjson import read_ndjson, write_ndjson
+
+
+def test_columnar_keeps_nulls_and_infers_type_after_an_all_none_group(tmp_path):
+    path = str(tmp_path / "r.col")
+    rows = [{"user": f"u{i}", "points": None if i < 3 else i, "ratio": 0.5 if i % 2 else None,
+             "note": None} for i in range(8)]
+    assert write_columnar(rows, path, row_group_size=3) == 8
+    with ColumnarReader(path) as reader:
+        assert reader.type_of("points") == "int64"
+        assert list(reader.iter_rows()) == rows
+
+
+def test_columnar_type_drift_is_rejected(tmp_path):
+    path = str(tmp_path / "r.col")
+    with pytest.raises(ValueError):
+        write_columnar([{"a": 1}, {"a": "x"}], path, row_group_size=1)
+    assert not os.listdir(tmp_path)
+
+
+def test_ndjson_failure_leaves_no_file(tmp_path):
+    path = str(tmp_path / "r.ndjson.gz")
+
+    def rows():
+        yield {"user": "ana"}
+        raise RuntimeError("fonte caiu")
+
+    with pytest.raises(RuntimeError):
+        write_ndjson(rows(), path)
+    assert not os.listdir(tmp_path)
+
+    data = [{"user": "ana", "points": 3}, {"user": "bia", "points": None}]
+    assert write_ndjson(data, path) == 2
+    assert list(read_ndjson(path)) == data
+
+
+def _rows():
+    rows = data.make_report_rows(300, seed=4)
+    for i, row in enumerate(rows):
+        row["ratio"] = row["points"] / 7 if i % 5 else row["points"]   # int e float na mesma coluna
+        row["active"] = i % 3 == 0
+        row["nome"] = f"usuário {i % 11} ✓"
+    return rows
+
+
+def test_columnar_round_trip_across_row_groups(tmp_path):
+    path = str(tmp_path / "r.col")
+    rows = _rows()
+    assert write_columnar(iter(rows), path, row_group_size=64) == len(rows)
+    with ColumnarReader(path) as reader:
+        assert len(reader) == len(rows)
+        assert reader.columns == list(rows[0])
+        assert [reader.type_of(c) for c in ("user", "points", "ratio", "active")] == \
+            ["string", "int64", "float64", "bool"]
+        assert list(reader.iter_rows()) == rows
+        assert reader.column("nome") == [row["nome"] for row in rows]
+        assert list(reader.iter_rows(["points", "user"])) == [
+            {"points": row["points"], "user": row["user"]} for row in rows]
+        assert reader.nulls("points") is None
+
+
+@pytest.mark.parametrize("suffix", [".ndjson", ".ndjson.gz", ".ndjson.zst"])
+def test_ndjson_round_trip(tmp_path, suffix):
+    if suffix.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    path = str(tmp_path / f"r{suffix}")
+    rows = _rows()
+    assert write_ndjson(iter(rows), path) == len(rows)
+    assert list(read_ndjson(path)) == rows
+    assert write_ndjson(rows[0], path) == 1
+    assert list(read_ndjson(path)) == rows[:1]
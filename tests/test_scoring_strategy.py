@@ -0,0 +1,39 @@
+import math
+
+import pytest
+
+from desafios.scoring_strategy import (AccuracyBasedScoring, DifficultyBasedScoring, ScoringStrategy,
+                                       TimeBasedScoring)
+
+
+def _scalar(strategy, columns):
+    return ScoringStrategy.calculate_scores(strategy, None, columns)
+
+
+def _same(batch, scalar):
+    assert len(batch) == len(scalar)
+    for got, expected in zip(batch, scalar):
+        assert type(got) is type(expected)
+        assert got == expected or (math.isnan(got) and math.isnan(expected))
+
+
+@pytest.mark.parametrize("strategy, columns", [
+    (TimeBasedScoring(), {"time": [10, 12.5, 150, 99.5, 100], "correct": [True, True, True, True, False]}),
+    (TimeBasedScoring(), {"time": [10, float("nan"), float("inf"), -float("inf")], "correct": [1, 1, 1, 1]}),
+    (DifficultyBasedScoring(), {"difficulty": [1, 2.5, 3, 0.5], "correct": [True, True, False, True]}),
+    (DifficultyBasedScoring(), {"difficulty": [1, float("nan"), 3], "correct": [True, True, True]}),
+    (AccuracyBasedScoring(), {"accuracy": [0, 0.5, 1, 0.999]}),
+])
+def test_batch_matches_scalar_path(strategy, columns):
+    _same(strategy.calculate_scores(None, columns), _scalar(strategy, columns))
+
+
+@pytest.mark.parametrize("value, error", [(float("nan"), ValueError), (float("inf"), OverflowError)])
+def test_accuracy_batch_rejects_non_finite_like_scalar(value, error):
+    with pytest.raises(error):
+        AccuracyBasedScoring().calculate_scores(None, {"accuracy": [0.5, value]})
+
+
+def test_accuracy_batch_keeps_exact_int_outside_int64():
+    columns = {"accuracy": [0.5, 1e30]}
+    assert AccuracyBasedScoring().calculate_scores(None, columns) == [50, int(1e30 * 100)]
@@ -0,0 +1,73 @@
+import pytest
+
+from gamificacao.achievements import AchievementCenter, Medal, MedalCollection
+from persistencia.sqlite_repository import SQLiteRepository
+from usuarios.user import User
+from usuarios.user_factory import UserFactory
+
+
+@pytest.fixture
+def repo():
+    repository = SQLiteRepository(":memory:", flush_interval=0)
+    yield repository
+    repository.close()
+
+
+def test_duplicate_names_are_rejected(repo):
+    factory = UserFactory(repository=repo)
+    ana = factory.create_user("aluno", "ana")
+    repo.save_user(ana)   # o mesmo objeto pode ser gravado de novo
+    with pytest.raises(ValueError):
+        factory.create_user("aluno", "ana")
+    with pytest.raises(ValueError):
+        repo.save_points(User("ana"))
+    with pytest.raises(ValueError):
+        repo.save_users([User("c"), User("c")])
+    assert repo.count_users() == 1
+
+
+def test_round_trip_through_a_file(tmp_path):
+    path = str(tmp_path / "plataforma.db")
+    bronze, prata, ouro = Medal("Bronze", 10), Medal("Prata", 50), Medal("Ouro", 500)
+    podio = MedalCollection("Pódio")
+    podio.add(bronze)
+    podio.add(prata)
+    center = AchievementCenter()
+    for medal in (bronze, prata, ouro):
+        center.register_medal(medal)
+    center.register_collection(podio)
+
+    repo = SQLiteRepository(path, flush_interval=0)
+    repo.attach(center)
+    factory = UserFactory(repository=repo)
+    ana, bia = factory.create_user("aluno", "ana"), factory.create_user("professor", "bia")
+    factory.create_user("visitante", "caio")
+    ana.add_points(60)
+    bia.add_points(20)
+    bia.add_points(5)
+    for user in (ana, bia):
+        center.check_achievements(user)
+    repo.detach(center)
+    repo.close()
+
+    repo = SQLiteRepository(path, flush_interval=0)
+    try:
+        fresh = AchievementCenter()
+        registry = repo.load_registry(fresh)
+        assert [a.name for a in fresh.registry_medals] == ["Bronze", "Prata", "Ouro"]
+        assert [c.name for c in registry["Pódio"].children] == ["Bronze", "Prata"]
+
+        loaded = repo.get_user("ana")
+        assert type(loaded) is type(ana) and loaded.points == 60
+        assert [a.name for a in loaded.achievements] == [a.name for a in ana.achievements]
+        assert repo.get_user("bia").points == 25
+        assert repo.get_user("ninguem") is None
+
+        assert repo.count_users() == 3
+        assert repo.top_by_points(2) == [("ana", 60), ("bia", 25)]
+        assert repo.users_with_points_between(20, 100) == ["ana", "bia"]
+        assert repo.users_with_achievement("Bronze") == ["ana", "bia"]
+        assert repo.achievement_counts() == {"Bronze": 2, "Prata": 1, "Pódio": 1}
+        assert [u.name for u in repo.iter_users(batch_size=2)] == ["ana", "bia", "caio"]
+    finally:
+        repo.close()
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from gamificacao.achievements import AchievementCenter, Medal
+from gamificacao.leaderboard import Leaderboard
+from usuarios.transactions import AwardBatch, ConflictError
+from usuarios.user import User
+
+
+class _ChainCheck:
+    """Observer que cede a vez a outras threads (como um observer com E/S) e confere a ordem"""
+
+    def __init__(self):
+        self.last = {}
+        self.out_of_order = 0
+
+    def points_changed(self, user, old_points, new_points):
+        time.sleep(0)
+        if self.last.get(user, 0) != old_points:
+            self.out_of_order += 1
+        self.last[user] = new_points
+
+
+def test_leaderboard_follows_batches_and_add_points_concurrently():
+    users = [User(f"u{i}") for i in range(4)]
+    slow = _ChainCheck()
+    User.subscribe_points(slow)   # notificado antes do ranking
+    leaderboard = Leaderboard()
+    for user in users:
+        leaderboard.track(user)
+    start = threading.Barrier(8)
+
+    def direct(offset):
+        start.wait()
+        for i in range(2_000):
+            users[(i + offset) % len(users)].add_points(1)
+
+    def batched(offset):
+        start.wait()
+        for i in range(1_000):
+            giver = users[(i + offset) % len(users)]
+            receiver = users[(i + offset + 1) % len(users)]
+            AwardBatch().add(giver, -1).add(receiver, 3).commit()
+
+    threads = [threading.Thread(target=direct, args=(n,)) for n in range(4)]
+    threads += [threading.Thread(target=batched, args=(n,)) for n in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        leaderboard.close()
+        User.unsubscribe_points(slow)
+
+    assert slow.out_of_order == 0
+    assert sum(user.points for user in users) == 4 * 2_000 + 4 * 1_000 * 2
+    for user in users:
+        assert leaderboard.score(user) == user.points
+
+
+class _Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def points_changed(self, user, old_points, new_points):
+        self.calls.append((user.name, old_points, new_points))
+
+    def update(self, user, achievement):
+        self.calls.append((user.name, achievement.name))
+
+
+class _FailingCenter(AchievementCenter):
+    """Centro que falha ao verificar um usuário específico (no meio da transação)"""
+
+    def __init__(self, victim):
+        super().__init__()
+        self.victim = victim
+
+    def check_achievements(self, user):
+        if user is self.victim:
+            raise RuntimeError("falha na verificação")
+        return super().check_achievements(user)
+
+
+def test_failed_batch_is_rolled_back_for_every_user():
+    ana, bia = User("ana"), User("bia")
+    ana.add_points(5)
+    center = _FailingCenter(victim=bia)
+    center.register_medal(Medal("Bronze", 10))
+    before = {user: (user.points, list(user.achievements), user.version) for user in (ana, bia)}
+    recorder = _Recorder()
+    center.subscribe(recorder)
+    User.subscribe_points(recorder)
+    try:
+        with pytest.raises(RuntimeError):
+            AwardBatch(center).add(ana, 20, Medal("Manual")).add(bia, 30).commit()
+    finally:
+        User.unsubscribe_points(recorder)
+
+    for user, (points, achievements, version) in before.items():
+        assert user.points == points
+        assert user.achievements == achievements
+        assert user.version > version
+    assert recorder.calls == []
+
+
+def test_conflict_and_negative_points_apply_nothing():
+    ana, bia = User("ana"), User("bia")
+    ana.add_points(5)
+    version = ana.version
+    ana.add_points(1)
+    with pytest.raises(ConflictError):
+        AwardBatch().add(bia, 10).expect(ana, version).commit()
+    with pytest.raises(ValueError):
+        AwardBatch(allow_negative=False).add(bia, 10).add(ana, -7).commit()
+    assert (ana.points, bia.points) == (6, 0)
+
+    unlocked = AwardBatch().add(bia, 10, Medal("Mentor")).expect(ana, ana.version).commit()
+    assert [a.name for a in unlocked[bia]] == ["Mentor"] and unlocked[ana] == []
+    assert bia.points == 10
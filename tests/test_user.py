@@ -0,0 +1,52 @@
+import gc
+import threading
+
+from gamificacao.leaderboard import Leaderboard
+from historico.points_ledger import PointsLedger
+from usuarios.user import User
+
+
+class _Observer:
+    def points_changed(self, user, old_points, new_points):
+        pass
+
+
+def test_dropped_leaderboards_do_not_stay_registered():
+    before = len(User._points_observers.refs)
+    ana = User("ana")
+    for _ in range(50):
+        Leaderboard().track(ana)
+    gc.collect()
+    assert len(User._points_observers.refs) == before
+
+
+def test_concurrent_subscribes_are_not_lost():
+    observers = [_Observer() for _ in range(200)]
+    start = threading.Barrier(8)
+
+    def subscribe(chunk):
+        start.wait()
+        for observer in chunk:
+            User.subscribe_points(observer)
+
+    threads = [threading.Thread(target=subscribe, args=(observers[i::8],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert all(observer in User._points_observers for observer in observers)
+    finally:
+        for observer in observers:
+            User.unsubscribe_points(observer)
+
+
+def test_attached_ledger_is_kept_until_closed(tmp_path):
+    PointsLedger(str(tmp_path)).attach()   # sem referência guardada
+    gc.collect()
+    ana = User("ana")
+    ana.add_points(7)
+    ledgers = [o for o in User._points_observers if isinstance(o, PointsLedger)]
+    assert [ledger.points("ana") for ledger in ledgers] == [7]
+    ledgers[0].close()
+    assert not any(isinstance(o, PointsLedger) for o in User._points_observers)
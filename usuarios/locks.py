@@ -0,0 +1,53 @@
+"""
+Locks particionados (striped) por usuário.
+
+Em vez de um lock global, cada usuário é mapeado para uma de N faixas
+(stripes) pelo seu hash; operações sobre usuários diferentes quase sempre
+caem em faixas diferentes e não disputam o mesmo lock. Quem precisa de
+vários usuários ao mesmo tempo adquire as faixas em ordem crescente de
+índice, o que evita deadlock entre lotes concorrentes.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List
+
+
+class StripedLocks:
+    """N locks reentrantes; cada membro é protegido pelo lock da sua faixa."""
+
+    def __init__(self, stripes: int = 256):
+        if stripes < 1:
+            raise ValueError("stripes deve ser positivo.")
+        self._locks = [threading.RLock() for _ in range(stripes)]
+        self._stripes = stripes
+
+    def __len__(self) -> int:
+        return self._stripes
+
+    def stripe_of(self, member) -> int:
+        return hash(member) % self._stripes
+
+    def lock_for(self, member) -> threading.RLock:
+        return self._locks[hash(member) % self._stripes]
+
+    def stripes_for(self, members: Iterable) -> List[int]:
+        """Faixas distintas dos membros, na ordem determinística de aquisição"""
+        return sorted({hash(m) % self._stripes for m in members})
+
+    @contextmanager
+    def acquire(self, members: Iterable):
+        """Adquire as faixas de todos os membros (em ordem crescente) e as libera na saída"""
+        acquired = []
+        try:
+            for stripe in self.stripes_for(members):
+                self._locks[stripe].acquire()
+                acquired.append(self._locks[stripe])
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+
+# Locks usados por User/UserView e pelas transações de pontos
+USER_LOCKS = StripedLocks()
@@ -0,0 +1,161 @@
+"""
+Transações atômicas de pontos e conquistas.
+
+Um AwardBatch reúne operações (usuário, pontos, conquista) e as aplica de
+uma vez: os locks particionados (usuarios.locks) de todos os usuários
+envolvidos são adquiridos em ordem crescente de faixa, o que evita deadlock
+entre lotes concorrentes sem recorrer a um lock global. Ou o lote inteiro é
+aplicado, ou nada é: qualquer exceção durante a aplicação (inclusive do
+AchievementCenter) desfaz pontos e conquistas de todos os usuários; as
+versões só avançam.
+Os observers só são notificados depois que o lote foi confirmado. Os de
+pontos, como em User.add_points, ainda sob os locks: assim cada observer
+recebe as alterações de um usuário na mesma ordem em que elas aconteceram,
+mesmo com lotes e add_points concorrentes. As notificações do
+AchievementCenter são entregues já com os locks liberados.
+
+Com expect(user, version) o lote só é aplicado se o usuário ainda estiver
+na versão lida (controle otimista); caso contrário levanta ConflictError.
+
+    with AwardBatch(center) as batch:
+        batch.add(aluno, 50)
+        batch.add(professor, 10, Medal("Mentor"))
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from usuarios.locks import USER_LOCKS, StripedLocks
+from usuarios.user import User
+from utils.metrics import metrics
+
+_COMMIT = metrics.histogram("transactions_commit_seconds", "Duração de AwardBatch.commit")
+_CONFLICTS = metrics.counter("transactions_conflicts_total", "Lotes rejeitados por versão desatualizada")
+_ROLLBACKS = metrics.counter("transactions_rollbacks_total", "Lotes desfeitos após erro na aplicação")
+
+
+class ConflictError(RuntimeError):
+    """A versão de um usuário mudou desde a leitura (controle otimista)."""
+
+
+class Award(NamedTuple):
+    user: object
+    points: int = 0
+    achievement: object = None
+
+
+class AwardBatch:
+    """Lote de pontos e conquistas aplicado de forma atômica sob os locks dos usuários."""
+
+    def __init__(self, center=None, locks: StripedLocks = USER_LOCKS, allow_negative: bool = True):
+        """
+        :param center: AchievementCenter verificado para cada usuário dentro da transação
+            (as notificações só são entregues após a confirmação)
+        :param locks: Locks particionados; devem ser os mesmos usados por User.add_points
+        :param allow_negative: Se False, o lote falha quando algum usuário ficaria com pontos negativos
+        """
+        self.center = center
+        self.locks = locks
+        self.allow_negative = allow_negative
+        self.awards: List[Award] = []
+        self._expected: Dict = {}
+
+    def add(self, user, points: int = 0, achievement=None) -> "AwardBatch":
+        self.awards.append(Award(user, points, achievement))
+        return self
+
+    def expect(self, user, version: int) -> "AwardBatch":
+        """Exige que o usuário esteja na versão informada no momento do commit"""
+        self._expected[user] = version
+        return self
+
+    def __len__(self) -> int:
+        return len(self.awards)
+
+    @_COMMIT.timed
+    def commit(self) -> Dict[object, List]:
+        """
+        Aplica o lote inteiro ou nada.
+        :return: Conquistas novas de cada usuário (explícitas e desbloqueadas pelo centro)
+        :raises ConflictError: Versão esperada diferente da atual
+        :raises ValueError: Pontos negativos com allow_negative=False
+        """
+        deltas: Dict = {}
+        explicit: Dict = {}
+        for award in self.awards:
+            deltas[award.user] = deltas.get(award.user, 0) + award.points
+            if award.achievement is not None:
+                explicit.setdefault(award.user, []).append(award.achievement)
+        for user in self._expected:
+            deltas.setdefault(user, 0)
+        unlocked: Dict = {user: [] for user in deltas}
+        pending: List[tuple] = []
+
+        with self.locks.acquire(deltas):
+            for user, version in self._expected.items():
+                if user.version != version:
+                    _CONFLICTS.inc()
+                    raise ConflictError(f"{user.name}: versão {user.version}, esperada {version}.")
+            snapshot = {user: (user.points, len(user.achievements), user.version) for user in deltas}
+            if not self.allow_negative:
+                for user, delta in deltas.items():
+                    if snapshot[user][0] + delta < 0:
+                        raise ValueError(f"{user.name} ficaria com pontos negativos.")
+            try:
+                for user, delta in deltas.items():
+                    points, count, version = snapshot[user]
+                    user._set_state(points + delta, count, version)
+                    for achievement in explicit.get(user, ()):
+                        if not any(a.name == achievement.name for a in user.achievements):
+                            user.add_achievement(achievement)
+                            unlocked[user].append(achievement)
+                            pending.append((user, achievement))
+                if self.center is not None:
+                    with self.center.deferred_notifications() as deferred:
+                        for user in deltas:
+                            unlocked[user].extend(self.center.check_achievements(user))
+                    pending.extend(deferred)
+                # Versões sempre avançam (também no rollback): uma versão nunca volta a
+                # identificar outro conteúdo, então pode ser usada como chave de cache
+                for user in deltas:
+                    user._set_state(user.points, len(user.achievements), user.version + 1)
+            except BaseException:
+                _ROLLBACKS.inc()
+                for user, (points, count, _) in snapshot.items():
+                    user._set_state(points, count, user.version + 1)
+                raise
+            # Confirmado. Observers de pontos ainda sob os locks, a mesma política de
+            # User.add_points: fora deles, um lote e um add_points concorrentes no mesmo
+            # usuário poderiam chegar fora de ordem (ex.: Leaderboard com pontos antigos).
+            observers = User._points_observers
+            for user in deltas:
+                old, new = snapshot[user][0], user.points
+                if old != new:
+                    for observer in observers:
+                        observer.points_changed(user, old, new)
+
+        if self.center is not None:
+            for user, achievement in pending:
+                self.center.notify(user, achievement)
+        self.awards = []
+        self._expected = {}
+        return unlocked
+
+    def __enter__(self) -> "AwardBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+
+
+def award(awards: Iterable, center=None, expected: Optional[Dict] = None) -> Dict[object, List]:
+    """
+    Atalho para um lote: award([(aluno, 10), (professor, 5, medalha)], center)
+    :param expected: Versões esperadas por usuário (controle otimista)
+    """
+    batch = AwardBatch(center)
+    for entry in awards:
+        batch.add(*entry)
+    for user, version in (expected or {}).items():
+        batch.expect(user, version)
+    return batch.commit()
@@ -2,39 +2,131 @@
 Módulo de definição dos usuários do sistema.
 Inclui classes base e especializações (Aluno, Professor, Visitante).
 """
+import threading
+import weakref
+
+from usuarios.locks import USER_LOCKS
+
+
+class _Observers:
+    """
+    Observers de pontos guardados por referência fraca. Imutável: o registro é
+    substituído a cada alteração, então a iteração dispensa lock.
+    """
+    __slots__ = ("refs",)
+
+    def __init__(self, refs=()):
+        self.refs = tuple(refs)
+
+    def __iter__(self):
+        for ref in self.refs:
+            observer = ref()
+            if observer is not None:
+                yield observer
+
+    def __contains__(self, observer) -> bool:
+        return any(ref() is observer for ref in self.refs)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
 
 
 class User:
+    # Sem __dict__ por instância: com milhões de usuários isso domina o heap.
+    # __weakref__ permite que índices (ex.: AchievementCenter) usem WeakKeyDictionary.
+    # version: incrementada a cada alteração (controle otimista das transações de pontos)
+    __slots__ = ("name", "points", "achievements", "version", "__weakref__")
+
+    # Observers notificados a cada alteração de pontos (ex.: Leaderboard).
+    # Referências fracas: um observer descartado sem unsubscribe_points não vaza.
+    _points_observers: _Observers = _Observers()
+    # Serializa quem substitui o registro; reentrante porque o callback de um weakref
+    # pode rodar (coleta de lixo) no meio de um subscribe da mesma thread
+    _observers_lock = threading.RLock()
+    # Quantas vezes _set_state removeu conquistas (rollback) de algum usuário: quem
+    # acompanha a lista incrementalmente (AchievementCenter) sabe quando reler tudo
+    _truncations = 0
+
     def __init__(self, name: str):
         self.name = name
         self.points = 0
         self.achievements = []
+        self.version = 0
+
+    @classmethod
+    def subscribe_points(cls, observer, weak: bool = True):
+        """
+        Registra um observer com o método points_changed(user, old_points, new_points).
+        :param weak: Guarda só uma referência fraca (padrão): um observer criado sem que
+            ninguém o guarde (ex.: User.subscribe_points(Leaderboard())) some em silêncio.
+            Observers que gravam dados (ledger, repositório) usam weak=False e saem do
+            registro em unsubscribe_points (detach/close).
+        """
+        with User._observers_lock:
+            if observer in User._points_observers:
+                return
+            ref = None
+            if weak:
+                try:
+                    ref = weakref.ref(observer, User._discard_observer)
+                except TypeError:
+                    pass  # sem suporte a weakref (__slots__ sem __weakref__): referência forte
+            if ref is None:
+                ref = lambda observer=observer: observer
+            User._points_observers = _Observers(
+                [r for r in User._points_observers.refs if r() is not None] + [ref])
+
+    @classmethod
+    def unsubscribe_points(cls, observer):
+        """Remove um observer de pontos"""
+        with User._observers_lock:
+            if observer in User._points_observers:
+                User._points_observers = _Observers(
+                    ref for ref in User._points_observers.refs if ref() is not None and ref() is not observer)
+
+    @staticmethod
+    def _discard_observer(ref):
+        """Callback do weakref: retira do registro um observer coletado"""
+        with User._observers_lock:
+            User._points_observers = _Observers(r for r in User._points_observers.refs if r is not ref)
 
     def add_points(self, points: int):
-        """Adiciona pontos ao usuário"""
-        self.points += points
+        """Adiciona pontos ao usuário (thread-safe; observers notificados sob o lock, em ordem)"""
+        with USER_LOCKS.lock_for(self):
+            old_points = self.points
+            self.points = old_points + points
+            self.version += 1
+            for observer in User._points_observers:
+                observer.points_changed(self, old_points, self.points)
 
     def add_achievement(self, achievement):
         """Adiciona uma conquista ao usuário"""
-        self.achievements.append(achievement)
+        with USER_LOCKS.lock_for(self):
+            self.achievements.append(achievement)
+            self.version += 1
+
+    def _set_state(self, points: int, achievement_count: int, version: int):
+        """Escrita bruta usada pelas transações (aplicação e rollback), sem observers; exige o lock do usuário"""
+        self.points = points
+        if len(self.achievements) > achievement_count:
+            del self.achievements[achievement_count:]
+            User._truncations += 1
+        self.version = version
 
     def __str__(self):
         return f"{self.__class__.__name__}(nome={self.name}, pontos={self.points})"
 
 
 class Aluno(User):
-    def __init__(self, name: str):
-        super().__init__(name)
-        self.role = "Aluno"
+    __slots__ = ()
+    role = "Aluno"
 
 
 class Professor(User):
-    def __init__(self, name: str):
-        super().__init__(name)
-        self.role = "Professor"
+    __slots__ = ()
+    role = "Professor"
 
 
 class Visitante(User):
-    def __init__(self, name: str):
-        super().__init__(name)
-        self.role = "Visitante"
+    __slots__ = ()
+    role = "Visitante"
@@ -1,10 +1,25 @@
 """
 Factory Method para criação de diferentes tipos de usuários.
 """
-from usuarios.user import Aluno, Professor, Visitante
+from array import array
+
+from usuarios.user_store import UserStore
+from utils.registry import user_types
 
 
 class UserFactory:
+    # Tipos disponíveis: utils.registry.user_types (tipos novos são registrados lá)
+    def __init__(self, repository=None):
+        """
+        :param repository: Repositório opcional (ex.: SQLiteRepository) onde os usuários criados são gravados
+        """
+        self.repository = repository
+
+    def _resolve(self, user_type: str):
+        if user_type not in user_types:
+            raise ValueError(f"Tipo de usuário inválido: {user_type.lower()}")
+        return user_types.get(user_type)
+
     def create_user(self, user_type: str, name: str):
         """
         Cria usuários de acordo com o tipo informado.
@@ -12,13 +27,42 @@ class UserFactory:
         :param name: Nome do usuário
         :return: Instância de User
         """
-        user_type = user_type.lower()
-
-        if user_type == "aluno":
-            return Aluno(name)
-        elif user_type == "professor":
-            return Professor(name)
-        elif user_type == "visitante":
-            return Visitante(name)
-        else:
-            raise ValueError(f"Tipo de usuário inválido: {user_type}")
+        user = self._resolve(user_type)(name)
+        if self.repository is not None:
+            self.repository.save_user(user)
+        return user
+
+    def create_many(self, entries, store: UserStore = None):
+        """
+        Cria usuários em lote (ex.: importação de uma base inteira).
+        :param entries: Iterável de pares (tipo, nome)
+        :param store: UserStore opcional; se informado, os usuários viram linhas do store
+        :return: Lista de User, ou o intervalo de linhas criadas no store
+        """
+        resolved = {}  # cache por grafia do tipo: evita lower() e lookup a cada linha
+
+        def resolve(user_type):
+            user_class = resolved.get(user_type)
+            if user_class is None:
+                user_class = resolved[user_type] = self._resolve(user_type)
+            return user_class
+
+        if store is None:
+            users = [resolve(user_type)(name) for user_type, name in entries]
+            if self.repository is not None:
+                self.repository.save_users(users)
+            return users
+
+        codes = {}
+        names = []
+        role_codes = array("B")
+        for user_type, name in entries:
+            code = codes.get(user_type)
+            if code is None:
+                code = codes[user_type] = store.role_code(resolve(user_type).role)
+            names.append(name)
+            role_codes.append(code)
+        rows = store.extend(names, role_codes)
+        if self.repository is not None:
+            self.repository.save_users(store.view(row) for row in rows)
+        return rows
@@ -0,0 +1,208 @@
+"""
+Armazenamento colunar de usuários para grandes populações.
+
+Em vez de um objeto completo por usuário, cada atributo vive em uma coluna:
+pontos em um array de inteiros, papel (role) como código de 1 byte e as
+conquistas como arrays compactos de IDs. UserView é uma visão leve sobre
+uma linha e expõe a mesma interface de User (name, points, achievements,
+add_points, add_achievement), podendo ser usada no AchievementCenter,
+no Leaderboard e nos adapters.
+"""
+
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+from usuarios.locks import USER_LOCKS
+from usuarios.user import User
+
+
+class UserStore:
+    """Colunas de usuários; cada usuário é identificado pelo número da linha."""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.points = array("q")
+        self.role_codes = array("B")
+        self._achievements: List[Optional[array]] = []
+        self._roles: List[str] = []
+        self._role_index: Dict[str, int] = {}
+        self._achievement_objects: list = []
+        self._achievement_index: Dict[str, int] = {}
+        # Versão por linha, só das linhas já alteradas (esparso: a maioria fica em 0)
+        self._versions: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator["UserView"]:
+        return (UserView(self, row) for row in range(len(self.names)))
+
+    def role_code(self, role: str) -> int:
+        """Código interno (interned) de um papel"""
+        code = self._role_index.get(role)
+        if code is None:
+            code = self._role_index[role] = len(self._roles)
+            self._roles.append(role)
+        return code
+
+    def role_of(self, row: int) -> str:
+        return self._roles[self.role_codes[row]]
+
+    @property
+    def roles(self) -> List[str]:
+        """Papéis conhecidos, indexados pelo código usado em role_codes"""
+        return list(self._roles)
+
+    def achievement_id(self, achievement) -> int:
+        """ID compacto de uma conquista (a mesma conquista, pelo nome, recebe sempre o mesmo ID)"""
+        achievement_id = self._achievement_index.get(achievement.name)
+        if achievement_id is None:
+            achievement_id = self._achievement_index[achievement.name] = len(self._achievement_objects)
+            self._achievement_objects.append(achievement)
+        return achievement_id
+
+    def append(self, name: str, role: str, points: int = 0) -> int:
+        """Adiciona um usuário e retorna o número da sua linha"""
+        self.names.append(name)
+        self.points.append(points)
+        self.role_codes.append(self.role_code(role))
+        self._achievements.append(None)
+        return len(self.names) - 1
+
+    def extend(self, names: List[str], role_codes: array) -> range:
+        """Adiciona vários usuários de uma vez (códigos de papel já resolvidos)"""
+        start = len(self.names)
+        self.names.extend(names)
+        self.role_codes.extend(role_codes)
+        self.points.frombytes(bytes(self.points.itemsize * len(names)))
+        self._achievements.extend([None] * len(names))
+        return range(start, len(self.names))
+
+    def view(self, row: int) -> "UserView":
+        if not 0 <= row < len(self.names):
+            raise IndexError(row)
+        return UserView(self, row)
+
+    def add_points(self, row: int, points: int) -> None:
+        self.points[row] += points
+
+    def add_achievement(self, row: int, achievement) -> None:
+        ids = self._achievements[row]
+        if ids is None:
+            ids = self._achievements[row] = array("I")
+        ids.append(self.achievement_id(achievement))
+
+    def achievement_ids(self, row: int) -> array:
+        ids = self._achievements[row]
+        return ids if ids is not None else array("I")
+
+    def achievement(self, achievement_id: int):
+        return self._achievement_objects[achievement_id]
+
+    def achievement_counts(self) -> array:
+        """Quantidade de conquistas de cada linha, em ordem"""
+        return array("q", (0 if ids is None else len(ids) for ids in self._achievements))
+
+
+class _AchievementList:
+    """Sequência somente leitura das conquistas de uma linha, materializadas sob demanda."""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: UserStore, row: int):
+        self._store = store
+        self._row = row
+
+    def _ids(self):
+        ids = self._store._achievements[self._row]
+        return ids if ids is not None else ()
+
+    def __len__(self) -> int:
+        return len(self._ids())
+
+    def __getitem__(self, index):
+        ids = self._ids()
+        if isinstance(index, slice):
+            return [self._store.achievement(i) for i in ids[index]]
+        return self._store.achievement(ids[index])
+
+    def __iter__(self):
+        return (self._store.achievement(i) for i in self._ids())
+
+    def __contains__(self, achievement) -> bool:
+        achievement_id = self._store._achievement_index.get(getattr(achievement, "name", None))
+        return achievement_id is not None and achievement_id in self._ids()
+
+
+class UserView:
+    """Visão leve de uma linha do UserStore com a interface de User."""
+
+    __slots__ = ("_store", "_row", "__weakref__")
+
+    def __init__(self, store: UserStore, row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def store(self) -> UserStore:
+        return self._store
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    @property
+    def name(self) -> str:
+        return self._store.names[self._row]
+
+    @property
+    def points(self) -> int:
+        return self._store.points[self._row]
+
+    @property
+    def role(self) -> str:
+        return self._store.role_of(self._row)
+
+    @property
+    def version(self) -> int:
+        return self._store._versions.get(self._row, 0)
+
+    @property
+    def achievements(self) -> _AchievementList:
+        return _AchievementList(self._store, self._row)
+
+    def add_points(self, points: int):
+        """Adiciona pontos ao usuário"""
+        store, row = self._store, self._row
+        with USER_LOCKS.lock_for(self):
+            old_points = store.points[row]
+            store.add_points(row, points)
+            store._versions[row] = store._versions.get(row, 0) + 1
+            for observer in User._points_observers:
+                observer.points_changed(self, old_points, store.points[row])
+
+    def add_achievement(self, achievement):
+        """Adiciona uma conquista ao usuário"""
+        store, row = self._store, self._row
+        with USER_LOCKS.lock_for(self):
+            store.add_achievement(row, achievement)
+            store._versions[row] = store._versions.get(row, 0) + 1
+
+    def _set_state(self, points: int, achievement_count: int, version: int):
+        """Escrita bruta usada pelas transações (aplicação e rollback), sem observers; exige o lock do usuário"""
+        store, row = self._store, self._row
+        store.points[row] = points
+        ids = store._achievements[row]
+        if ids is not None and len(ids) > achievement_count:
+            del ids[achievement_count:]
+            User._truncations += 1
+        store._versions[row] = version
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, UserView) and other._store is self._store and other._row == self._row
+
+    def __hash__(self) -> int:
+        return hash((id(self._store), self._row))
+
+    def __str__(self):
+        return f"{self.role}(nome={self.name}, pontos={self.points})"
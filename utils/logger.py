@@ -1,36 +1,190 @@
 """
 Módulo de logging simples.
 Permite registrar mensagens com diferentes níveis.
+
+No modo assíncrono (async_mode=True) quem chama apenas enfileira um registro
+leve (nível, mensagem, argumentos e instante monotônico); uma thread em
+segundo plano formata e escreve os registros em lote. Em ambos os modos o
+histórico é um buffer circular e mensagens abaixo do nível ativo são
+descartadas antes de qualquer formatação.
 """
 
-import datetime
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+
+class _TimestampCache:
+    """Formata o horário no máximo uma vez por segundo."""
+
+    def __init__(self):
+        self._wall0 = time.time()
+        self._mono0 = time.monotonic()
+        self._second = None
+        self._text = ""
+
+    def format(self, monotonic: float) -> str:
+        second = int(self._wall0 + (monotonic - self._mono0))
+        if second != self._second:
+            self._text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            self._second = second
+        return self._text
 
 
 class Logger:
     LEVELS = ("INFO", "WARNING", "ERROR", "DEBUG")
+    SEVERITY = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
 
-    def __init__(self):
-        self.logs = []
+    _STOP = object()
+
+    def __init__(self, level: str = "DEBUG", capacity: int = 10_000, async_mode: bool = False,
+                 echo: bool = True, queue_size: int = 10_000, batch_size: int = 256):
+        """
+        :param level: Nível mínimo registrado (DEBUG, INFO, WARNING, ERROR)
+        :param capacity: Quantidade de mensagens mantidas em memória (buffer circular)
+        :param async_mode: Formata e escreve em uma thread de segundo plano
+        :param echo: Exibe as mensagens no console
+        :param queue_size: Limite da fila do modo assíncrono (excedentes são descartados)
+        :param batch_size: Máximo de registros formatados/escritos por lote
+        """
+        self.logs = deque(maxlen=capacity)
+        self.echo = echo
+        self.dropped = 0
+        self._min_severity = self.SEVERITY[level]
+        self._clock = _TimestampCache()
+        self._batch_size = batch_size
+        self._queue = None
+        self._writer = None
+        self._closing = False
+        self._close_lock = threading.Lock()
+        if async_mode:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._writer = threading.Thread(target=self._write_loop, name="logger-writer", daemon=True)
+            self._writer.start()
+
+    def set_level(self, level: str):
+        """Altera o nível mínimo registrado"""
+        self._min_severity = self.SEVERITY[level]
 
-    def log(self, message: str, level: str = "INFO"):
+    def log(self, message: str, level: str = "INFO", *args):
         """
         Registra uma mensagem no log.
-        :param message: Mensagem de log
+        :param message: Mensagem de log (pode conter marcadores %s preenchidos com args)
         :param level: Nível (INFO, WARNING, ERROR, DEBUG)
+        :param args: Argumentos da mensagem, formatados só se a mensagem for registrada
         """
-        if level not in self.LEVELS:
+        if level not in self.SEVERITY:
             level = "INFO"
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        entry = f"[{timestamp}] [{level}] {message}"
-        self.logs.append(entry)
-        print(entry)
+        if self.SEVERITY[level] < self._min_severity:
+            return
+        record = (level, message, args, time.monotonic())
+        channel = self._queue
+        if channel is None:
+            # Modo síncrono, ou assíncrono após close(): escreve na própria thread
+            entry = self._format(record)
+            self.logs.append(entry)
+            if self.echo:
+                print(entry)
+            return
+        try:
+            channel.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._closing:
+            # close() pode ter encerrado a thread de escrita antes deste put: quem
+            # chama escreve o que sobrou na fila, sob o lock, em vez de perder o registro
+            with self._close_lock:
+                self._drain(channel)
+
+    def debug(self, message: str, *args):
+        self.log(message, "DEBUG", *args)
+
+    def info(self, message: str, *args):
+        self.log(message, "INFO", *args)
+
+    def warning(self, message: str, *args):
+        self.log(message, "WARNING", *args)
+
+    def error(self, message: str, *args):
+        self.log(message, "ERROR", *args)
+
+    def _format(self, record) -> str:
+        level, message, args, monotonic = record
+        if args:
+            try:
+                message = message % args
+            except (TypeError, ValueError) as e:
+                # Um registro mal formatado não pode derrubar quem chama nem a thread de escrita
+                message = f"{message} {args!r} (erro de formatação: {e})"
+        return f"[{self._clock.format(monotonic)}] [{level}] {message}"
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(record is self._STOP for record in batch)
+            try:
+                self._write(batch)
+            finally:
+                # Sempre confirma o lote: flush() espera em queue.join()
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        entries = [self._format(record) for record in batch if record is not self._STOP]
+        self.logs.extend(entries)
+        if self.echo and entries:
+            sys.stdout.write("\n".join(entries) + "\n")
+
+    def _drain(self, channel):
+        """Escreve na thread atual o que ficou na fila depois que a thread de escrita terminou"""
+        while True:
+            try:
+                record = channel.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self._write([record])
+            finally:
+                channel.task_done()
+
+    def flush(self):
+        """Espera a thread de escrita processar tudo o que já foi enfileirado"""
+        channel = self._queue
+        if channel is not None and self._writer.is_alive():
+            channel.join()
+
+    def close(self):
+        """Escreve o que estiver pendente e encerra a thread de escrita; depois disso log() é síncrono"""
+        with self._close_lock:
+            channel = self._queue
+            if channel is None:
+                return
+            self._closing = True
+            if self._writer.is_alive():
+                channel.put(self._STOP)
+                self._writer.join()
+            # Registros enfileirados depois do marcador de fim
+            self._drain(channel)
+            self._queue = None
 
     def get_logs(self):
         """Retorna todas as mensagens registradas"""
-        return self.logs
+        self.flush()
+        return list(self.logs)
 
     def clear_logs(self):
         """Limpa o histórico de logs"""
+        self.flush()
         self.logs.clear()
         print("[Logger] Logs limpos.")
 
@@ -38,4 +192,4 @@ class Logger:
 # Alias conveniente
 logger = Logger()
 # Exemplo de uso:
-# logger.log("Sistema iniciado", "INFO")
\ No newline at end of file
+# logger.log("Sistema iniciado", "INFO")
@@ -0,0 +1,411 @@
+"""
+Métricas de baixo custo para os caminhos críticos da plataforma.
+
+Contadores e histogramas acumulam em células locais de cada thread (sem
+lock no caminho de escrita); as células de todas as threads são somadas só
+na leitura (snapshot / dump Prometheus). Com o registro desabilitado, cada
+ponto instrumentado custa apenas a verificação de um atributo.
+
+Uso:
+    from utils.metrics import metrics
+    metrics.enable()
+    ...
+    metrics.snapshot()                       # dict com todos os valores
+    metrics.write_prometheus("metrics.prom") # formato texto do Prometheus
+    metrics.start_profiler()                 # profiler por amostragem (opcional)
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Tally
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Limites (em segundos) padrão dos histogramas de latência
+DEFAULT_BUCKETS = (0.000_01, 0.000_05, 0.000_1, 0.000_5, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+def _series(name: str, labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    pairs = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        pairs.append(extra)
+    return f"{name}{{{','.join(pairs)}}}" if pairs else name
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, description: str, labels: Dict[str, str]):
+        self._registry = registry
+        self.name = name
+        self.description = description
+        self.labels = tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    @property
+    def series(self) -> str:
+        return _series(self.name, self.labels)
+
+
+class Counter(_Metric):
+    """Contador monotônico."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1) -> None:
+        if not self._registry.enabled:
+            return
+        cells = self._registry._cells()
+        cells[self] = cells.get(self, 0) + amount
+
+    def _merge(self, values: list):
+        return sum(values)
+
+
+class Gauge(_Metric):
+    """Valor instantâneo; pode ser atribuído diretamente ou calculado na leitura por uma função."""
+    kind = "gauge"
+
+    def __init__(self, registry, name, description, labels):
+        super().__init__(registry, name, description, labels)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        if self._registry.enabled:
+            self._value = value
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        """Calcula o valor só na leitura (custo zero no caminho crítico)"""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        return self._function() if self._function is not None else self._value
+
+
+class Histogram(_Metric):
+    """Histograma de buckets fixos (ex.: latências em segundos)."""
+    kind = "histogram"
+
+    def __init__(self, registry, name, description, labels, buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float) -> None:
+        if not self._registry.enabled:
+            return
+        cells = self._registry._cells()
+        cell = cells.get(self)
+        if cell is None:
+            # [contagem por bucket (+Inf no final), soma, total, versão]
+            cell = cells[self] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0]
+        index = bisect_left(self.buckets, value)
+        # Versão ímpar durante a escrita: a leitura (_copy_cell) refaz a cópia em vez de misturar valores
+        cell[3] += 1
+        cell[0][index] += 1
+        cell[1] += value
+        cell[2] += 1
+        cell[3] += 1
+
+    def time(self) -> "_Timer":
+        """Context manager que observa a duração do bloco"""
+        return _Timer(self)
+
+    def timed(self, function):
+        """Decorador que observa a duração de cada chamada quando as métricas estão habilitadas"""
+        registry = self._registry
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.observe(time.perf_counter() - start)
+        return wrapper
+
+    def hold(self, lock):
+        """
+        Adquire o lock medindo o tempo de espera:
+            with WAIT.hold(self._lock): ...
+        Desabilitado, retorna o próprio lock.
+        """
+        if not self._registry.enabled:
+            return lock
+        return _TimedAcquire(lock, self)
+
+    def _merge(self, values: list) -> dict:
+        counts = [0] * (len(self.buckets) + 1)
+        total_sum, total_count = 0.0, 0
+        for bucket_counts, value_sum, count in values:
+            for i, c in enumerate(bucket_counts):
+                counts[i] += c
+            total_sum += value_sum
+            total_count += count
+        cumulative, running = {}, 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            running += c
+            cumulative[bound] = running
+        return {"count": total_count, "sum": total_sum, "buckets": cumulative}
+
+
+def _copy_cell(cell: list) -> tuple:
+    """Cópia consistente (buckets, soma, total) de uma célula que a thread dona pode estar alterando"""
+    while True:
+        version = cell[3]
+        if not version & 1:
+            copy = (list(cell[0]), cell[1], cell[2])
+            if cell[3] == version:
+                return copy
+        time.sleep(0)
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _TimedAcquire:
+    __slots__ = ("_lock", "_histogram")
+
+    def __init__(self, lock, histogram: Histogram):
+        self._lock = lock
+        self._histogram = histogram
+
+    def __enter__(self):
+        if self._lock.acquire(blocking=False):
+            self._histogram.observe(0.0)
+        else:
+            start = time.perf_counter()
+            self._lock.acquire()
+            self._histogram.observe(time.perf_counter() - start)
+        return self._lock
+
+    def __exit__(self, *exc):
+        self._lock.release()
+        return False
+
+
+class SamplingProfiler:
+    """
+    Profiler por amostragem: uma thread em segundo plano lê periodicamente as
+    pilhas de todas as threads (sys._current_frames) e conta quantas vezes
+    cada pilha foi vista. Não instrumenta nada, então pode ser ligado e
+    desligado com o sistema em execução.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 32):
+        """
+        :param interval: Intervalo entre amostras, em segundos
+        :param max_depth: Profundidade máxima registrada de cada pilha
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks: _Tally = _Tally()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="metrics-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self.running:
+            self._stop.set()
+            self._thread.join()
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                self._stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def top(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Funções mais vistas no topo da pilha: [(função, amostras)]"""
+        leaves = _Tally()
+        for stack, count in list(self._stacks.items()):
+            if stack:
+                leaves[stack[-1]] += count
+        return leaves.most_common(n)
+
+    def collapsed(self) -> str:
+        """Pilhas no formato 'a;b;c contagem' (compatível com flamegraph.pl / speedscope)"""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in list(self._stacks.items()))
+
+    def clear(self) -> None:
+        self._stacks = _Tally()
+        self.samples = 0
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.profiler: Optional[SamplingProfiler] = None
+        self._metrics: Dict[Tuple[str, tuple], _Metric] = {}
+        self._local = threading.local()
+        # (thread, células) de cada thread que já registrou algo
+        self._thread_cells: List[Tuple[threading.Thread, dict]] = []
+        # Valores de threads que já terminaram
+        self._retired: Dict[_Metric, list] = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def _cells(self) -> dict:
+        try:
+            return self._local.cells
+        except AttributeError:
+            cells = self._local.cells = {}
+            with self._lock:
+                self._thread_cells.append((threading.current_thread(), cells))
+            return cells
+
+    def _get(self, cls, name: str, description: str, labels: Dict[str, str], **options) -> _Metric:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = self._metrics[key] = cls(self, name, description, labels, **options)
+        if not isinstance(metric, cls):
+            raise ValueError(f"Métrica '{name}' já registrada como {metric.kind}.")
+        return metric
+
+    def counter(self, name: str, description: str = "", **labels) -> Counter:
+        return self._get(Counter, name, description, labels)
+
+    def gauge(self, name: str, description: str = "", **labels) -> Gauge:
+        return self._get(Gauge, name, description, labels)
+
+    def histogram(self, name: str, description: str = "", buckets=DEFAULT_BUCKETS, **labels) -> Histogram:
+        return self._get(Histogram, name, description, labels, buckets=buckets)
+
+    def _collect(self) -> Dict[_Metric, list]:
+        """Junta as células de todas as threads (as encerradas são consolidadas e descartadas)."""
+        with self._lock:
+            alive = []
+            collected: Dict[_Metric, list] = {m: list(v) for m, v in self._retired.items()}
+            for thread, cells in self._thread_cells:
+                snapshot = {metric: _copy_cell(value) if isinstance(value, list) else value
+                            for metric, value in cells.copy().items()}
+                if thread.is_alive():
+                    alive.append((thread, cells))
+                else:
+                    for metric, value in snapshot.items():
+                        self._retired.setdefault(metric, []).append(value)
+                for metric, value in snapshot.items():
+                    collected.setdefault(metric, []).append(value)
+            self._thread_cells = alive
+        return collected
+
+    def snapshot(self) -> dict:
+        """
+        Valores atuais de todas as métricas:
+        {"counters": {série: valor}, "gauges": {...}, "histograms": {série: {count, sum, buckets}}}
+        """
+        collected = self._collect()
+        result = {"counters": {}, "gauges": {}, "histograms": {}}
+        for metric in list(self._metrics.values()):
+            if isinstance(metric, Gauge):
+                result["gauges"][metric.series] = metric.value
+            elif isinstance(metric, Counter):
+                result["counters"][metric.series] = metric._merge(collected.get(metric, []))
+            else:
+                result["histograms"][metric.series] = metric._merge(collected.get(metric, []))
+        return result
+
+    def reset(self) -> None:
+        """Zera contadores e histogramas (as métricas continuam registradas)"""
+        with self._lock:
+            self._retired = {}
+            for _, cells in self._thread_cells:
+                cells.clear()
+
+    def to_prometheus(self) -> str:
+        """Formato texto de exposição do Prometheus"""
+        collected = self._collect()
+        by_name: Dict[str, List[_Metric]] = {}
+        for metric in list(self._metrics.values()):
+            by_name.setdefault(metric.name, []).append(metric)
+
+        lines = []
+        for name, family in sorted(by_name.items()):
+            head = family[0]
+            if head.description:
+                lines.append(f"# HELP {name} {head.description}")
+            lines.append(f"# TYPE {name} {head.kind}")
+            for metric in family:
+                if isinstance(metric, Gauge):
+                    lines.append(f"{metric.series} {metric.value}")
+                elif isinstance(metric, Counter):
+                    lines.append(f"{metric.series} {metric._merge(collected.get(metric, []))}")
+                else:
+                    data = metric._merge(collected.get(metric, []))
+                    for bound, count in data["buckets"].items():
+                        le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                        lines.append(f"{_series(name + '_bucket', metric.labels, le)} {count}")
+                    lines.append(f"{_series(name + '_sum', metric.labels)} {data['sum']}")
+                    lines.append(f"{_series(name + '_count', metric.labels)} {data['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, filename: str) -> None:
+        """Grava o dump no arquivo (de forma atômica, para o node_exporter/textfile collector)"""
+        tmp = f"{filename}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, filename)
+        print(f"[Metrics] Métricas exportadas: {os.path.abspath(filename)}")
+
+    def start_profiler(self, interval: float = 0.005) -> SamplingProfiler:
+        """Liga o profiler por amostragem (pode ser chamado com o sistema em execução)"""
+        if self.profiler is None:
+            self.profiler = SamplingProfiler(interval)
+        self.profiler.interval = interval
+        self.profiler.start()
+        return self.profiler
+
+    def stop_profiler(self) -> Optional[SamplingProfiler]:
+        """Desliga o profiler; as amostras continuam disponíveis em metrics.profiler"""
+        if self.profiler is not None:
+            self.profiler.stop()
+        return self.profiler
+
+
+# Registro global usado pela instrumentação dos módulos
+metrics = MetricsRegistry(enabled=os.environ.get("PLATAFORMA_METRICS", "") not in ("", "0"))
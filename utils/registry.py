@@ -0,0 +1,119 @@
+"""
+Registro de plugins com carregamento sob demanda.
+
+Exportadores de relatório, estratégias de pontuação e tipos de usuário são
+registrados por nome. Um plugin pode ser o próprio objeto ou uma referência
+"modulo:atributo"; nesse caso o módulo só é importado no primeiro uso, então
+um processo que apenas pontua submissões não paga a importação do FPDF (nem
+de nada que não usar).
+
+    from utils.registry import exporters, scoring_strategies
+
+    scoring_strategies.create("time")                   # TimeBasedScoring()
+    exporters.register("xml", "meu_pacote.xml:export_xml")
+"""
+
+import importlib
+import threading
+from functools import lru_cache
+from typing import Dict, Iterator, List
+
+
+@lru_cache(maxsize=None)
+def optional_import(module: str):
+    """Importa uma dependência opcional na primeira chamada; retorna None se ela não estiver instalada"""
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        return None
+
+
+def _resolve(reference: str):
+    module, _, attribute = reference.partition(":")
+    target = importlib.import_module(module)
+    for part in attribute.split(".") if attribute else ():
+        target = getattr(target, part)
+    return target
+
+
+class PluginRegistry:
+    """Plugins de um tipo (ex.: exportadores), indexados por nome sem diferenciar maiúsculas."""
+
+    def __init__(self, kind: str):
+        """
+        :param kind: Descrição usada nas mensagens de erro (ex.: "Exportador")
+        """
+        self.kind = kind
+        self._references: Dict[str, object] = {}
+        self._loaded: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, plugin=None):
+        """
+        Registra um plugin; substitui o anterior de mesmo nome.
+        :param plugin: Objeto ou referência "modulo:atributo" (importada só no primeiro get)
+        Sem plugin, funciona como decorator: @registry.register("nome")
+        """
+        if plugin is None:
+            return lambda target: self.register(name, target) or target
+        key = name.lower()
+        with self._lock:
+            self._references[key] = plugin
+            self._loaded.pop(key, None)
+
+    def unregister(self, name: str) -> None:
+        key = name.lower()
+        with self._lock:
+            self._references.pop(key, None)
+            self._loaded.pop(key, None)
+
+    def get(self, name: str):
+        """Retorna o plugin, importando-o se necessário; nome desconhecido gera ValueError"""
+        key = name.lower()
+        try:
+            return self._loaded[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._references:
+                raise ValueError(f"{self.kind}: nome desconhecido '{key}'. Disponíveis: {', '.join(self._references)}")
+            if key not in self._loaded:
+                reference = self._references[key]
+                self._loaded[key] = _resolve(reference) if isinstance(reference, str) else reference
+            return self._loaded[key]
+
+    def create(self, name: str, *args, **kwargs):
+        """Instancia o plugin (classe ou fábrica) registrado com este nome"""
+        return self.get(name)(*args, **kwargs)
+
+    def is_loaded(self, name: str) -> bool:
+        return name.lower() in self._loaded
+
+    def names(self) -> List[str]:
+        return list(self._references)
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and name.lower() in self._references
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names())
+
+
+# Exportadores: função (facade, data, filename) -> None
+exporters = PluginRegistry("Exportador")
+exporters.register("json", "relatorios.facade:ReportFacade.export_json")
+exporters.register("csv", "relatorios.facade:ReportFacade.export_csv")
+exporters.register("pdf", "relatorios.facade:ReportFacade.export_pdf")
+exporters.register("pdf_large", "relatorios.facade:ReportFacade.export_pdf_large")
+exporters.register("ndjson", "relatorios.facade:ReportFacade.export_ndjson")
+exporters.register("columnar", "relatorios.facade:ReportFacade.export_columnar")
+
+scoring_strategies = PluginRegistry("Estratégia de pontuação")
+scoring_strategies.register("time", "desafios.scoring_strategy:TimeBasedScoring")
+scoring_strategies.register("difficulty", "desafios.scoring_strategy:DifficultyBasedScoring")
+scoring_strategies.register("accuracy", "desafios.scoring_strategy:AccuracyBasedScoring")
+
+user_types = PluginRegistry("Tipo de usuário")
+user_types.register("aluno", "usuarios.user:Aluno")
+user_types.register("professor", "usuarios.user:Professor")
+user_types.register("visitante", "usuarios.user:Visitante")